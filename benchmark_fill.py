@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+"""
+Fill Benchmark - Stage timings and throughput for the fill pipeline
+
+Generates synthetic parsedJson records (short and long Latin names, long
+Korean addresses, mixed phone formats), times each stage of filling one
+record and measures end-to-end throughput for single, batch and parallel
+runs. Results are written to results/ as JSON.
+
+Stages (per record, median and p95; the METRICS stages of Filler):
+    config_load     parse field_config.json
+    template_read   read the template bytes
+    analysis        existing-text check + layout keys (template cache warm)
+    template_open   open the template from memory
+    layout          font fitting / wrapping on every filled page (layout cache cleared per run)
+    insert          draw the text into the pages
+    save            serialize with the chosen save profile
+
+Usage:
+    python benchmark_fill.py run [--records 200] [--workers 4] [--save-baseline]
+    python benchmark_fill.py compare results/benchmark_*.json [--threshold 0.15]
+
+`compare` exits with status 1 if any metric is worse than the baseline
+(results/benchmark_baseline.json) by more than the threshold.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+try:
+    import pymupdf as fitz  # PyMuPDF
+except ImportError:  # PyMuPDF < 1.24
+    import fitz
+
+from instrumentation import METRICS
+from populate_pdf_config import FIELD_CONFIG, Filler, load_field_config, populate_batch, populate_single
+from save_profiles import DEFAULT_PROFILE, SAVE_PROFILES
+from text_layout import plan_layout
+
+BASELINE = "results/benchmark_baseline.json"
+DEFAULT_THRESHOLD = 0.15  # 15% slower (or lower throughput) counts as a regression
+STAGES = ('config_load', 'template_read', 'analysis', 'template_open', 'layout', 'insert', 'save')
+
+GIVEN_NAMES = ['Chulmin', 'Minji', 'Seo-yeon', 'Jae-hyun', 'Ha-eun', 'Dong-hyeon']
+FAMILY_NAMES = ['Jeon', 'Kim', 'Lee', 'Park', 'Choi', 'Jung', 'Kang', 'Yoon']
+STREETS_LATIN = ['Sambong-ro', 'Sejong-daero', 'Teheran-ro', 'Olympic-ro', 'Gangnam-daero']
+DISTRICTS_LATIN = ['Jongno-gu', 'Jung-gu', 'Gangnam-gu', 'Mapo-gu', 'Songpa-gu']
+CITIES_KO = ['서울특별시', '부산광역시', '대구광역시', '인천광역시', '경기도 성남시']
+DISTRICTS_KO = ['종로구', '중구', '강남구', '마포구', '분당구 정자동']
+STREETS_KO = ['삼봉로', '세종대로', '테헤란로', '올림픽로', '불정로']
+BUILDINGS_KO = ['', '한국빌딩 12층', '래미안아파트 101동 1203호', '그린타워 B동 지하1층 상가 105호']
+
+
+def synthetic_record(rng, index):
+    """One parsedJson record with a mix of short, long and Korean values"""
+    name = f"{rng.choice(FAMILY_NAMES)} {rng.choice(GIVEN_NAMES)}"
+    if rng.random() < 0.2:
+        name += f" {rng.choice(GIVEN_NAMES)}-{rng.choice(FAMILY_NAMES)}"
+
+    roll = rng.random()
+    if roll < 0.4:
+        address = (f"{rng.randint(1, 300)}, {rng.choice(STREETS_LATIN)}, {rng.choice(DISTRICTS_LATIN)}, "
+                   f"Seoul, {rng.randint(1000, 99999):05d}, Rep. of KOREA")
+    elif roll < 0.8:
+        address = (f"{rng.choice(CITIES_KO)} {rng.choice(DISTRICTS_KO)} {rng.choice(STREETS_KO)} "
+                   f"{rng.randint(1, 300)} {rng.choice(BUILDINGS_KO)}").strip()
+    else:
+        # Long mixed address that forces wrapping at small sizes
+        address = (f"{rng.choice(CITIES_KO)} {rng.choice(DISTRICTS_KO)} {rng.choice(STREETS_KO)} "
+                   f"{rng.randint(1, 300)}번길 {rng.randint(1, 99)} {rng.choice(BUILDINGS_KO[1:])} "
+                   f"({rng.choice(STREETS_LATIN)} {rng.randint(1, 300)}, {rng.choice(DISTRICTS_LATIN)})")
+
+    phone = rng.choice([
+        f"010-{rng.randint(1000, 9999)}-{rng.randint(1000, 9999)}",
+        f"+82 10 {rng.randint(1000, 9999)} {rng.randint(1000, 9999)}",
+        f"02-{rng.randint(100, 999)}-{rng.randint(1000, 9999)}",
+    ])
+    id_number = f"{rng.randint(500101, 991231)}-{rng.randint(1000000, 4999999)}"
+
+    return {
+        'record_id': f"bench_{index:06d}",
+        'parsedJson': {'name': name, 'id_number': id_number, 'address': address, 'phone': phone},
+    }
+
+
+def synthetic_records(count, seed=0):
+    """Deterministic list of synthetic records"""
+    rng = random.Random(seed)
+    return [synthetic_record(rng, i) for i in range(count)]
+
+
+def _summary(samples):
+    """Median / p95 / mean of a list of seconds, reported in milliseconds"""
+    ordered = sorted(samples)
+    p95 = ordered[min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))]
+    return {
+        'median_ms': statistics.median(ordered) * 1000,
+        'p95_ms': p95 * 1000,
+        'mean_ms': statistics.fmean(ordered) * 1000,
+    }
+
+
+def bench_stages(config_path, records, save_profile=DEFAULT_PROFILE):
+    """
+    Time each pipeline stage for every record
+
+    Each record goes through a fresh Filler and Filler.fill(), the same path
+    as a single run, and the stage times are read back from METRICS. Fields
+    are filled on their own pages, and records may be flat or parsedJson.
+
+    Returns:
+        Dict of stage -> {'median_ms', 'p95_ms', 'mean_ms'}
+    """
+    timings = {stage: [] for stage in STAGES}
+    plan_layout.cache_clear()
+    Filler(config_path, save_profile=save_profile).close()  # warm the template cache once
+
+    # One snapshot per record; everything is folded back into METRICS afterwards
+    snapshots = [METRICS.drain()]
+    try:
+        for record in records:
+            with Filler(config_path, save_profile=save_profile) as filler:
+                filler.fill(record)
+            snapshots.append(METRICS.drain())
+            for stage in STAGES:
+                timings[stage].append(snapshots[-1]['stages'].get(stage, [0, 0.0])[1])
+    finally:
+        for snap in snapshots:
+            METRICS.merge(snap)
+
+    return {stage: _summary(samples) for stage, samples in timings.items()}
+
+
+def bench_throughput(config_path, records, workers, save_profile=DEFAULT_PROFILE, single_limit=20):
+    """
+    Records per second for the three fill modes
+
+    single:   populate_single() per record (config + template loaded every time)
+    batch:    populate_batch() in one process
+    parallel: populate_batch() with a process pool
+
+    Returns:
+        Dict of mode -> {'records', 'seconds', 'records_per_s'}
+    """
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="fill_bench_") as tmp:
+        single_records = records[:single_limit]
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            for i, record in enumerate(single_records):
+                data_path = os.path.join(tmp, "record.json")
+                with open(data_path, 'w', encoding='utf-8') as f:
+                    json.dump(record, f, ensure_ascii=False)
+                populate_single(config_path, data_path, os.path.join(tmp, f"single_{i}.pdf"),
+                                save_profile=save_profile)
+            results['single'] = time.perf_counter() - start, len(single_records)
+
+        for mode, mode_workers in (('batch', 1), ('parallel', workers)):
+            plan_layout.cache_clear()
+            with contextlib.redirect_stdout(io.StringIO()):
+                start = time.perf_counter()
+                populate_batch(records, config_path, os.path.join(tmp, mode), workers=mode_workers,
+                               save_profile=save_profile)
+                results[mode] = time.perf_counter() - start, len(records)
+
+    return {
+        mode: {'records': count, 'seconds': seconds, 'records_per_s': count / seconds if seconds else 0.0}
+        for mode, (seconds, count) in results.items()
+    }
+
+
+def run_benchmark(config_path=FIELD_CONFIG, count=200, workers=None, save_profile=DEFAULT_PROFILE, seed=0):
+    """Full benchmark report (stage timings + throughput)"""
+    workers = workers or max(2, os.cpu_count() or 1)
+    records = synthetic_records(count, seed)
+    config = load_field_config(config_path)
+
+    return {
+        'analysis_date': datetime.now().isoformat(),
+        'pdf_file': config.get('pdf_template', 'pdf/A0124_pages_1_to_4.pdf'),
+        'config': config_path,
+        'records': count,
+        'seed': seed,
+        'workers': workers,
+        'save_profile': save_profile,
+        'pymupdf': fitz.VersionBind,
+        'python': sys.version.split()[0],
+        'cpu_count': os.cpu_count(),
+        'stages': bench_stages(config_path, records, save_profile),
+        'throughput': bench_throughput(config_path, records, workers, save_profile),
+    }
+
+
+def compare_reports(current, baseline, threshold=DEFAULT_THRESHOLD):
+    """
+    Compare two benchmark reports
+
+    Stage medians regress when they get slower, throughputs when they drop.
+
+    Returns:
+        List of (metric, baseline value, current value, relative change, regressed)
+    """
+    rows = []
+    for stage in STAGES:
+        if stage in baseline.get('stages', {}) and stage in current.get('stages', {}):
+            old = baseline['stages'][stage]['median_ms']
+            new = current['stages'][stage]['median_ms']
+            change = (new - old) / old if old else 0.0
+            rows.append((f"{stage} median ms", old, new, change, change > threshold))
+
+    for mode in ('single', 'batch', 'parallel'):
+        if mode in baseline.get('throughput', {}) and mode in current.get('throughput', {}):
+            old = baseline['throughput'][mode]['records_per_s']
+            new = current['throughput'][mode]['records_per_s']
+            change = (new - old) / old if old else 0.0
+            rows.append((f"{mode} records/s", old, new, change, -change > threshold))
+
+    return rows
+
+
+def _print_report(report):
+    print("="*70)
+    print(f" Fill Benchmark - {report['records']} records, {report['save_profile']} profile")
+    print("="*70)
+    print(f"\n{'Stage':15s} {'median':>10s} {'p95':>10s}")
+    for stage, result in report['stages'].items():
+        print(f"{stage:15s} {result['median_ms']:8.2f}ms {result['p95_ms']:8.2f}ms")
+
+    print(f"\n{'Mode':15s} {'records':>8s} {'seconds':>9s} {'records/s':>10s}")
+    for mode, result in report['throughput'].items():
+        print(f"{mode:15s} {result['records']:8d} {result['seconds']:9.2f} {result['records_per_s']:10.1f}")
+
+
+def cmd_run(args):
+    report = run_benchmark(args.config, args.records, args.workers, args.save_profile, args.seed)
+    _print_report(report)
+
+    output = args.output or f"results/benchmark_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"\n✅ Saved to: {output}")
+
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"✅ Baseline updated: {args.baseline}")
+    return 0
+
+
+def cmd_compare(args):
+    with open(args.report, 'r', encoding='utf-8') as f:
+        current = json.load(f)
+    with open(args.baseline, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+
+    rows = compare_reports(current, baseline, args.threshold)
+    print(f"Comparing {args.report} against {args.baseline} (threshold {args.threshold:.0%})\n")
+    print(f"{'Metric':22s} {'baseline':>10s} {'current':>10s} {'change':>8s}")
+    for metric, old, new, change, regressed in rows:
+        flag = "  ❌ REGRESSION" if regressed else ""
+        print(f"{metric:22s} {old:10.2f} {new:10.2f} {change:+7.1%}{flag}")
+
+    regressions = sum(1 for row in rows if row[4])
+    if regressions:
+        print(f"\n❌ {regressions} metric(s) regressed by more than {args.threshold:.0%}")
+        return 1
+    print("\n✅ No regressions")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the PDF fill pipeline")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    run = subparsers.add_parser('run', help="Run the benchmark and write a JSON report")
+    run.add_argument('--config', default=FIELD_CONFIG)
+    run.add_argument('--records', type=int, default=200, help="Synthetic records to fill")
+    run.add_argument('--workers', type=int, help="Processes for the parallel mode (default: CPU count, min 2)")
+    run.add_argument('--save-profile', choices=sorted(SAVE_PROFILES), default=DEFAULT_PROFILE)
+    run.add_argument('--seed', type=int, default=0)
+    run.add_argument('--output', help="Report path (default: results/benchmark_TIMESTAMP.json)")
+    run.add_argument('--baseline', default=BASELINE)
+    run.add_argument('--save-baseline', action='store_true', help="Also store this run as the baseline")
+    run.set_defaults(func=cmd_run)
+
+    compare = subparsers.add_parser('compare', help="Fail if a report regressed against the baseline")
+    compare.add_argument('report')
+    compare.add_argument('--baseline', default=BASELINE)
+    compare.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                         help="Allowed relative slowdown, e.g. 0.15 = 15%%")
+    compare.set_defaults(func=cmd_compare)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,311 +1,382 @@
 #!/usr/bin/env python3
 """
-Framework Comparison - PDF Form Field/Box Detection
+Framework Comparison - PDF Form Field/Box Detection Benchmark
 Compares PyMuPDF, pypdf, and pdfplumber for detecting form structure
+
+Each backend runs in a fresh process, opens the document once and extracts
+widgets, rectangles, words and field labels from every page. The report
+gives per-task wall time, peak memory and how well each backend's results
+agree with pdfplumber (the backend the template analysis cache uses), so
+the fastest backend that still finds the same structure can be picked.
+
+Usage:
+    python compare_frameworks.py                       # pdf/A0124_pages_1_to_4.pdf
+    python compare_frameworks.py form.pdf --repeat 5   # median of 5 runs per backend
+    python compare_frameworks.py --backends pymupdf,pdfplumber
 """
 
+import argparse
 import json
-import fitz  # PyMuPDF
-from pypdf import PdfReader
-import pdfplumber
+import multiprocessing
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime
 
-PDF_PATH = "pdf/A0124_pages_1_to_4.pdf"
+try:
+    import resource  # peak RSS; POSIX only
+except ImportError:  # Windows
+    resource = None
 
-print("="*80)
-print(" PDF FRAMEWORK COMPARISON - Form Field/Box Detection")
-print("="*80)
-print(f"\nAnalyzing: {PDF_PATH}\n")
+from find_surrounding_boxes import FIELD_LABELS, LabelMatcher
+from instrumentation import METRICS, add_metrics_arguments, write_metrics
 
-# ===========================================================================
-# METHOD 1: PyMuPDF (fitz) - Form Fields
-# ===========================================================================
-print("="*80)
-print("METHOD 1: PyMuPDF (fitz) - Form Widget Detection")
-print("="*80)
-
-doc = fitz.open(PDF_PATH)
-pymupdf_widgets = []
-
-for page_num in range(len(doc)):
-    page = doc[page_num]
-    widgets = list(page.widgets())  # Convert generator to list
-
-    if widgets:
-        print(f"\nPage {page_num + 1}: Found {len(widgets)} form widgets")
-        for i, widget in enumerate(widgets):
-            info = {
-                'page': page_num + 1,
-                'name': widget.field_name,
-                'type': widget.field_type_string,
-                'rect': {
-                    'x0': widget.rect.x0,
-                    'x1': widget.rect.x1,
-                    'y0': widget.rect.y0,
-                    'y1': widget.rect.y1
-                },
-                'value': widget.field_value
-            }
-            pymupdf_widgets.append(info)
-            print(f"  Widget {i+1}: {info['name']} ({info['type']})")
-            print(f"    Position: x={info['rect']['x0']:.1f}-{info['rect']['x1']:.1f}, "
-                  f"y={info['rect']['y0']:.1f}-{info['rect']['y1']:.1f}")
-
-if not pymupdf_widgets:
-    print("  ❌ No form widgets found - PDF has no fillable form fields")
-
-doc.close()
+PDF_PATH = "pdf/A0124_pages_1_to_4.pdf"
+OUTPUT_FILE = "results/framework_benchmark.json"  # framework_comparison.json has the old report layout
 
-# ===========================================================================
-# METHOD 2: PyMuPDF (fitz) - Rectangle Detection (for non-fillable forms)
-# ===========================================================================
-print("\n" + "="*80)
-print("METHOD 2: PyMuPDF (fitz) - Rectangle/Box Detection")
-print("="*80)
+TASKS = ('open', 'parse', 'widgets', 'rects', 'words', 'labels')
+RESULT_TASKS = TASKS[2:]
+REFERENCE_BACKEND = 'pdfplumber'
 
-doc = fitz.open(PDF_PATH)
-page = doc[0]  # First page only
+# Form labels plus the English words the old text-label check looked for
+FIELD_LABEL_WORDS = list(FIELD_LABELS) + ['name', 'address', 'phone']
 
-# Get page rectangles (these define the visual boxes)
-paths = page.get_drawings()
-rectangles = [p for p in paths if p.get('type') == 'f' or p.get('rect')]
 
-print(f"\nPage 1: Found {len(rectangles)} drawable rectangles")
+class _Timer:
+    """Wall time per task for one backend run"""
 
-# Focus on rectangles in the form field area (y: 160-320)
-form_rects = []
-for i, rect_info in enumerate(rectangles[:50]):  # Limit to first 50
-    if 'rect' in rect_info:
-        r = rect_info['rect']
-        if 160 <= r.y0 <= 320:
-            form_rects.append(r)
-            width = r.x1 - r.x0
-            height = r.y1 - r.y0
-            print(f"  Rect {len(form_rects)}: x={r.x0:.1f}-{r.x1:.1f} (w={width:.1f}), "
-                  f"y={r.y0:.1f}-{r.y1:.1f} (h={height:.1f})")
+    def __init__(self):
+        self.seconds = {}
 
-doc.close()
+    @contextmanager
+    def __call__(self, task):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.seconds[task] = self.seconds.get(task, 0.0) + time.perf_counter() - start
 
-# ===========================================================================
-# METHOD 3: pypdf - Form Field Detection
-# ===========================================================================
-print("\n" + "="*80)
-print("METHOD 3: pypdf - Form Field Detection")
-print("="*80)
-
-reader = PdfReader(PDF_PATH)
-pypdf_fields = []
-
-form_fields = reader.get_fields()
-if form_fields:
-    print(f"\nFound {len(form_fields)} form fields")
-    for field_name, field_data in form_fields.items():
-        info = {
-            'name': field_name,
-            'type': str(field_data.get('/FT', 'Unknown')),
-            'value': field_data.get('/V', ''),
-            'default': field_data.get('/DV', '')
-        }
-        pypdf_fields.append(info)
-        print(f"  Field: {info['name']}")
-        print(f"    Type: {info['type']}")
-        print(f"    Value: {info['value']}")
-else:
-    print("  ❌ No form fields found")
 
-# ===========================================================================
-# METHOD 4: pdfplumber - Rectangle/Line Detection
-# ===========================================================================
-print("\n" + "="*80)
-print("METHOD 4: pdfplumber - Rectangle & Table Detection")
-print("="*80)
-
-with pdfplumber.open(PDF_PATH) as pdf:
-    page = pdf.pages[0]
-
-    # Get rectangles
-    rects = page.rects if hasattr(page, 'rects') else []
-    print(f"\nRectangles found: {len(rects)}")
-
-    # Focus on form area rectangles
-    print("\nRectangles in form field area (y: 160-320):")
-    field_rects = []
-    for i, rect in enumerate(rects):
-        if 160 <= rect['top'] <= 320:
-            field_rects.append(rect)
-            width = rect['x1'] - rect['x0']
-            height = rect['bottom'] - rect['top']
-            print(f"  Box {len(field_rects)}: x={rect['x0']:.1f}-{rect['x1']:.1f} (w={width:.1f}), "
-                  f"y={rect['top']:.1f}-{rect['bottom']:.1f} (h={height:.1f})")
-
-            if len(field_rects) >= 10:  # Limit output
-                print(f"  ... (showing first 10 of {len([r for r in rects if 160 <= r['top'] <= 320])} rectangles)")
-                break
+def _find_labels(words, matcher, page_num, positions=True):
+    """Every occurrence of every label in a page's words"""
+    hits = []
+    for word in words:
+        for label in matcher.find(word['text'].lower()):
+            hit = {'page': page_num + 1, 'label': label}
+            if positions:
+                hit.update(x0=word['x0'], top=word['top'], bottom=word['bottom'])
+            hits.append(hit)
+    return hits
+
 
 # ===========================================================================
-# METHOD 5: pdfplumber - Text-based Field Detection
+# Backends: open once, every task on every page
 # ===========================================================================
-print("\n" + "="*80)
-print("METHOD 5: pdfplumber - Text-Based Field Label Detection")
-print("="*80)
 
-with pdfplumber.open(PDF_PATH) as pdf:
-    page = pdf.pages[0]
-    words = page.extract_words()
+def run_pymupdf(pdf_path, matcher, timer):
+    try:
+        import pymupdf as fitz  # PyMuPDF
+    except ImportError:  # PyMuPDF < 1.24
+        import fitz
+
+    results = {task: [] for task in RESULT_TASKS}
+    with timer('open'):
+        doc = fitz.open(pdf_path)
+    try:
+        for page_num, page in enumerate(doc):
+            with timer('widgets'):
+                for widget in page.widgets():
+                    r = widget.rect
+                    results['widgets'].append({'page': page_num + 1, 'name': widget.field_name,
+                                               'type': widget.field_type_string,
+                                               'x0': r.x0, 'top': r.y0, 'x1': r.x1, 'bottom': r.y1})
+            with timer('rects'):
+                # Rectangles drawn with 're' (what pdfplumber reports as rects)
+                for drawing in page.get_drawings():
+                    for item in drawing['items']:
+                        if item[0] == 're':
+                            r = item[1]
+                            results['rects'].append({'page': page_num + 1, 'x0': r.x0, 'top': r.y0,
+                                                     'x1': r.x1, 'bottom': r.y1})
+            with timer('words'):
+                words = [{'page': page_num + 1, 'text': w[4], 'x0': w[0], 'top': w[1], 'x1': w[2], 'bottom': w[3]}
+                         for w in page.get_text('words')]
+                results['words'].extend(words)
+            with timer('labels'):
+                results['labels'].extend(_find_labels(words, matcher, page_num))
+    finally:
+        doc.close()
+    return results, {'rects': True, 'positions': True}
+
+
+def run_pypdf(pdf_path, matcher, timer):
+    import logging
+    from pypdf import PdfReader
+
+    logging.getLogger('pypdf').setLevel(logging.CRITICAL)  # per-font encoding fallbacks are logged as errors
+
+    results = {task: [] for task in RESULT_TASKS}
+    with timer('open'):
+        reader = PdfReader(pdf_path)
+    for page_num, page in enumerate(reader.pages):
+        with timer('widgets'):
+            height = float(page.mediabox.height)
+            for annot in page.get('/Annots') or []:
+                annot = annot.get_object()
+                if annot.get('/Subtype') != '/Widget':
+                    continue
+                name = annot.get('/T') or annot.get('/Parent', {}).get('/T')
+                x0, y0, x1, y1 = (float(v) for v in annot['/Rect'])
+                results['widgets'].append({'page': page_num + 1, 'name': str(name), 'type': str(annot.get('/FT', '')),
+                                           'x0': x0, 'top': height - y1, 'x1': x1, 'bottom': height - y0})
+        with timer('words'):
+            # pypdf extracts text without word geometry
+            words = [{'page': page_num + 1, 'text': text} for text in page.extract_text().split()]
+            results['words'].extend(words)
+        with timer('labels'):
+            results['labels'].extend(_find_labels(words, matcher, page_num, positions=False))
+    # No graphics extraction in pypdf: rects are not supported
+    return results, {'rects': False, 'positions': False}
+
+
+def run_pdfplumber(pdf_path, matcher, timer):
+    import pdfplumber
+    from pdfminer.utils import decode_text
+
+    results = {task: [] for task in RESULT_TASKS}
+    with timer('open'):
+        pdf = pdfplumber.open(pdf_path)
+    try:
+        for page_num, page in enumerate(pdf.pages):
+            with timer('parse'):
+                # pdfminer lays out the page on first access; time it here, not in whichever task comes first
+                page.objects
+            with timer('widgets'):
+                for annot in page.annots:
+                    data = annot.get('data') or {}
+                    if str(data.get('Subtype', '')).strip("/'") != 'Widget':
+                        continue
+                    name = data.get('T')
+                    if isinstance(name, bytes):
+                        name = decode_text(name)  # PDF text string: UTF-16 with BOM or PDFDocEncoding
+                    results['widgets'].append({'page': page_num + 1, 'name': str(name), 'type': str(data.get('FT', '')),
+                                               'x0': annot['x0'], 'top': annot['top'],
+                                               'x1': annot['x1'], 'bottom': annot['bottom']})
+            with timer('rects'):
+                results['rects'].extend({'page': page_num + 1, 'x0': r['x0'], 'top': r['top'],
+                                         'x1': r['x1'], 'bottom': r['bottom']} for r in page.rects)
+            with timer('words'):
+                words = [{'page': page_num + 1, 'text': w['text'], 'x0': w['x0'], 'top': w['top'],
+                          'x1': w['x1'], 'bottom': w['bottom']} for w in page.extract_words()]
+                results['words'].extend(words)
+            with timer('labels'):
+                results['labels'].extend(_find_labels(words, matcher, page_num))
+    finally:
+        pdf.close()
+    return results, {'rects': True, 'positions': True}
+
+
+BACKENDS = {
+    'pymupdf': run_pymupdf,
+    'pypdf': run_pypdf,
+    'pdfplumber': run_pdfplumber,
+}
 
-    # Find field labels
-    field_labels = ['성명', '주민등록번호', '연락처', '주소', 'name', 'address', 'phone']
 
-    found_labels = []
-    for word in words:
-        for label in field_labels:
-            if label in word['text'].lower():
-                found_labels.append({
-                    'text': word['text'],
-                    'x0': word['x0'],
-                    'x1': word['x1'],
-                    'top': word['top'],
-                    'bottom': word['bottom']
-                })
-
-    print(f"\nFound {len(found_labels)} potential field labels:")
-    for label_info in found_labels:
-        print(f"  Label: '{label_info['text']}'")
-        print(f"    Position: x={label_info['x0']:.1f}-{label_info['x1']:.1f}, "
-              f"y={label_info['top']:.1f}-{label_info['bottom']:.1f}")
+def benchmark_backend(name, pdf_path, labels=FIELD_LABEL_WORDS, repeat=3):
+    """
+    Run one backend `repeat` times (meant for a fresh process)
+
+    Returns:
+        Dict with median per-task seconds, median total, import time, peak
+        Python heap (tracemalloc) and peak process RSS (None where the
+        resource module is unavailable), plus the last run's results
+    """
+    start = time.perf_counter()
+    BACKENDS[name](pdf_path, LabelMatcher(labels), _Timer())  # first run imports the library
+    first_run = time.perf_counter() - start
+
+    matcher = LabelMatcher(labels)
+    runs = []
+    tracemalloc.start()
+    for _ in range(repeat):
+        timer = _Timer()
+        start = time.perf_counter()
+        results, support = BACKENDS[name](pdf_path, matcher, timer)
+        timer.seconds['total'] = time.perf_counter() - start
+        runs.append(timer.seconds)
+    _, python_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    rss = None
+    if resource is not None:
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        if sys.platform == 'darwin':
+            rss /= 1024  # bytes on macOS, KiB on Linux
+
+    return {
+        'backend': name,
+        'first_run_seconds': first_run,
+        'seconds': {task: statistics.median(run.get(task, 0.0) for run in runs)
+                    for task in TASKS + ('total',)},
+        'python_peak_mb': python_peak / (1 << 20),
+        'peak_rss_mb': rss,
+        'support': support,
+        'counts': {task: len(items) for task, items in results.items()},
+        'results': results,
+    }
 
-# ===========================================================================
-# SUMMARY & COMPARISON
-# ===========================================================================
-print("\n" + "="*80)
-print(" SUMMARY & COMPARISON")
-print("="*80)
-
-print("\n┌─────────────────────────┬──────────┬────────────────────────────────┐")
-print("│ Framework               │ Found    │ Best For                       │")
-print("├─────────────────────────┼──────────┼────────────────────────────────┤")
-print(f"│ PyMuPDF (widgets)       │ {len(pymupdf_widgets):8d} │ Fillable PDF forms             │")
-print(f"│ PyMuPDF (rectangles)    │ {len(form_rects):8d} │ Visual box detection           │")
-print(f"│ pypdf (form fields)     │ {len(pypdf_fields):8d} │ Fillable PDF forms             │")
-print(f"│ pdfplumber (rectangles) │ {len(field_rects):8d} │ Visual box/table detection     │")
-print(f"│ pdfplumber (text labels)│ {len(found_labels):8d} │ Field label detection          │")
-print("└─────────────────────────┴──────────┴────────────────────────────────┘")
-
-print("\n" + "="*80)
-print(" RECOMMENDATION")
-print("="*80)
-
-if pymupdf_widgets or pypdf_fields:
-    print("\n✅ PDF has FILLABLE FORM FIELDS")
-    print("   Best approach: Use PyMuPDF or pypdf form field APIs")
-    print("   Population: Direct field value assignment")
-else:
-    print("\n⚠️  PDF has NO fillable form fields (this is your case!)")
-    print("   Best approach: Rectangle detection + text overlay")
-    print("   Population: Coordinate-based text insertion")
-    print("\n   Recommended framework: pdfplumber for analysis")
-    print("   Reason:")
-    print("   • Excellent rectangle detection")
-    print("   • Precise coordinate information")
-    print("   • Good text extraction for labels")
-    print("   • Works with non-fillable forms")
 
 # ===========================================================================
-# CREATE TEXT/INPUT BOX MAPPING
+# Agreement with the reference backend
 # ===========================================================================
-print("\n" + "="*80)
-print(" TEXT LABEL → INPUT BOX MAPPING")
-print("="*80)
-
-with pdfplumber.open(PDF_PATH) as pdf:
-    page = pdf.pages[0]
-    words = page.extract_words()
-    rects = page.rects if hasattr(page, 'rects') else []
-
-    # Find key field labels
-    label_keywords = {
-        '성명': 'Name',
-        '주민등록번호': 'ID Number',
-        '연락처': 'Contact',
-        '주소': 'Address'
-    }
-
-    mappings = []
-
-    for korean_label, english_label in label_keywords.items():
-        # Find label position
-        label_word = None
-        for word in words:
-            if korean_label in word['text']:
-                label_word = word
-                break
 
-        if not label_word:
+def _keys(task, items, positions=True):
+    if task == 'widgets':
+        return Counter((i['page'], i['name']) for i in items)
+    if task == 'rects':
+        return Counter((i['page'], round(i['x0']), round(i['top']), round(i['x1']), round(i['bottom']))
+                       for i in items)
+    if task == 'words':
+        return Counter((i['page'], i['text']) for i in items)
+    if positions:
+        # Bottom edges agree across backends; tops depend on each one's ascender convention
+        return Counter((i['page'], i['label'], round(i['x0']), round(i['bottom'])) for i in items)
+    return Counter((i['page'], i['label']) for i in items)
+
+
+def agreement(report, reference):
+    """Share of matching results per task: |A ∩ B| / max(|A|, |B|), None if unsupported"""
+    scores = {}
+    for task in RESULT_TASKS:
+        if task == 'rects' and not report['support']['rects']:
+            scores[task] = None
             continue
+        positions = report['support']['positions']
+        ours = _keys(task, report['results'][task], positions)
+        theirs = _keys(task, reference['results'][task], positions)
+        total = max(sum(ours.values()), sum(theirs.values()))
+        scores[task] = sum((ours & theirs).values()) / total if total else 1.0
+    return scores
+
+
+def compare_backends(pdf_path=PDF_PATH, backends=tuple(BACKENDS), repeat=3):
+    """
+    Benchmark each backend in its own fresh process and score agreement
+
+    Returns:
+        Report dict (per-backend timings, memory, counts and agreement)
+    """
+    reports = {}
+    # spawn: every backend starts from a clean interpreter, so import cost and peak RSS are its own
+    context = multiprocessing.get_context('spawn')
+    for name in backends:
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+            reports[name] = pool.submit(benchmark_backend, name, pdf_path, FIELD_LABEL_WORDS, repeat).result()
+        for task, seconds in reports[name]['seconds'].items():
+            METRICS.add_time(f"{name}_{task}", seconds)
+
+    reference = reports.get(REFERENCE_BACKEND) or next(iter(reports.values()))
+    for report in reports.values():
+        report['agreement'] = agreement(report, reference)
+
+    # Fastest backend that supports everything and matches the reference
+    complete = [r for r in reports.values()
+                if all(score is not None and score >= 0.99 for score in r['agreement'].values())]
+    fastest = min(complete or reports.values(), key=lambda r: r['seconds']['total'])
+
+    has_widgets = any(r['counts']['widgets'] for r in reports.values())
+    return {
+        'pdf_file': pdf_path,
+        'analysis_date': datetime.now().isoformat(),
+        'repeat': repeat,
+        'reference_backend': reference['backend'],
+        'backends': {name: {k: v for k, v in r.items() if k != 'results'} for name, r in reports.items()},
+        'widgets': reference['results']['widgets'],
+        'labels': reference['results']['labels'],
+        'fastest_agreeing_backend': fastest['backend'],
+        'recommendation': 'form_fields' if has_widgets else 'text_overlay',
+    }
 
-        # Find nearest rectangle (input box) to the right of label
-        label_right = label_word['x1']
-        label_y = label_word['top']
-
-        best_rect = None
-        min_distance = float('inf')
-
-        for rect in rects:
-            # Check if rectangle is roughly at same Y level
-            if abs(rect['top'] - label_y) < 10:
-                # Check if rectangle is to the right of label
-                if rect['x0'] > label_right:
-                    distance = rect['x0'] - label_right
-                    if distance < min_distance:
-                        min_distance = distance
-                        best_rect = rect
-
-        if best_rect:
-            mappings.append({
-                'label_korean': korean_label,
-                'label_english': english_label,
-                'label_position': {
-                    'x': label_word['x0'],
-                    'y': label_word['top']
-                },
-                'input_box': {
-                    'x0': best_rect['x0'],
-                    'x1': best_rect['x1'],
-                    'y0': best_rect['top'],
-                    'y1': best_rect['bottom'],
-                    'width': best_rect['x1'] - best_rect['x0'],
-                    'height': best_rect['bottom'] - best_rect['top']
-                }
-            })
-
-    print("\nDetected Text Label → Input Box Mappings:\n")
-    for mapping in mappings:
-        print(f"{mapping['label_korean']} ({mapping['label_english']})")
-        print(f"  Label at: ({mapping['label_position']['x']:.1f}, {mapping['label_position']['y']:.1f})")
-        box = mapping['input_box']
-        print(f"  Input Box: x={box['x0']:.1f}-{box['x1']:.1f} (width={box['width']:.1f}pt), "
-              f"y={box['y0']:.1f}-{box['y1']:.1f} (height={box['height']:.1f}pt)")
-        print()
-
-# Save comparison report
-output = {
-    'pdf_file': PDF_PATH,
-    'analysis_date': datetime.now().isoformat(),
-    'results': {
-        'pymupdf_widgets': pymupdf_widgets,
-        'pymupdf_rectangles': len(form_rects),
-        'pypdf_fields': pypdf_fields,
-        'pdfplumber_rectangles': len(field_rects),
-        'pdfplumber_labels': len(found_labels)
-    },
-    'text_to_box_mappings': mappings,
-    'recommendation': 'pdfplumber' if not (pymupdf_widgets or pypdf_fields) else 'pymupdf'
-}
-
-output_file = 'results/framework_comparison.json'
-with open(output_file, 'w', encoding='utf-8') as f:
-    json.dump(output, f, indent=2, ensure_ascii=False)
 
-print("\n" + "="*80)
-print(f"✅ Comparison report saved to: {output_file}")
-print("="*80)
+def _pct(score):
+    return "   n/a" if score is None else f"{score * 100:5.1f}%"
+
+
+def print_report(report):
+    print("\n" + "="*80)
+    print(" SUMMARY & COMPARISON")
+    print("="*80)
+
+    print("\nWall time (median ms per run, document opened once per run):\n")
+    print(f"  {'Backend':12s}" + "".join(f"{task:>10s}" for task in TASKS + ('total',)) + f"{'1st run':>10s}")
+    for name, r in report['backends'].items():
+        row = "".join(f"{r['seconds'][task] * 1000:10.1f}" for task in TASKS + ('total',))
+        print(f"  {name:12s}{row}{r['first_run_seconds'] * 1000:10.1f}")
+
+    print(f"\nResults and agreement with {report['reference_backend']}:\n")
+    print(f"  {'Backend':12s}{'widgets':>14s}{'rects':>14s}{'words':>14s}{'labels':>14s}{'peak RSS':>11s}{'py heap':>10s}")
+    for name, r in report['backends'].items():
+        cells = ""
+        for task in RESULT_TASKS:
+            count = r['counts'][task] if r['agreement'][task] is not None else '-'
+            cells += f"{count:>6} {_pct(r['agreement'][task])}"
+        rss = f"{'n/a':>11s}" if r['peak_rss_mb'] is None else f"{r['peak_rss_mb']:8.1f} MB"
+        print(f"  {name:12s}{cells}{rss}{r['python_peak_mb']:7.1f} MB")
+
+    print("\n" + "="*80)
+    print(" RECOMMENDATION")
+    print("="*80)
+
+    if report['recommendation'] == 'form_fields':
+        print("\n✅ PDF has FILLABLE FORM FIELDS")
+        print("   Best approach: Use PyMuPDF or pypdf form field APIs")
+        print("   Population: Direct field value assignment")
+    else:
+        print("\n⚠️  PDF has NO fillable form fields")
+        print("   Best approach: Rectangle detection + text overlay")
+        print("   Population: Coordinate-based text insertion")
+    print(f"\n   Fastest backend agreeing with {report['reference_backend']}: {report['fastest_agreeing_backend']}")
+    print("   Label → input box mapping: python find_surrounding_boxes.py")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark PDF extraction backends on a template")
+    parser.add_argument('pdf', nargs='?', default=PDF_PATH, help=f"Template PDF (default: {PDF_PATH})")
+    parser.add_argument('--repeat', type=int, default=3, help="Timed runs per backend (median is reported)")
+    parser.add_argument('--backends', default=",".join(BACKENDS),
+                        help=f"Comma-separated subset of {', '.join(BACKENDS)}")
+    parser.add_argument('--output', default=OUTPUT_FILE)
+    add_metrics_arguments(parser)
+    args = parser.parse_args(argv)
+
+    backends = [b.strip() for b in args.backends.split(',') if b.strip()]
+    unknown = [b for b in backends if b not in BACKENDS]
+    if unknown:
+        parser.error(f"unknown backend(s): {', '.join(unknown)}")
+
+    print("="*80)
+    print(" PDF FRAMEWORK COMPARISON - Extraction Backend Benchmark")
+    print("="*80)
+    print(f"\nAnalyzing: {args.pdf} (all pages, {args.repeat} runs per backend)\n")
+
+    report = compare_backends(args.pdf, backends, args.repeat)
+    print_report(report)
+
+    os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+
+    print("\n" + "="*80)
+    print(f"✅ Comparison report saved to: {args.output}")
+    print("="*80)
+    write_metrics(args, script='compare_frameworks', pdf_file=args.pdf)
+
+
+if __name__ == "__main__":
+    main()
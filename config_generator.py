@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+"""
+Config Generator - Write field_config.json straight from box detection
+
+Runs find_surrounding_boxes.detect_boxes() over every page of a template and
+turns each detected input box into a complete field definition: box, page,
+json_key (via field_matcher), alignment, wrapping and a font size derived
+from the box height. Detection results are cached under the template's
+SHA-256 (and the label set), so regenerating the config for a template
+revision that was already seen takes no PDF parsing at all.
+
+A label repeated on several pages becomes one field, at its first
+occurrence; --all-pages keeps every occurrence (ids like name_p2).
+
+Usage:
+    python config_generator.py pdf/A0124_pages_1_to_4.pdf --output field_config.json
+    python config_generator.py new_form.pdf --labels labels.json --output new_form_config.json
+    python config_generator.py repeated_form.pdf --all-pages   # one field per label and page
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import os
+import re
+import sys
+from datetime import datetime
+
+from field_matcher import get_matcher
+from find_surrounding_boxes import (BELOW_DISTANCE, FIELD_LABELS, PDF_PATH, RIGHT_DISTANCE,
+                                    detect_boxes)
+from instrumentation import METRICS, add_metrics_arguments, write_metrics
+from template_cache import template_backend, template_hash
+
+DETECTION_CACHE_DIR = ".cache/detections"
+DETECTION_CACHE_VERSION = 3
+
+# Written into every generated config (same defaults as field_config.json)
+DEFAULT_SETTINGS = {
+    'padding_horizontal': 3,
+    'padding_vertical_top': 3,
+    'padding_vertical_bottom': 3,
+    'line_height_multiplier': 1.3,
+    'default_fontname': 'helv',
+    'default_color': [0, 0, 0],
+}
+ALIGNMENT_OPTIONS = {
+    'top': 'Align text to top of box',
+    'middle': 'Center text vertically in box (default)',
+    'bottom': 'Align text to bottom of box',
+}
+
+MAX_FONTSIZE = 10       # pt; the form's body text size
+MIN_FONTSIZE = 7        # single-line fields shrink down to this
+MIN_WRAP_FONTSIZE = 6   # wrapped (multi-line) fields may go smaller
+WRAP_FONTSIZE = 8       # a box that fits two lines at this size is treated as multi-line
+
+
+# -- detection cache ------------------------------------------------------
+
+def detection_key(content_hash, labels, backend):
+    """Cache key: template hash + label set + the detection distances + extraction backend"""
+    digest = hashlib.sha256(content_hash.encode())
+    digest.update(json.dumps(labels, sort_keys=True, ensure_ascii=False).encode())
+    digest.update(f"{RIGHT_DISTANCE},{BELOW_DISTANCE},{backend}".encode())
+    return digest.hexdigest()
+
+
+def _cache_path(key, cache_dir):
+    return os.path.join(cache_dir, f"{key}.json")
+
+
+def _read_detection(key, cache_dir):
+    try:
+        with open(_cache_path(key, cache_dir), 'r', encoding='utf-8') as f:
+            cached = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+    if cached.get('version') != DETECTION_CACHE_VERSION:
+        return None
+    return cached
+
+
+def _write_detection(key, detection, cache_dir):
+    os.makedirs(cache_dir, exist_ok=True)
+    path = _cache_path(key, cache_dir)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(detection, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def cached_detection(pdf_path, labels=FIELD_LABELS, workers=None, cache_dir=DETECTION_CACHE_DIR):
+    """
+    detect_boxes() result for a template, from the cache when the template was seen before
+
+    Returns:
+        Dict with 'hash', 'labels', 'fields' (detections), 'labels_missing' and
+        'boxes_missing' (labels found without an input box)
+    """
+    content_hash = template_hash(pdf_path)
+    key = detection_key(content_hash, labels, template_backend(pdf_path))
+    detection = _read_detection(key, cache_dir)
+    if detection is not None:
+        METRICS.count('detection_cache_hits')
+        return detection
+
+    METRICS.count('detection_cache_misses')
+    fields, missing, boxes_missing = detect_boxes(pdf_path, labels, workers)
+    detection = {
+        'version': DETECTION_CACHE_VERSION,
+        'hash': content_hash,
+        'labels': labels,
+        'fields': fields,
+        'labels_missing': missing,
+        'boxes_missing': boxes_missing,
+    }
+    # Keyed by the backend that produced the boxes, which differs after a fallback
+    _write_detection(detection_key(content_hash, labels, template_backend(pdf_path)), detection, cache_dir)
+    return detection
+
+
+# -- config building ------------------------------------------------------
+
+def _snake(text):
+    return re.sub(r'[^a-z0-9]+', '_', text.lower()).strip('_')
+
+
+def field_style(box, settings=DEFAULT_SETTINGS):
+    """
+    Font size, alignment and wrapping for a box, from its height
+
+    Boxes tall enough for two lines at WRAP_FONTSIZE are top-aligned and
+    wrap; everything else is a centred single line. The size is the largest
+    0.5pt step whose lines fit the padded height, capped at MAX_FONTSIZE.
+    """
+    usable = (box['y1'] - box['y0']
+              - settings.get('padding_vertical_top', 3) - settings.get('padding_vertical_bottom', 3))
+    line_height = settings.get('line_height_multiplier', 1.3)
+
+    multi_line = usable >= 2 * WRAP_FONTSIZE * line_height
+    lines = 2 if multi_line else 1
+    min_fontsize = MIN_WRAP_FONTSIZE if multi_line else MIN_FONTSIZE
+    fontsize = math.floor(usable / (lines * line_height) * 2) / 2
+    fontsize = max(min_fontsize, min(MAX_FONTSIZE, fontsize))
+
+    return {
+        'fontsize': fontsize,
+        'alignment': 'top' if multi_line else 'middle',
+        'allow_wrap': multi_line,
+        'min_fontsize': min_fontsize,
+    }
+
+
+def build_field_config(pdf_path, detections, settings=DEFAULT_SETTINGS, all_pages=False):
+    """
+    Complete field config dict from detection results
+
+    Args:
+        pdf_path: Template the config is for (stored as pdf_template)
+        detections: Result dicts from find_surrounding_boxes.detect_boxes()
+        settings: The config's 'settings' section
+        all_pages: Keep every occurrence of a JSON key, not just the first one
+
+    Returns:
+        Config dict in the field_config.json format
+    """
+    matcher = get_matcher()
+    fields = []
+    used_ids = set()
+
+    for detection in detections:
+        korean, english = detection['field_korean'], detection['field_english']
+        json_key = matcher.match(korean) or matcher.match(english) or _snake(english)
+
+        # A value is filled once unless every page asked for it
+        field_id = json_key
+        if field_id in used_ids:
+            if not all_pages:
+                continue
+            field_id = f"{json_key}_p{detection['page']}"
+        used_ids.add(field_id)
+
+        found = detection['input_box']
+        box = {key: round(found[key], 1) for key in ('x0', 'x1', 'y0', 'y1')}
+        style = field_style(box, settings)
+
+        fields.append({
+            'id': field_id,
+            'label': f"{korean} ({english})" if english != korean else korean,
+            'json_key': json_key,
+            'page': detection['page'],
+            'box': box,
+            **style,
+            'offset_x': 0,
+            'offset_y': 0,
+            'comment': f"Generated from the input box detected {detection['strategy']} of the label",
+        })
+
+    return {
+        'pdf_template': pdf_path,
+        'generated': {
+            'template_hash': template_hash(pdf_path),
+            'date': datetime.now().isoformat(),
+        },
+        'fields': fields,
+        'settings': dict(settings),
+        'alignment_options': dict(ALIGNMENT_OPTIONS),
+    }
+
+
+def validate_field_config(config, page_count=None):
+    """
+    Problems that would stop populate_pdf_config.py from using a config
+
+    Returns:
+        List of messages (empty = valid)
+    """
+    problems = []
+    if not config.get('pdf_template'):
+        problems.append("missing pdf_template")
+
+    ids = set()
+    for i, field_def in enumerate(config.get('fields', [])):
+        name = field_def.get('id', f"fields[{i}]")
+        for key in ('id', 'label', 'json_key', 'box'):
+            if key not in field_def:
+                problems.append(f"{name}: missing '{key}'")
+        if name in ids:
+            problems.append(f"{name}: duplicate id")
+        ids.add(name)
+
+        box = field_def.get('box', {})
+        if not all(key in box for key in ('x0', 'x1', 'y0', 'y1')):
+            problems.append(f"{name}: box needs x0, x1, y0, y1")
+        elif box['x1'] <= box['x0'] or box['y1'] <= box['y0']:
+            problems.append(f"{name}: empty box")
+
+        page = field_def.get('page', 1)
+        if not isinstance(page, int) or page < 1 or (page_count and page > page_count):
+            problems.append(f"{name}: page {page} is not a page of the template")
+
+        if field_def.get('alignment', 'middle') not in ALIGNMENT_OPTIONS:
+            problems.append(f"{name}: unknown alignment '{field_def['alignment']}'")
+    if not config.get('fields'):
+        problems.append("no fields")
+    return problems
+
+
+def generate_field_config(pdf_path=PDF_PATH, labels=FIELD_LABELS, workers=None,
+                          cache_dir=DETECTION_CACHE_DIR, all_pages=False):
+    """
+    Detect (or reuse cached detection) and build a validated field config
+
+    Returns:
+        (config dict, detection dict)
+
+    Raises:
+        ValueError: If the generated config does not validate
+    """
+    with METRICS.stage('detection'):
+        detection = cached_detection(pdf_path, labels, workers, cache_dir)
+    config = build_field_config(pdf_path, detection['fields'], all_pages=all_pages)
+
+    try:
+        import pymupdf as fitz  # PyMuPDF; page count for validation
+    except ImportError:  # PyMuPDF < 1.24
+        import fitz
+    with fitz.open(pdf_path) as doc:
+        page_count = len(doc)
+    problems = validate_field_config(config, page_count)
+    if problems:
+        raise ValueError("Generated config is invalid:\n  " + "\n  ".join(problems))
+    return config, detection
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a field config from input box detection")
+    parser.add_argument('pdf', nargs='?', default=PDF_PATH, help=f"Template PDF (default: {PDF_PATH})")
+    parser.add_argument('--output', '-o', help="Config path (default: results/field_config_generated_TIMESTAMP.json)")
+    parser.add_argument('--labels', metavar='PATH', help="JSON file of {label: English name}")
+    parser.add_argument('--workers', type=int, help="Processes for analysing uncached pages")
+    parser.add_argument('--cache-dir', default=DETECTION_CACHE_DIR)
+    parser.add_argument('--all-pages', action='store_true',
+                        help="One field per label occurrence (default: first occurrence of each JSON key)")
+    add_metrics_arguments(parser)
+    args = parser.parse_args(argv)
+
+    labels = dict(FIELD_LABELS)
+    if args.labels:
+        with open(args.labels, 'r', encoding='utf-8') as f:
+            labels = json.load(f)
+
+    print("="*70)
+    print("Field Config Generator")
+    print("="*70)
+    print(f"\nTemplate: {args.pdf}")
+
+    try:
+        config, detection = generate_field_config(args.pdf, labels, args.workers, args.cache_dir,
+                                                  args.all_pages)
+    except ValueError as e:
+        detection = cached_detection(args.pdf, labels, args.workers, args.cache_dir)
+        backend = template_backend(args.pdf)
+        print(f"\n❌ {e}")
+        print(f"  Extraction backend: {backend}")
+        for item in detection['boxes_missing']:
+            print(f"  No suitable input box found: {item['field_korean']} (page {item['page']})")
+        for label in detection['labels_missing']:
+            print(f"  Label not found on any page: {label}")
+        if detection['labels_missing']:
+            print("\n  Check the labels (--labels) against the template text.")
+        if detection['boxes_missing'] and backend == 'pdfplumber':
+            print("\n  pdfplumber does not see boxes drawn as 're h' paths; compare the backends with:")
+            print(f"    python template_cache.py {args.pdf} --check-backends")
+        return 1
+    source = "cached detection" if METRICS.counters.get('detection_cache_hits') else "detected"
+    print(f"  ✓ {len(config['fields'])} fields ({source}, template {detection['hash'][:12]})")
+
+    for field_def in config['fields']:
+        box = field_def['box']
+        print(f"  p{field_def['page']} {field_def['id']:18s} → {field_def['json_key']:12s} "
+              f"({box['x0']:.1f},{box['y0']:.1f} → {box['x1']:.1f},{box['y1']:.1f}) "
+              f"{field_def['fontsize']}pt {field_def['alignment']}")
+    for item in detection['boxes_missing']:
+        print(f"  ⚠️  No suitable input box found: {item['field_korean']} (page {item['page']})")
+    for label in detection['labels_missing']:
+        print(f"  ⚠️  Label not found on any page: {label}")
+
+    output = args.output or f"results/field_config_generated_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(config, f, indent=2, ensure_ascii=False)
+
+    print(f"\n✅ Config written to: {output}")
+    print(f"   Fill with: python populate_pdf_config.py --config {output}")
+
+    write_metrics(args, script='config_generator', pdf_file=args.pdf)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
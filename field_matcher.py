@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Field Matcher - Map PDF field names / labels to JSON keys by synonym
+
+All Korean and English synonyms are compiled into one regular expression,
+so a field name is scanned once no matter how many synonyms there are.
+Every synonym occurrence is found (overlapping ones included) and ranked:
+a synonym that is the whole label beats one that is a whole word of it
+("Resident Address" → address), which beats one inside a word ('주민' in
+'주민등록번호'). Within a rank the longest synonym wins, ties going to the
+key listed first in FIELD_SYNONYMS. Notebooks 02 and 03 share the matcher from get_matcher(),
+which is compiled once per process.
+
+Usage:
+    from field_matcher import get_matcher
+    matcher = get_matcher()
+    matcher.match('주민등록번호')       # 'id_number'
+    matcher.match('Telephone No.')     # 'phone'
+    matcher.match('Resident Address')  # 'address'
+    matcher.match('Signature')         # None
+
+    python field_matcher.py 성명 "Home address" 연락처
+"""
+
+import re
+import sys
+from functools import lru_cache
+
+# JSON key -> synonyms (matched case-insensitively as substrings of the field name).
+# Generic words like 'number'/'번호' are left out: they occur in phone labels
+# too ('전화번호', 'Phone Number') and would tie with the specific synonym.
+FIELD_SYNONYMS = {
+    'name': ['name', '성명', 'full name', 'fullname', 'full_name', 'nome', 'nombre'],
+    'id_number': ['id', 'resident', '주민', 'registration', 'ssn'],
+    'address': ['address', 'resident address', '주소', 'addr', 'location'],
+    'phone': ['phone', 'phone number', 'tel', 'telephone', '전화', '연락처', 'mobile', 'contact'],
+}
+
+
+# Match ranks: synonym inside a word < a whole word of the label < the whole label
+SUBSTRING, WORD, LABEL = range(3)
+
+# Stripped from both ends of a label before the whole-label comparison ('성명:', '* Name')
+LABEL_PUNCTUATION = " \t\r\n:*.()[]"
+
+
+def _is_boundary(text, index):
+    """True when text[index] is outside the text or not a letter/digit"""
+    return index < 0 or index >= len(text) or not text[index].isalnum()
+
+
+class FieldMatcher:
+    """Synonym table compiled into a single scanning pattern"""
+
+    def __init__(self, synonyms=FIELD_SYNONYMS):
+        """
+        Args:
+            synonyms: Dict of JSON key -> list of synonyms; key order breaks ties
+        """
+        self.synonyms = synonyms
+        self.keys = {}  # synonym -> (JSON key, priority)
+        for priority, (json_key, words) in enumerate(synonyms.items()):
+            for word in words:
+                # A synonym listed under two keys belongs to the first one
+                self.keys.setdefault(word.casefold(), (json_key, priority))
+
+        # Longest alternatives first so each position reports its longest synonym;
+        # the lookahead makes matches zero-width, so overlapping synonyms are all seen
+        alternatives = sorted(self.keys, key=len, reverse=True)
+        self.pattern = re.compile("(?=(" + "|".join(map(re.escape, alternatives)) + "))")
+
+    def match(self, field_name):
+        """
+        Best JSON key for a field name or label
+
+        Returns:
+            JSON key, or None when no synonym occurs in the name
+        """
+        text = field_name.casefold()
+        label = text.strip(LABEL_PUNCTUATION)
+        best = None
+        best_rank = None
+        keys = self.keys
+        for m in self.pattern.finditer(text):
+            word = m.group(1)
+            json_key, priority = keys[word]
+            start, end = m.start(), m.start() + len(word)
+            if word == label:
+                tier = LABEL
+            elif _is_boundary(text, start - 1) and _is_boundary(text, end):
+                tier = WORD
+            else:
+                tier = SUBSTRING
+            rank = (tier, len(word), -priority)
+            if best_rank is None or rank > best_rank:
+                best, best_rank = json_key, rank
+        return best
+
+    def match_all(self, field_names):
+        """{field name: JSON key} for the names that match anything"""
+        matches = {}
+        for name in field_names:
+            json_key = self.match(name)
+            if json_key is not None:
+                matches[name] = json_key
+        return matches
+
+
+@lru_cache(maxsize=None)
+def get_matcher():
+    """Process-wide matcher for FIELD_SYNONYMS (compiled on first use)"""
+    return FieldMatcher()
+
+
+def main(argv=None):
+    names = sys.argv[1:] if argv is None else argv
+    if not names:
+        print("Usage: python field_matcher.py FIELD_NAME [FIELD_NAME ...]")
+        return 1
+
+    matcher = get_matcher()
+    for name in names:
+        json_key = matcher.match(name)
+        print(f"  {name:30s} → {json_key if json_key else '(no match)'}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,338 @@
+#!/usr/bin/env python3
+"""
+Field Previews - Clipped low-DPI rasters of the filled field regions
+
+The preview mode of the visual debug scripts, for reviewing alignment across
+many records without opening debug PDFs. Each record is filled with the
+config filler, and only the field regions (box plus a small margin) are
+rasterised with get_pixmap(clip=...) at a low DPI. Box outlines (coloured by
+alignment) and text baselines are drawn on top. The crops are stacked into
+one contact-sheet PNG per record.
+
+A crop only depends on the template, the region and the layout plans of the
+fields it shows, so renders are cached by template hash + layout plan in
+.cache/previews. A field counts as shown when its box reaches into the
+region, or when its text does: text that overflows its box can spill into
+a neighbour's crop. Records that repeat values, or rerunning a batch, skip
+filling and rasterising for every region that was seen before.
+
+Usage:
+    python field_previews.py                                  # inputs/test.json
+    python field_previews.py --batch records.jsonl --dpi 50   # one contact sheet per record
+    python populate_pdf_config_debug.py --preview --batch records.jsonl
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import time
+from functools import lru_cache
+
+try:
+    import pymupdf as fitz  # PyMuPDF
+except ImportError:  # PyMuPDF < 1.24
+    import fitz
+
+from instrumentation import METRICS, add_metrics_arguments, write_metrics
+from populate_pdf_config import (DATA_INPUT, FIELD_CONFIG, Filler, load_records, record_data,
+                                 record_id)
+from template_cache import template_hash
+from text_layout import ASCENT, DESCENT, plan_layout
+from text_metrics import get_text_width
+
+PREVIEW_CACHE_DIR = ".cache/previews"
+PREVIEW_CACHE_VERSION = 3
+PREVIEW_OUTPUT_DIR = "results/previews"
+
+DEFAULT_DPI = 50       # enough to judge alignment; a 4x25pt crop is ~170x20 px
+CLIP_MARGIN = 4        # pt around each box, so overflow and the outline stay visible
+MEMORY_ITEMS = 4096    # in-process crops kept besides the disk cache
+
+# Same colours as populate_pdf_config_debug.py
+ALIGNMENT_COLORS = {
+    'top': (1, 0, 0),       # Red
+    'middle': (0, 0, 1),    # Blue
+    'bottom': (0, 0.5, 0),  # Green
+}
+BASELINE_COLOR = (1, 0, 0)
+
+SHEET_PADDING = 6      # px between crops on the contact sheet
+CAPTION_HEIGHT = 11
+
+
+@lru_cache(maxsize=1024)
+def _text_strip(text, width, color=(0, 0, 0), fontsize=7):
+    """A line of text as an RGB pixmap (captions repeat across records, so they are memoized)"""
+    doc = fitz.open()
+    page = doc.new_page(width=width, height=CAPTION_HEIGHT)
+    page.insert_text(fitz.Point(0, 8), text, fontsize=fontsize, fontname="helv", color=color)
+    pix = page.get_pixmap(dpi=72)
+    doc.close()
+    return pix
+
+
+def _plan_summary(plan):
+    """The parts of a layout plan that change pixels"""
+    if plan is None:
+        return None
+    return [plan['fontsize'], plan['lines'], [list(p) for p in plan['positions']]]
+
+
+def _plan_extent(plan, fontname):
+    """Rect covering every line of a layout plan as drawn (None without a plan)"""
+    if plan is None:
+        return None
+    fontsize = plan['fontsize']
+    extent = fitz.Rect()
+    for line, (x, y) in zip(plan['lines'], plan['positions']):
+        extent |= fitz.Rect(x, y - ASCENT * fontsize, x + get_text_width(line, fontsize, fontname),
+                            y + DESCENT * fontsize)
+    return extent
+
+
+class PreviewRenderer:
+    """
+    Field-region previews for one field config
+
+    Usage:
+        renderer = PreviewRenderer("field_config.json", dpi=50)
+        png = renderer.contact_sheet(record, "record-001")
+    """
+
+    def __init__(self, config=FIELD_CONFIG, dpi=DEFAULT_DPI, margin=CLIP_MARGIN, guides=True,
+                 cache_dir=PREVIEW_CACHE_DIR):
+        """
+        Args:
+            config: Field config path or parsed dict
+            dpi: Raster resolution of the crops
+            margin: Points added around each box
+            guides: Draw box outlines and baselines
+            cache_dir: On-disk render cache (None = memory only)
+        """
+        # Previews show the fill, so the existing-text analysis is not needed
+        self.filler = Filler(config, detect_existing=False)
+        self.dpi = dpi
+        self.guides = guides
+        self.cache_dir = cache_dir
+        self._memory = {}
+
+        settings = self.filler.settings
+        # Everything outside the layout plans that changes a crop
+        self._base_key = [
+            PREVIEW_CACHE_VERSION, template_hash(self.filler.template_path), dpi, guides,
+            settings.get('default_fontname', 'helv'), settings.get('default_color', [0, 0, 0]),
+        ]
+
+        # One region per field; a region always shows the fields whose box reaches into it,
+        # and per record also those whose text does (see _region_key)
+        self.regions = []
+        for page_num, fields in self.filler.pages.items():
+            for field_def in fields:
+                box = field_def['box']
+                clip = fitz.Rect(box['x0'], box['y0'], box['x1'], box['y1']) + (-margin, -margin, margin, margin)
+                boxed = {other['id'] for other in fields
+                         if clip.intersects(fitz.Rect(other['box']['x0'], other['box']['y0'],
+                                                      other['box']['x1'], other['box']['y1']))}
+                self.regions.append({'field': field_def, 'page': page_num, 'clip': clip,
+                                     'boxed': boxed, 'page_fields': fields})
+
+    def _region_key(self, region, plans, extents):
+        """Cache key of a crop: every field whose box or drawn text intersects the clip"""
+        clip = region['clip']
+        shown = [field for field in region['page_fields']
+                 if field['id'] in region['boxed']
+                 or (extents[field['id']] is not None and clip.intersects(extents[field['id']]))]
+        payload = self._base_key + [
+            region['page'], list(clip),
+            [[list(field['layout_key']), _plan_summary(plans[field['id']])] for field in shown],
+        ]
+        return hashlib.sha256(json.dumps(payload, ensure_ascii=False).encode()).hexdigest()
+
+    def _cached(self, key):
+        png = self._memory.get(key)
+        if png is None and self.cache_dir:
+            try:
+                with open(os.path.join(self.cache_dir, f"{key}.png"), 'rb') as f:
+                    png = f.read()
+            except FileNotFoundError:
+                return None
+            self._remember(key, png)
+        return png
+
+    def _remember(self, key, png):
+        if len(self._memory) >= MEMORY_ITEMS:
+            del self._memory[next(iter(self._memory))]  # oldest first
+        self._memory[key] = png
+
+    def _store(self, key, png):
+        self._remember(key, png)
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            path = os.path.join(self.cache_dir, f"{key}.png")
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(png)
+            os.replace(tmp_path, path)
+
+    def _draw_guides(self, doc, plans):
+        """Box outlines in the alignment colour and a line under every text baseline"""
+        for page_num, fields in self.filler.pages.items():
+            shape = doc[page_num].new_shape()
+            for field_def in fields:
+                box = field_def['box']
+                color = ALIGNMENT_COLORS.get(field_def.get('alignment', 'middle'), (0, 0, 0))
+                shape.draw_rect(fitz.Rect(box['x0'], box['y0'], box['x1'], box['y1']))
+                shape.finish(color=color, width=1)
+                plan = plans[field_def['id']]
+                for _, y in (plan['positions'] if plan else ()):
+                    shape.draw_line(fitz.Point(box['x0'], y), fitz.Point(box['x1'], y))
+                    shape.finish(color=BASELINE_COLOR, width=0.5, dashes="[2 2]")
+            shape.commit()
+
+    def render(self, record):
+        """
+        Crops for every field region of a record
+
+        The record is only filled if at least one region is not cached.
+
+        Returns:
+            List of (field def, layout plan or None, PNG bytes), in page/config order
+        """
+        data = record_data(record)
+        plans = {}
+        extents = {}
+        for field_def in self.filler.fields:
+            text = data.get(field_def['json_key'], '')
+            plan = plans[field_def['id']] = plan_layout(field_def['layout_key'], text) if text else None
+            extents[field_def['id']] = _plan_extent(plan, field_def['layout_key'][3])
+
+        doc = None
+        crops = []
+        try:
+            for region in self.regions:
+                key = self._region_key(region, plans, extents)
+                png = self._cached(key)
+                if png is None:
+                    METRICS.count('preview_cache_misses')
+                    if doc is None:
+                        with METRICS.stage('preview_fill'):
+                            doc = self.filler.render(data)
+                            if self.guides:
+                                self._draw_guides(doc, plans)
+                    with METRICS.stage('preview_raster'):
+                        pix = doc[region['page']].get_pixmap(dpi=self.dpi, clip=region['clip'])
+                        png = pix.tobytes('png')
+                    self._store(key, png)
+                else:
+                    METRICS.count('preview_cache_hits')
+                crops.append((region['field'], plans[region['field']['id']], png))
+        finally:
+            if doc is not None:
+                doc.close()
+        return crops
+
+    def contact_sheet(self, record, title):
+        """
+        One PNG with every field crop of a record, each under a caption
+
+        The sheet is composed pixel for pixel from the crops. Captions are red
+        when the text overflows its box even at min_fontsize.
+        """
+        crops = self.render(record)
+
+        with METRICS.stage('contact_sheet'):
+            tiles = [fitz.Pixmap(png) for _, _, png in crops]
+            width = max([tile.width for tile in tiles] + [200]) + 2 * SHEET_PADDING
+            height = SHEET_PADDING + CAPTION_HEIGHT + sum(
+                CAPTION_HEIGHT + tile.height + SHEET_PADDING for tile in tiles)
+            strip_width = width - SHEET_PADDING
+
+            sheet = fitz.Pixmap(fitz.csRGB, fitz.IRect(0, 0, width, height), False)
+            sheet.clear_with(255)
+
+            def paste(pix, y):
+                pix.set_origin(SHEET_PADDING, y)
+                sheet.copy(pix, pix.irect)
+
+            y = SHEET_PADDING
+            paste(_text_strip(title, strip_width, fontsize=9), y)
+            y += CAPTION_HEIGHT
+
+            for (field_def, plan, _), tile in zip(crops, tiles):
+                if plan is None:
+                    caption, color = f"p{field_def.get('page', 1)} {field_def['id']}: no data", (0.5, 0.5, 0.5)
+                else:
+                    notes = [f"{plan['fontsize']}pt"]
+                    if plan['wrapped']:
+                        notes.append(f"{len(plan['lines'])} lines")
+                    if not plan['fits']:
+                        notes.append("OVERFLOW")
+                    caption = f"p{field_def.get('page', 1)} {field_def['id']}: {', '.join(notes)}"
+                    color = (0.8, 0, 0) if not plan['fits'] else (0, 0, 0)
+                paste(_text_strip(caption, strip_width, color), y)
+                y += CAPTION_HEIGHT
+                paste(tile, y)
+                y += tile.height + SHEET_PADDING
+
+            return sheet.tobytes('png')
+
+    def close(self):
+        self.filler.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Contact-sheet previews of the filled field regions")
+    parser.add_argument('--config', default=FIELD_CONFIG, help="Field configuration JSON")
+    parser.add_argument('--input', default=DATA_INPUT, help="Single input record")
+    parser.add_argument('--batch', metavar='RECORDS', help="JSON list or JSON Lines file of records")
+    parser.add_argument('--dpi', type=int, default=DEFAULT_DPI, help=f"Crop resolution (default: {DEFAULT_DPI})")
+    parser.add_argument('--margin', type=float, default=CLIP_MARGIN, help="Points around each box")
+    parser.add_argument('--no-guides', dest='guides', action='store_false',
+                        help="Plain crops, without box outlines and baselines")
+    parser.add_argument('--output-dir', default=PREVIEW_OUTPUT_DIR)
+    parser.add_argument('--cache-dir', default=PREVIEW_CACHE_DIR)
+    add_metrics_arguments(parser)
+    args = parser.parse_args(argv)
+
+    if args.batch:
+        records = load_records(args.batch)
+    else:
+        with open(args.input, 'r', encoding='utf-8') as f:
+            records = [json.load(f)]
+
+    start = time.perf_counter()
+    renderer = PreviewRenderer(args.config, args.dpi, args.margin, args.guides, args.cache_dir)
+    print(f"Template: {renderer.filler.template_path} ({len(renderer.regions)} field regions, {args.dpi} DPI)")
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    used_ids = set()
+    count = 0
+    for index, record in enumerate(records):
+        rid = record_id(record, index)
+        if rid in used_ids:
+            rid = f"{rid}_{index:06d}"
+        used_ids.add(rid)
+
+        path = os.path.join(args.output_dir, f"{rid}.png")
+        with open(path, 'wb') as f:
+            f.write(renderer.contact_sheet(record, rid))
+        count += 1
+        if count % 1000 == 0:
+            print(f"  ... {count} records")
+    renderer.close()
+
+    elapsed = time.perf_counter() - start
+    hits = METRICS.counters.get('preview_cache_hits', 0)
+    misses = METRICS.counters.get('preview_cache_misses', 0)
+    print(f"✓ {count} contact sheets in {args.output_dir}/ ({elapsed:.2f}s)")
+    if hits + misses:
+        print(f"  Render cache: {hits} hits, {misses} misses ({100.0 * hits / (hits + misses):.1f}% hit rate)")
+    if count == 1:
+        print(f"\n✅ Preview: {path}")
+
+    write_metrics(args, script='field_previews', dpi=args.dpi)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+"""
+Fill Service - Local asyncio HTTP service that keeps templates warm
+
+Loads each field config and its template once (a Filler per config), then
+fills JSON records posted over HTTP and answers with the PDF bytes. MuPDF
+work runs in a bounded process pool so the event loop only parses requests;
+at most max_pending requests are admitted, the rest get 503 + Retry-After.
+
+Endpoints:
+    POST /fill              fill with the default (first) config
+    POST /fill/<name>       fill with a named config
+    GET  /health            templates loaded
+    GET  /stats             queue depth, in-flight requests, latency percentiles and
+                            the fill stage timings of every worker (JSON)
+    GET  /metrics           the same in Prometheus text format
+
+Usage:
+    python fill_service.py --config field_config.json --workers 2
+    python fill_service.py --config a=form_a.json --config b=form_b.json --port 8765
+
+    curl -s -X POST --data @inputs/test.json localhost:8765/fill > filled.pdf
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from instrumentation import METRICS
+from populate_pdf_config import FIELD_CONFIG, Filler
+from save_profiles import DEFAULT_PROFILE, SAVE_PROFILES
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+MAX_BODY_BYTES = 1 << 20      # records are small JSON documents
+LATENCY_WINDOW = 1024         # recent requests used for latency percentiles
+
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+           413: 'Payload Too Large', 500: 'Internal Server Error', 503: 'Service Unavailable'}
+
+# Per-process fillers for pool workers, set once by _init_service_worker
+_service_fillers = {}
+# Pool workers send their METRICS back; the in-process thread already shares them
+_report_metrics = False
+
+
+def _init_service_worker(fillers, report_metrics=False):
+    global _report_metrics
+    _service_fillers.update(fillers)
+    _report_metrics = report_metrics
+
+
+def _service_fill(name, record):
+    """PDF bytes, plus the worker's metrics snapshot (None when filling in-process)"""
+    pdf_bytes = _service_fillers[name].fill(record)
+    return pdf_bytes, METRICS.drain() if _report_metrics else None
+
+
+class FillService:
+    """Warm Fillers, a bounded worker pool and the HTTP request handling"""
+
+    def __init__(self, configs, workers=2, max_pending=64, save_profile=DEFAULT_PROFILE,
+                 detect_existing=None):
+        """
+        Args:
+            configs: Dict of name -> field config path (first entry is the default)
+            workers: Fill processes; 0 fills in one background thread instead
+            max_pending: Requests admitted at once (queued + filling); more get 503
+            save_profile: Key of save_profiles.SAVE_PROFILES
+            detect_existing: Run the existing-text check (None = config setting)
+        """
+        self.fillers = {
+            name: Filler(path, save_profile=save_profile, detect_existing=detect_existing)
+            for name, path in configs.items()
+        }
+        self.default = next(iter(self.fillers))
+        self.max_pending = max_pending
+
+        if workers > 0:
+            self.executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_service_worker,
+                                                initargs=(self.fillers, True))
+            slots = workers
+        else:
+            # MuPDF is not thread-safe, so in-process filling uses a single thread
+            _init_service_worker(self.fillers)
+            self.executor = ThreadPoolExecutor(max_workers=1)
+            slots = 1
+        # Work handed to the executor at once; everything else waits here (queue depth)
+        self.slots = asyncio.Semaphore(slots)
+
+        self.pending = 0
+        self.queued = 0
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+
+    # -- filling ------------------------------------------------------------
+
+    async def fill(self, name, record):
+        """
+        Fill one record in the pool, waiting for a free slot first
+
+        The worker's stage timings (template_open, layout, insert, save) and
+        counters are merged into this process's METRICS, so /stats and
+        /metrics cover the whole fill.
+        """
+        loop = asyncio.get_running_loop()
+        queued_at = time.perf_counter()
+        self.queued += 1
+        try:
+            await self.slots.acquire()
+        finally:
+            self.queued -= 1
+        METRICS.add_time('queue_wait', time.perf_counter() - queued_at)
+
+        try:
+            with METRICS.stage('fill'):
+                pdf_bytes, snapshot = await loop.run_in_executor(self.executor, _service_fill, name, record)
+        finally:
+            self.slots.release()
+        if snapshot:
+            METRICS.merge(snapshot)
+        return pdf_bytes
+
+    def stats(self):
+        """Queue depth, in-flight requests and latency percentiles (ms)"""
+        ordered = sorted(self.latencies)
+        latency = {}
+        if ordered:
+            latency = {
+                'p50_ms': statistics.median(ordered) * 1000,
+                'p95_ms': ordered[int(0.95 * (len(ordered) - 1))] * 1000,
+                'max_ms': ordered[-1] * 1000,
+            }
+        return {
+            'templates': {name: filler.template_path for name, filler in self.fillers.items()},
+            'queue_depth': self.queued,
+            'in_flight': self.pending - self.queued,
+            'max_pending': self.max_pending,
+            'latency': latency,
+            'stages': METRICS.summary()['stages'],
+            'counters': dict(METRICS.counters),
+        }
+
+    def prometheus_text(self):
+        stats = self.stats()
+        lines = [
+            "# TYPE pdf_fill_queue_depth gauge",
+            f"pdf_fill_queue_depth {stats['queue_depth']}",
+            "# TYPE pdf_fill_in_flight gauge",
+            f"pdf_fill_in_flight {stats['in_flight']}",
+        ]
+        if stats['latency']:
+            lines.append("# TYPE pdf_fill_request_latency_seconds gauge")
+            for quantile, key in (('0.5', 'p50_ms'), ('0.95', 'p95_ms'), ('1', 'max_ms')):
+                lines.append(f'pdf_fill_request_latency_seconds{{quantile="{quantile}"}} '
+                             f"{stats['latency'][key] / 1000:.6f}")
+        return "\n".join(lines) + "\n" + METRICS.prometheus_text()
+
+    # -- HTTP ---------------------------------------------------------------
+
+    async def route(self, method, path, body):
+        """Return (status, content type, payload bytes)"""
+        if path == '/health':
+            return 200, 'application/json', json.dumps(
+                {'status': 'ok', 'templates': list(self.fillers)}).encode()
+        if path == '/stats':
+            return 200, 'application/json', json.dumps(self.stats(), indent=2).encode()
+        if path == '/metrics':
+            return 200, 'text/plain; version=0.0.4', self.prometheus_text().encode()
+
+        if path == '/fill' or path.startswith('/fill/'):
+            if method != 'POST':
+                return 405, 'text/plain', b"POST a JSON record\n"
+            name = path[len('/fill/'):] if path.startswith('/fill/') else ''
+            name = name or self.default
+            if name not in self.fillers:
+                return 404, 'text/plain', f"Unknown template: {name}\n".encode()
+            try:
+                record = json.loads(body)
+            except ValueError as e:
+                return 400, 'text/plain', f"Invalid JSON: {e}\n".encode()
+            if not isinstance(record, dict):
+                return 400, 'text/plain', b"Expected a JSON object\n"
+
+            if self.pending >= self.max_pending:
+                METRICS.count('requests_rejected')
+                return 503, 'text/plain', b"Busy, retry later\n"
+
+            start = time.perf_counter()
+            self.pending += 1
+            try:
+                pdf_bytes = await self.fill(name, record)
+            except Exception as e:  # report the failure, keep serving
+                METRICS.count('requests_failed')
+                return 500, 'text/plain', f"Fill failed: {e}\n".encode()
+            finally:
+                self.pending -= 1
+            self.latencies.append(time.perf_counter() - start)
+            METRICS.count('requests_filled')
+            return 200, 'application/pdf', pdf_bytes
+
+        return 404, 'text/plain', b"Not found\n"
+
+    async def handle(self, reader, writer):
+        """One connection; HTTP/1.1 keep-alive is honoured"""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                method, target, version = request_line.decode('latin-1').split()
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    key, _, value = line.decode('latin-1').partition(':')
+                    headers[key.strip().lower()] = value.strip()
+
+                length = int(headers.get('content-length', 0))
+                if length > MAX_BODY_BYTES:
+                    status, content_type, payload = 413, 'text/plain', b"Record too large\n"
+                    keep_alive = False
+                else:
+                    body = await reader.readexactly(length) if length else b''
+                    status, content_type, payload = await self.route(method, urlsplit(target).path, body)
+                    keep_alive = (version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close')
+
+                head = [
+                    f"HTTP/1.1 {status} {REASONS.get(status, '')}",
+                    f"Content-Type: {content_type}",
+                    f"Content-Length: {len(payload)}",
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}",
+                ]
+                if status == 503:
+                    head.append("Retry-After: 1")
+                writer.write(("\r\n".join(head) + "\r\n\r\n").encode('latin-1') + payload)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    def close(self):
+        self.executor.shutdown()
+        for filler in self.fillers.values():
+            filler.close()
+
+
+def parse_configs(values):
+    """--config values ('path' or 'name=path') -> ordered dict of name -> path"""
+    configs = {}
+    for value in values or [FIELD_CONFIG]:
+        name, sep, path = value.partition('=')
+        if not sep:
+            name, path = os.path.splitext(os.path.basename(value))[0], value
+        configs[name] = path
+    return configs
+
+
+async def serve(service, host=DEFAULT_HOST, port=DEFAULT_PORT):
+    server = await asyncio.start_server(service.handle, host, port)
+    print(f"🚀 Fill service on http://{host}:{port}")
+    for name, filler in service.fillers.items():
+        print(f"  {name}: {filler.template_path} ({len(filler.fields)} fields)")
+    async with server:
+        await server.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local PDF fill service")
+    parser.add_argument('--config', action='append', metavar='[NAME=]PATH',
+                        help=f"Field config to keep warm (repeatable; default: {FIELD_CONFIG})")
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--workers', type=int, default=2, help="Fill processes (0 = one in-process thread)")
+    parser.add_argument('--max-pending', type=int, default=64,
+                        help="Requests admitted at once before answering 503")
+    parser.add_argument('--save-profile', choices=sorted(SAVE_PROFILES), default=DEFAULT_PROFILE)
+    parser.add_argument('--no-detect', dest='detect_existing', action='store_false', default=None,
+                        help="Skip the existing-text check")
+    args = parser.parse_args(argv)
+
+    service = FillService(parse_configs(args.config), args.workers, args.max_pending,
+                          args.save_profile, args.detect_existing)
+    try:
+        asyncio.run(serve(service, args.host, args.port))
+    except KeyboardInterrupt:
+        print("\n✓ Stopped")
+    finally:
+        service.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -2,241 +2,333 @@
 """
 Find Surrounding Boxes - Automatically detect actual input boxes around text labels
 This helps find the correct box coordinates when the detected rectangles don't match form structure
+
+Every page of the template is searched for every label in one run. Labels are
+found with a single pass over the page's words (all labels compiled into one
+pattern), and input boxes with one top-to-bottom sweep over the labels and the
+rectangles, both sorted by their top edge. Pages missing from the template
+analysis cache are analysed in parallel.
+
+Usage:
+    python find_surrounding_boxes.py                                 # whole template, default labels
+    python find_surrounding_boxes.py other.pdf --labels labels.json  # {"성명": "Name", ...}
+    python find_surrounding_boxes.py --label 서명=Signature --workers 4
 """
 
+import argparse
 import json
-import pdfplumber
+import os
+import re
 from datetime import datetime
 
-PDF_PATH = "pdf/A0124_pages_1_to_4.pdf"
-
-def find_containing_box(label_position, all_rects, search_direction='right', max_distance=100):
-    """
-    Find the box that contains or is near a label
+from instrumentation import METRICS, add_metrics_arguments, write_metrics
+from template_cache import load_template_analysis
 
-    Args:
-        label_position: Dict with x0, x1, top, bottom of label
-        all_rects: List of all rectangles in the page
-        search_direction: 'right', 'left', 'below', 'above'
-        max_distance: Maximum distance to search
-
-    Returns:
-        Best matching rectangle or None
-    """
-    label_x = label_position['x0']
-    label_right = label_position['x1']
-    label_y = label_position['top']
-    label_bottom = label_position['bottom']
-
-    candidates = []
-
-    for rect in all_rects:
-        rect_x0 = rect['x0']
-        rect_x1 = rect['x1']
-        rect_y0 = rect['top']
-        rect_y1 = rect['bottom']
-
-        # Check if rectangle is in the search direction
-        if search_direction == 'right':
-            # Box should be to the right of label
-            if rect_x0 >= label_right:
-                # Check if roughly same Y level
-                y_overlap = not (rect_y1 < label_y or rect_y0 > label_bottom)
-                if y_overlap:
-                    distance = rect_x0 - label_right
-                    if distance <= max_distance:
-                        candidates.append({
-                            'rect': rect,
-                            'distance': distance,
-                            'score': 1.0 / (distance + 1)  # Closer is better
-                        })
-
-        elif search_direction == 'below':
-            # Box should be below label
-            if rect_y0 >= label_bottom:
-                # Check if roughly same X position
-                x_overlap = not (rect_x1 < label_x or rect_x0 > label_right)
-                if x_overlap:
-                    distance = rect_y0 - label_bottom
-                    if distance <= max_distance:
-                        candidates.append({
-                            'rect': rect,
-                            'distance': distance,
-                            'score': 1.0 / (distance + 1)
-                        })
+PDF_PATH = "pdf/A0124_pages_1_to_4.pdf"
 
+# Field labels to search for: label text on the form -> English field name
+FIELD_LABELS = {
+    '성명': 'Name',
+    '주민등록번호': 'ID Number',
+    '연락처': 'Contact',
+    '주소': 'Address'
+}
+
+RIGHT_DISTANCE = 50  # pt; most forms put the input box right of the label
+BELOW_DISTANCE = 30  # pt; vertical forms put it underneath
+MIN_BOX_WIDTH = 30   # pt; narrower/flatter rects are lines and borders
+MIN_BOX_HEIGHT = 10
+
+
+class LabelMatcher:
+    """All labels compiled into one pattern; finds every label inside a word's text"""
+
+    def __init__(self, labels):
+        self.labels = list(labels)
+        # Longest first, zero-width lookahead: overlapping labels are all reported
+        alternatives = sorted(self.labels, key=len, reverse=True)
+        self.pattern = re.compile("(?=(" + "|".join(map(re.escape, alternatives)) + "))")
+        # A position reports only its longest label, so shorter labels it starts with ride along
+        self.prefixes = {label: [other for other in alternatives if label.startswith(other)]
+                         for label in self.labels}
+
+    def find(self, text):
+        found = []
+        for m in self.pattern.finditer(text):
+            for label in self.prefixes[m.group(1)]:
+                if label not in found:
+                    found.append(label)
+        return found
+
+
+def find_labels(words, matcher):
+    """First word (in page order) containing each label: {label: word}"""
+    hits = {}
+    for word in words:
+        for label in matcher.find(word['text']):
+            hits.setdefault(label, word)
+        if len(hits) == len(matcher.labels):
+            break
+    return hits
+
+
+def _pick_box(candidates):
+    """Closest rect that is big enough to be an input box, else the closest one"""
     if not candidates:
         return None
+    candidates.sort(key=lambda c: (c[0], c[1]))
+    for _, _, rect in candidates:
+        if (rect['x1'] - rect['x0']) > MIN_BOX_WIDTH and (rect['bottom'] - rect['top']) > MIN_BOX_HEIGHT:
+            return rect
+    return candidates[0][2]
 
-    # Return the closest box with reasonable size
-    candidates.sort(key=lambda c: -c['score'])
-
-    # Filter out tiny boxes (likely lines/borders)
-    good_candidates = [c for c in candidates if
-                      (c['rect']['x1'] - c['rect']['x0']) > 30 and  # Width > 30pt
-                      (c['rect']['bottom'] - c['rect']['top']) > 10]  # Height > 10pt
 
-    if good_candidates:
-        return good_candidates[0]['rect']
-    elif candidates:
-        return candidates[0]['rect']
+def sweep_boxes(label_hits, rects):
+    """
+    Input box candidates right of and below every label, in one sweep over y
 
-    return None
+    Labels and rects are visited in order of their top edge. A rect joins the
+    active set once the sweep line reaches it and leaves once it ends above the
+    current label, so each label is only compared with the rects around its row.
 
-print("="*80)
-print(" Surrounding Box Detector - Find Actual Input Boxes")
-print("="*80)
-print(f"\nAnalyzing: {PDF_PATH}\n")
+    Args:
+        label_hits: {label: word dict}
+        rects: Page rectangles (dicts with x0, x1, top, bottom)
 
-with pdfplumber.open(PDF_PATH) as pdf:
-    page = pdf.pages[0]
-    words = page.extract_words()
-    rects = page.rects if hasattr(page, 'rects') else []
+    Returns:
+        {label: (box to the right or None, box below or None)}
+    """
+    order = sorted(range(len(rects)), key=lambda i: rects[i]['top'])
+    next_rect = 0
+    active = []
+    found = {}
+
+    for label, word in sorted(label_hits.items(), key=lambda item: item[1]['top']):
+        x0, x1, top, bottom = word['x0'], word['x1'], word['top'], word['bottom']
+
+        while next_rect < len(order) and rects[order[next_rect]]['top'] <= bottom + BELOW_DISTANCE:
+            active.append(order[next_rect])
+            next_rect += 1
+        # Labels come in top order, so a rect ending above this one is done for good
+        active = [i for i in active if rects[i]['bottom'] >= top]
+
+        right, below = [], []
+        for i in active:
+            rect = rects[i]
+            if rect['top'] <= bottom:
+                distance = rect['x0'] - x1
+                if 0 <= distance <= RIGHT_DISTANCE:
+                    right.append((distance, i, rect))
+            if rect['bottom'] >= bottom and rect['x1'] >= x0 and rect['x0'] <= x1:
+                distance = rect['top'] - bottom
+                if 0 <= distance <= BELOW_DISTANCE:
+                    below.append((distance, i, rect))
+
+        found[label] = (_pick_box(right), _pick_box(below))
+    return found
+
+
+def detect_page(page, labels, matcher):
+    """
+    Detections for one analysed page
 
-    print(f"Found {len(words)} words and {len(rects)} rectangles\n")
+    Args:
+        page: Template cache page dict (words, rects, page)
+        labels: {label: English field name}
+        matcher: LabelMatcher over the labels
 
-    # Field labels to search for
-    field_labels = {
-        '성명': 'Name',
-        '주민등록번호': 'ID Number',
-        '연락처': 'Contact',
-        '주소': 'Address'
-    }
+    Returns:
+        (result dicts in label order, labels found on the page without an input box)
+    """
+    label_hits = find_labels(page['words'], matcher)
+    boxes = sweep_boxes(label_hits, page['rects'])
 
     results = []
-
-    for korean_label, english_label in field_labels.items():
-        print("="*80)
-        print(f"Searching for: {korean_label} ({english_label})")
-        print("="*80)
-
-        # Find the label
-        label_word = None
-        for word in words:
-            if korean_label in word['text']:
-                label_word = word
-                break
-
-        if not label_word:
-            print(f"  ❌ Label not found\n")
+    boxless = []
+    for label, english_label in labels.items():
+        if label not in label_hits:
             continue
+        label_word = label_hits[label]
+        box_right, box_below = boxes[label]
 
-        print(f"\n  Label position:")
-        print(f"    x={label_word['x0']:.1f}-{label_word['x1']:.1f}, y={label_word['top']:.1f}-{label_word['bottom']:.1f}")
-
-        # Try different search strategies
-        print(f"\n  Searching for input box...")
-
-        # Strategy 1: Look right (most common for horizontal forms)
-        box_right = find_containing_box(label_word, rects, 'right', max_distance=50)
-
-        # Strategy 2: Look below (for vertical forms)
-        box_below = find_containing_box(label_word, rects, 'below', max_distance=30)
-
-        # Choose best box
-        best_box = None
-        strategy = None
-
+        # Choose best box: the wider one wins
         if box_right and (not box_below or
                           (box_right['x1'] - box_right['x0']) > (box_below['x1'] - box_below['x0'])):
-            best_box = box_right
-            strategy = "to the right"
+            best_box, strategy = box_right, "to the right"
         elif box_below:
-            best_box = box_below
-            strategy = "below"
-
-        if best_box:
-            width = best_box['x1'] - best_box['x0']
-            height = best_box['bottom'] - best_box['top']
-
-            print(f"  ✓ Found input box {strategy}:")
-            print(f"    x={best_box['x0']:.1f}-{best_box['x1']:.1f} (width={width:.1f}pt)")
-            print(f"    y={best_box['top']:.1f}-{best_box['bottom']:.1f} (height={height:.1f}pt)")
-
-            # Calculate recommended offset from currently configured box
-            # (Assume current config uses the detected rectangle at label position)
-            current_y = label_word['top']  # Approximate
-            new_y_top = best_box['top']
-            recommended_offset_y = new_y_top - current_y
-
-            print(f"  💡 Recommended offset_y: {recommended_offset_y:.1f} pts")
-
-            result = {
-                'field_korean': korean_label,
-                'field_english': english_label,
-                'label': {
-                    'x0': label_word['x0'],
-                    'x1': label_word['x1'],
-                    'y0': label_word['top'],
-                    'y1': label_word['bottom']
-                },
-                'input_box': {
-                    'x0': best_box['x0'],
-                    'x1': best_box['x1'],
-                    'y0': best_box['top'],
-                    'y1': best_box['bottom'],
-                    'width': width,
-                    'height': height
-                },
-                'recommended_offset_y': round(recommended_offset_y, 1),
-                'strategy': strategy
-            }
-            results.append(result)
+            best_box, strategy = box_below, "below"
         else:
-            print(f"  ❌ No suitable input box found")
-
-        print()
-
-# Create summary table
-print("\n" + "="*80)
-print(" SUMMARY - Recommended Field Configuration")
-print("="*80)
-
-print("\n┌────────────────────┬─────────────────────────────┬──────────────┐")
-print("│ Field              │ Input Box (x,y → x,y)       │ Offset Y     │")
-print("├────────────────────┼─────────────────────────────┼──────────────┤")
-for result in results:
-    field = result['field_english']
-    box = result['input_box']
-    offset = result['recommended_offset_y']
-    print(f"│ {field:18s} │ ({box['x0']:5.1f},{box['y0']:5.1f} → {box['x1']:5.1f},{box['y1']:5.1f}) │ {offset:+6.1f} pts  │")
-print("└────────────────────┴─────────────────────────────┴──────────────┘")
-
-# Generate updated config
-print("\n" + "="*80)
-print(" SUGGESTED CONFIG UPDATES")
-print("="*80)
-
-print("\nAdd these to your field_config.json:\n")
-for result in results:
-    box = result['input_box']
-    print(f"// {result['field_english']}")
-    print(f'{{"')
-    print(f'  "id": "{result["field_english"].lower().replace(" ", "_")}",')
-    print(f'  "box": {{')
-    print(f'    "x0": {box["x0"]},')
-    print(f'    "x1": {box["x1"]},')
-    print(f'    "y0": {box["y0"]},')
-    print(f'    "y1": {box["y1"]}')
-    print(f'  }},')
-    print(f'  "offset_y": {result["recommended_offset_y"]},  // To align with actual input area')
-    print(f'  ...')
-    print(f'}},\n')
-
-# Save detailed report
-output_file = f'results/surrounding_boxes_{datetime.now().strftime("%Y%m%d_%H%M%S")}.json'
-with open(output_file, 'w', encoding='utf-8') as f:
-    json.dump({
-        'pdf_file': PDF_PATH,
-        'analysis_date': datetime.now().isoformat(),
-        'fields': results
-    }, f, indent=2, ensure_ascii=False)
-
-print("\n" + "="*80)
-print(f"✅ Detailed analysis saved to: {output_file}")
-print("="*80)
-print("\nNext steps:")
-print("  1. Review the recommended offset_y values above")
-print("  2. Update field_config.json with the offset_y values")
-print("  3. Or use the detected box coordinates directly")
-print("  4. Run populate_pdf_config.py to test")
+            METRICS.count('boxes_missing')
+            boxless.append(label)
+            continue
+        METRICS.count('boxes_found')
+
+        # Offset from the label top (the config box usually starts at the label row)
+        width = best_box['x1'] - best_box['x0']
+        height = best_box['bottom'] - best_box['top']
+        results.append({
+            'page': page['page'] + 1,
+            'field_korean': label,
+            'field_english': english_label,
+            'label': {
+                'x0': label_word['x0'],
+                'x1': label_word['x1'],
+                'y0': label_word['top'],
+                'y1': label_word['bottom']
+            },
+            'input_box': {
+                'x0': best_box['x0'],
+                'x1': best_box['x1'],
+                'y0': best_box['top'],
+                'y1': best_box['bottom'],
+                'width': width,
+                'height': height
+            },
+            'recommended_offset_y': round(best_box['top'] - label_word['top'], 1),
+            'strategy': strategy
+        })
+    return results, boxless
+
+
+def detect_boxes(pdf_path=PDF_PATH, labels=FIELD_LABELS, workers=None):
+    """
+    Detect input boxes for every label on every page
+
+    Args:
+        pdf_path: Template PDF
+        labels: {label text: English field name}
+        workers: Processes for analysing uncached pages (None = CPU count)
+
+    Returns:
+        (results ordered by page then label,
+         labels not found on any page,
+         [{'page', 'field_korean', 'field_english'}] for labels found without an input box)
+    """
+    workers = workers or os.cpu_count() or 1
+    with METRICS.stage('load_analysis'):
+        analysis = load_template_analysis(pdf_path, workers=workers)
+
+    matcher = LabelMatcher(labels)
+    results = []
+    boxes_missing = []
+    with METRICS.stage('box_search'):
+        for key in sorted(analysis['pages'], key=int):
+            page_results, boxless = detect_page(analysis['pages'][key], labels, matcher)
+            results.extend(page_results)
+            boxes_missing.extend({'page': int(key) + 1, 'field_korean': label, 'field_english': labels[label]}
+                                 for label in boxless)
+
+    found = {result['field_korean'] for result in results} | {item['field_korean'] for item in boxes_missing}
+    missing = [label for label in labels if label not in found]
+    METRICS.count('labels_found', len(found))
+    METRICS.count('labels_missing', len(missing))
+    return results, missing, boxes_missing
+
+
+def load_labels(args):
+    """--labels file (or the default labels), plus any --label additions"""
+    if args.labels:
+        with open(args.labels, 'r', encoding='utf-8') as f:
+            labels = json.load(f)
+    else:
+        labels = dict(FIELD_LABELS)
+    for value in args.label or []:
+        label, _, english = value.partition('=')
+        labels[label] = english or label
+    return labels
+
+
+def print_report(results, missing, boxes_missing=()):
+    # Create summary table
+    print("\n" + "="*80)
+    print(" SUMMARY - Recommended Field Configuration")
+    print("="*80)
+
+    print("\n┌──────┬────────────────────┬─────────────────────────────┬──────────────┬──────────┐")
+    print("│ Page │ Field              │ Input Box (x,y → x,y)       │ Offset Y     │ Strategy │")
+    print("├──────┼────────────────────┼─────────────────────────────┼──────────────┼──────────┤")
+    for result in results:
+        field = result['field_english']
+        box = result['input_box']
+        offset = result['recommended_offset_y']
+        strategy = 'right' if result['strategy'] == "to the right" else 'below'
+        print(f"│ {result['page']:4d} │ {field:18s} │ ({box['x0']:5.1f},{box['y0']:5.1f} → {box['x1']:5.1f},{box['y1']:5.1f}) "
+              f"│ {offset:+6.1f} pts  │ {strategy:8s} │")
+    print("└──────┴────────────────────┴─────────────────────────────┴──────────────┴──────────┘")
+
+    for item in boxes_missing:
+        print(f"  ❌ No suitable input box found: {item['field_korean']} (page {item['page']})")
+    for label in missing:
+        print(f"  ❌ Label not found on any page: {label}")
+
+    # Generate updated config
+    print("\n" + "="*80)
+    print(" SUGGESTED CONFIG UPDATES")
+    print("="*80)
+
+    print("\nAdd these to your field_config.json:\n")
+    for result in results:
+        box = result['input_box']
+        print(f"// {result['field_english']} (page {result['page']})")
+        print(f'{{"')
+        print(f'  "id": "{result["field_english"].lower().replace(" ", "_")}",')
+        print(f'  "box": {{')
+        print(f'    "x0": {box["x0"]},')
+        print(f'    "x1": {box["x1"]},')
+        print(f'    "y0": {box["y0"]},')
+        print(f'    "y1": {box["y1"]}')
+        print(f'  }},')
+        print(f'  "offset_y": {result["recommended_offset_y"]},  // To align with actual input area')
+        print(f'  ...')
+        print(f'}},\n')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Detect input boxes around field labels on every page")
+    parser.add_argument('pdf', nargs='?', default=PDF_PATH, help=f"Template PDF (default: {PDF_PATH})")
+    parser.add_argument('--labels', metavar='PATH', help="JSON file of {label: English name}")
+    parser.add_argument('--label', action='append', metavar='LABEL[=NAME]', help="Additional label (repeatable)")
+    parser.add_argument('--workers', type=int, help="Processes for analysing uncached pages (default: CPU count)")
+    parser.add_argument('--output', help="Report path (default: results/surrounding_boxes_TIMESTAMP.json)")
+    add_metrics_arguments(parser)
+    args = parser.parse_args(argv)
+
+    labels = load_labels(args)
+
+    print("="*80)
+    print(" Surrounding Box Detector - Find Actual Input Boxes")
+    print("="*80)
+    print(f"\nAnalyzing: {args.pdf} ({len(labels)} labels, all pages)\n")
+
+    results, missing, boxes_missing = detect_boxes(args.pdf, labels, args.workers)
+    print(f"Found {len(results)} input boxes")
+
+    print_report(results, missing, boxes_missing)
+
+    # Save detailed report
+    output_file = args.output or f'results/surrounding_boxes_{datetime.now().strftime("%Y%m%d_%H%M%S")}.json'
+    os.makedirs(os.path.dirname(output_file) or '.', exist_ok=True)
+    with open(output_file, 'w', encoding='utf-8') as f:
+        json.dump({
+            'pdf_file': args.pdf,
+            'analysis_date': datetime.now().isoformat(),
+            'labels': labels,
+            'labels_missing': missing,
+            'boxes_missing': boxes_missing,
+            'fields': results
+        }, f, indent=2, ensure_ascii=False)
+
+    print("\n" + "="*80)
+    print(f"✅ Detailed analysis saved to: {output_file}")
+    print("="*80)
+    print("\nNext steps:")
+    print("  1. Review the recommended offset_y values above")
+    print("  2. Update field_config.json with the offset_y values")
+    print("  3. Or generate the whole config: python config_generator.py -o field_config.json")
+    print("  4. Run populate_pdf_config.py to test")
+
+    write_metrics(args, script='find_surrounding_boxes', pdf_file=args.pdf)
+
+
+if __name__ == "__main__":
+    main()
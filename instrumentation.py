@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Instrumentation - Stage timings and event counters for a run
+
+A process-wide registry (METRICS) collects how long each stage took and
+how often things happened (fields filled, fonts shrunk, overflows, cache
+hits). At the end of a run it can be written as a JSON summary or in the
+Prometheus text exposition format (e.g. for the node_exporter textfile
+collector), so production runs show where time goes without a profiler.
+
+Usage:
+    from instrumentation import METRICS
+
+    with METRICS.stage('template_open'):
+        doc = fitz.open(path)
+    METRICS.count('font_shrink')
+
+    METRICS.write_json('results/metrics.json')
+    METRICS.write_prometheus('results/metrics.prom')
+
+Worker processes send METRICS.drain() back with their results and the
+parent folds it in with METRICS.merge().
+
+Scripts write their metrics with --metrics / --metrics-prom, or into
+$PDF_METRICS_DIR when that environment variable is set.
+"""
+
+import json
+import os
+import re
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+PROMETHEUS_PREFIX = "pdf_fill"
+METRICS_DIR_ENV = "PDF_METRICS_DIR"
+
+
+class Metrics:
+    """Stage durations and counters for one process"""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.started = time.time()
+        self.stages = {}    # name -> [count, total seconds, max seconds]
+        self.counters = {}  # name -> value
+
+    @contextmanager
+    def stage(self, name):
+        """Time a block of code as one occurrence of a stage"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - start)
+
+    def add_time(self, name, seconds, count=1):
+        entry = self.stages.get(name)
+        if entry is None:
+            self.stages[name] = [count, seconds, seconds]
+        else:
+            entry[0] += count
+            entry[1] += seconds
+            if seconds > entry[2]:
+                entry[2] = seconds
+
+    def count(self, name, value=1):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def set(self, name, value):
+        """Record an absolute value (e.g. cache hits reported by lru_cache)"""
+        self.counters[name] = value
+
+    def snapshot(self):
+        """Plain-dict copy that can be pickled to the parent process"""
+        return {
+            'stages': {name: list(entry) for name, entry in self.stages.items()},
+            'counters': dict(self.counters),
+        }
+
+    def drain(self):
+        """Snapshot and reset, so repeated reports from a worker never double count"""
+        snap = self.snapshot()
+        self.reset()
+        return snap
+
+    def merge(self, snap):
+        """Fold a snapshot from another process into this registry"""
+        for name, (count, total, longest) in snap['stages'].items():
+            entry = self.stages.setdefault(name, [0, 0.0, 0.0])
+            entry[0] += count
+            entry[1] += total
+            entry[2] = max(entry[2], longest)
+        for name, value in snap['counters'].items():
+            self.count(name, value)
+
+    def summary(self, **info):
+        """JSON-ready summary of the run; info is stored alongside (e.g. mode, records)"""
+        return {
+            'run_started': datetime.fromtimestamp(self.started).isoformat(),
+            'run_seconds': time.time() - self.started,
+            **info,
+            'stages': {
+                name: {
+                    'count': count,
+                    'total_seconds': total,
+                    'mean_ms': total / count * 1000 if count else 0.0,
+                    'max_ms': longest * 1000,
+                }
+                for name, (count, total, longest) in sorted(self.stages.items())
+            },
+            'counters': dict(sorted(self.counters.items())),
+        }
+
+    def prometheus_text(self, prefix=PROMETHEUS_PREFIX):
+        """Prometheus text exposition format"""
+        lines = [
+            f"# HELP {prefix}_stage_seconds Time spent per pipeline stage",
+            f"# TYPE {prefix}_stage_seconds summary",
+        ]
+        for name, (count, total, _) in sorted(self.stages.items()):
+            lines.append(f'{prefix}_stage_seconds_sum{{stage="{name}"}} {total:.6f}')
+            lines.append(f'{prefix}_stage_seconds_count{{stage="{name}"}} {count}')
+
+        lines += [
+            f"# HELP {prefix}_stage_max_seconds Longest single occurrence of a stage",
+            f"# TYPE {prefix}_stage_max_seconds gauge",
+        ]
+        for name, (_, _, longest) in sorted(self.stages.items()):
+            lines.append(f'{prefix}_stage_max_seconds{{stage="{name}"}} {longest:.6f}')
+
+        for name, value in sorted(self.counters.items()):
+            metric = f"{prefix}_{re.sub(r'[^a-zA-Z0-9_]', '_', name)}_total"
+            lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric} {value}")
+
+        return "\n".join(lines) + "\n"
+
+    def write_json(self, path, **info):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.summary(**info), f, indent=2, ensure_ascii=False)
+
+    def write_prometheus(self, path, prefix=PROMETHEUS_PREFIX):
+        # Write-then-rename so a scraping textfile collector never reads half a file
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(self.prometheus_text(prefix))
+        os.replace(tmp_path, path)
+
+
+# Process-wide registry used by the filler, detectors and Textract helpers
+METRICS = Metrics()
+
+
+def add_metrics_arguments(parser):
+    """Add the --metrics / --metrics-prom output options to a script's argparse parser"""
+    parser.add_argument('--metrics', metavar='PATH', help="Write a JSON timing/counter summary of the run")
+    parser.add_argument('--metrics-prom', metavar='PATH',
+                        help="Write the run's metrics in Prometheus text format")
+
+
+def write_metrics(args=None, script=None, log=sys.stdout, **info):
+    """
+    Write the run's metrics where the command line or environment asks for them
+
+    --metrics / --metrics-prom take precedence. Otherwise, if $PDF_METRICS_DIR
+    is set, both files are written there as <script>.json and <script>.prom
+    (this is how the scripts without a command line are instrumented).
+    """
+    json_path = getattr(args, 'metrics', None)
+    prom_path = getattr(args, 'metrics_prom', None)
+    metrics_dir = os.environ.get(METRICS_DIR_ENV)
+    if not (json_path or prom_path) and metrics_dir and script:
+        json_path = os.path.join(metrics_dir, f"{script}.json")
+        prom_path = os.path.join(metrics_dir, f"{script}.prom")
+
+    if json_path:
+        METRICS.write_json(json_path, script=script, **info)
+        print(f"📈 Metrics: {json_path}", file=log)
+    if prom_path:
+        METRICS.write_prometheus(prom_path)
+        print(f"📈 Prometheus metrics: {prom_path}", file=log)
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Output Sinks - Where batch-filled PDFs are written
+
+DirectorySink writes one file per record (the default). ZipSink and TarSink
+stream each PDF into a single archive as soon as it is produced, so large
+batches don't create thousands of loose files and never hold more than one
+document in memory. Both archive sinks can write to stdout ('-') to pipe a
+batch straight into storage:
+
+    python populate_pdf_config.py --batch records.jsonl --archive - | aws s3 cp - s3://bucket/batch.zip
+
+A stdout sink first sends PyMuPDF's messages (MuPDF errors, deprecation
+notices) to stderr, in this process and in worker processes started later,
+so nothing but the archive reaches stdout.
+"""
+
+import io
+import os
+import sys
+import tarfile
+import time
+import zipfile
+
+
+def _stdout_binary():
+    """Binary stdout for an archive, with PyMuPDF's messages routed to stderr first"""
+    # Read when pymupdf is imported, e.g. by spawned workers
+    os.environ['PYMUPDF_MESSAGE'] = 'fd:2'
+    pymupdf = sys.modules.get('pymupdf')
+    if pymupdf is not None and hasattr(pymupdf, 'set_messages'):
+        pymupdf.set_messages(fd=2)
+    return sys.stdout.buffer
+
+
+class DirectorySink:
+    """One file per document in a directory"""
+
+    to_stdout = False
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def path_for(self, name):
+        return os.path.join(self.directory, name)
+
+    def write(self, name, data):
+        path = self.path_for(name)
+        with open(path, 'wb') as f:
+            f.write(data)
+        return path
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ZipSink:
+    """
+    Stream documents into a ZIP archive
+
+    PDFs produced with deflate=True are already compressed, so members are
+    stored rather than deflated again. Non-seekable targets (stdout, pipes)
+    are supported by zipfile's streaming data descriptors.
+    """
+
+    directory = None
+
+    def __init__(self, target):
+        self.to_stdout = target == '-'
+        self._file = _stdout_binary() if self.to_stdout else open(target, 'wb')
+        self._zip = zipfile.ZipFile(self._file, mode='w', compression=zipfile.ZIP_STORED)
+
+    def write(self, name, data):
+        info = zipfile.ZipInfo(name, date_time=time.localtime()[:6])
+        info.compress_type = zipfile.ZIP_STORED
+        self._zip.writestr(info, data)
+        return name
+
+    def close(self):
+        self._zip.close()
+        if self.to_stdout:
+            self._file.flush()
+        else:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class TarSink:
+    """Stream documents into a tar archive (optionally gzip-compressed)"""
+
+    directory = None
+
+    def __init__(self, target, compression=''):
+        self.to_stdout = target == '-'
+        mode = f"w|{compression}"  # '|' = pure streaming, never seeks
+        if self.to_stdout:
+            self._tar = tarfile.open(fileobj=_stdout_binary(), mode=mode)
+        else:
+            self._tar = tarfile.open(target, mode=mode)
+
+    def write(self, name, data):
+        info = tarfile.TarInfo(name)
+        info.size = len(data)
+        info.mtime = int(time.time())
+        info.mode = 0o644
+        self._tar.addfile(info, io.BytesIO(data))
+        return name
+
+    def close(self):
+        self._tar.close()
+        if self.to_stdout:
+            sys.stdout.buffer.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+ARCHIVE_FORMATS = ('zip', 'tar', 'tgz')
+
+
+def open_archive_sink(target, archive_format=None):
+    """
+    Open a ZIP/tar sink for a path or '-' (stdout)
+
+    The format is taken from archive_format, else from the file extension,
+    else defaults to zip.
+    """
+    if archive_format is None:
+        lowered = target.lower()
+        if lowered.endswith(('.tar.gz', '.tgz')):
+            archive_format = 'tgz'
+        elif lowered.endswith('.tar'):
+            archive_format = 'tar'
+        else:
+            archive_format = 'zip'
+
+    if archive_format == 'zip':
+        return ZipSink(target)
+    if archive_format == 'tar':
+        return TarSink(target)
+    if archive_format == 'tgz':
+        return TarSink(target, compression='gz')
+    raise ValueError(f"Unknown archive format: {archive_format} (expected one of {ARCHIVE_FORMATS})")
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+PDF Tools CLI - One entry point for the fill, detection and benchmark tools
+
+Each subcommand imports its backend only when it runs, so `fill` never
+loads pdfplumber/pdfminer or pypdf, and `--help` loads none of them.
+
+Usage:
+    python pdf_cli.py fill [populate_pdf_config.py options]      # e.g. --batch records.jsonl --no-detect
+    python pdf_cli.py boxes [PDF] [--label 서명=Signature]       # find_surrounding_boxes.py
+    python pdf_cli.py config [PDF] [-o field_config.json]       # config_generator.py
+    python pdf_cli.py form FORM.pdf [--appearances viewer]      # form_filler.py (fillable PDFs)
+    python pdf_cli.py preview [--batch records.jsonl] [--dpi 50] # field_previews.py contact sheets
+    python pdf_cli.py compare [PDF] [--repeat 3]                # compare_frameworks.py
+    python pdf_cli.py cache [PDF] [--backend pdfplumber]        # warm the template analysis cache
+    python pdf_cli.py save-profiles [options]                   # save_profiles.py benchmark
+    python pdf_cli.py bench run|compare [options]               # benchmark_fill.py
+    python pdf_cli.py serve [--config PATH] [--workers 2]       # fill_service.py
+    python pdf_cli.py startup [--repeat 5]                      # startup-time benchmark
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+HEAVY_MODULES = ('fitz', 'pymupdf', 'pdfplumber', 'pdfminer', 'pypdf')
+
+
+def _run_main(module, argv):
+    """Import a module with a main(argv) and run it"""
+    return __import__(module).main(argv)
+
+
+# name -> (runner, module, help)
+COMMANDS = {
+    'fill': (_run_main, 'populate_pdf_config', "Fill one record or a batch from field_config.json"),
+    'boxes': (_run_main, 'find_surrounding_boxes', "Detect input boxes around field labels (all pages)"),
+    'config': (_run_main, 'config_generator', "Generate a field config from box detection"),
+    'form': (_run_main, 'form_filler', "Fill a fillable (AcroForm) PDF through its field-name index"),
+    'preview': (_run_main, 'field_previews', "PNG contact sheets of the filled field regions"),
+    'compare': (_run_main, 'compare_frameworks', "Benchmark PyMuPDF / pypdf / pdfplumber extraction"),
+    'cache': (_run_main, 'template_cache', "Warm the template analysis cache"),
+    'save-profiles': (_run_main, 'save_profiles', "Benchmark the PDF save profiles"),
+    'bench': (_run_main, 'benchmark_fill', "Fill pipeline benchmark and regression gate"),
+    'serve': (_run_main, 'fill_service', "HTTP fill service with warm templates"),
+}
+
+# Startup scenarios: name -> argv after the interpreter
+STARTUP_SCENARIOS = {
+    'python': ['-c', 'pass'],
+    'cli --help': ['pdf_cli.py', '--help'],
+    'fill --help': ['pdf_cli.py', 'fill', '--help'],
+}
+
+
+def _modules_loaded_by(code):
+    """Heavy modules present in sys.modules after running code in a fresh interpreter"""
+    probe = f"{code}\nimport sys, json\nprint(json.dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules]))"
+    result = subprocess.run([sys.executable, '-c', probe], capture_output=True, text=True,
+                            cwd=os.path.dirname(os.path.abspath(__file__)))
+    if result.returncode != 0:
+        return None
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def startup_benchmark(repeat=5, config=None):
+    """
+    Wall time of fresh interpreter starts, and which heavy backends each path loads
+
+    Args:
+        repeat: Runs per scenario (median is reported)
+        config: Field config for the 'fill --no-detect' scenario (default: field_config.json)
+
+    Returns:
+        Report dict
+    """
+    here = os.path.dirname(os.path.abspath(__file__))
+    scenarios = dict(STARTUP_SCENARIOS)
+
+    timings = {}
+    with tempfile.TemporaryDirectory(prefix="pdf_cli_startup_") as tmp:
+        scenarios['fill --no-detect'] = (['pdf_cli.py', 'fill', '--no-detect',
+                                          '--output', os.path.join(tmp, 'out.pdf')]
+                                         + (['--config', config] if config else []))
+        for name, argv in scenarios.items():
+            samples = []
+            ok = True
+            for _ in range(repeat):
+                start = time.perf_counter()
+                result = subprocess.run([sys.executable] + argv, cwd=here,
+                                        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+                samples.append(time.perf_counter() - start)
+                ok = ok and result.returncode == 0
+            timings[name] = {'median_ms': statistics.median(samples) * 1000, 'ok': ok}
+
+    fill_probe = ("from populate_pdf_config import Filler\n"
+                  f"Filler({config or 'field_config.json'!r}, detect_existing=False).fill({{}})")
+    imports = {
+        'pdf_cli': _modules_loaded_by("import pdf_cli"),
+        'populate_pdf_config': _modules_loaded_by("import populate_pdf_config"),
+        'fill --no-detect': _modules_loaded_by(fill_probe),
+    }
+
+    return {
+        'analysis_date': datetime.now().isoformat(),
+        'python': sys.version.split()[0],
+        'repeat': repeat,
+        'startup': timings,
+        'heavy_modules_loaded': imports,
+    }
+
+
+def cmd_startup(argv):
+    parser = argparse.ArgumentParser(prog="pdf_cli.py startup", description="Startup-time benchmark")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--config', help="Field config for the fill scenario")
+    parser.add_argument('--output', default="results/startup_benchmark.json")
+    args = parser.parse_args(argv)
+
+    report = startup_benchmark(args.repeat, args.config)
+
+    print("="*60)
+    print(" Startup Benchmark")
+    print("="*60)
+    for name, result in report['startup'].items():
+        status = "" if result['ok'] else "  ⚠️  exited with an error"
+        print(f"  {name:20s} {result['median_ms']:8.1f} ms{status}")
+    print("\nHeavy modules loaded:")
+    for name, modules in report['heavy_modules_loaded'].items():
+        shown = "(probe failed)" if modules is None else (", ".join(modules) or "none")
+        print(f"  {name:20s} {shown}")
+
+    os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"\n✅ Saved to: {args.output}")
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    parser = argparse.ArgumentParser(
+        prog="pdf_cli.py",
+        description="PDF form tools (backends are imported per subcommand)",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="\n".join(f"  {name:14s} {help_text}" for name, (_, _, help_text) in COMMANDS.items())
+        + f"\n  {'startup':14s} Startup-time benchmark",
+    )
+    parser.add_argument('command', choices=list(COMMANDS) + ['startup'])
+    # Only the command name is parsed here; the rest belongs to the subcommand
+    args = parser.parse_args(argv[:1])
+    rest = argv[1:]
+
+    if args.command == 'startup':
+        return cmd_startup(rest)
+
+    runner, module, _ = COMMANDS[args.command]
+    return runner(module, rest)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
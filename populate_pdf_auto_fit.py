@@ -5,20 +5,20 @@ Automatically scales text to fit boxes and handles wrapping
 """
 
 import json
-import fitz  # PyMuPDF
+try:
+    import pymupdf as fitz  # PyMuPDF
+except ImportError:  # PyMuPDF < 1.24
+    import fitz
 from datetime import datetime
 
+from save_profiles import save_document
+from text_metrics import font_for_text, get_text_width
+
 # Configuration
 PDF_INPUT = "pdf/A0124_pages_1_to_4.pdf"
 JSON_INPUT = "inputs/test.json"
 PDF_OUTPUT = f"results/populated_autofit_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
 
-def get_text_width(text, fontsize, fontname="helv"):
-    """Calculate the width of text in points"""
-    # Approximate character width for Helvetica
-    # This is a rough estimate: average char width ≈ fontsize * 0.5
-    return len(text) * fontsize * 0.5
-
 def fit_text_to_box(text, box_width, initial_fontsize, min_fontsize=6):
     """
     Calculate the optimal font size to fit text in box width
@@ -147,7 +147,7 @@ for field_key, field_info in field_boxes.items():
             fitz.Point(x_start, y),
             text,
             fontsize=fontsize,
-            fontname="helv",
+            fontname=font_for_text(text),
             color=(0, 0, 0),
         )
 
@@ -169,7 +169,7 @@ for field_key, field_info in field_boxes.items():
                 fitz.Point(x_start, y),
                 line,
                 fontsize=fontsize,
-                fontname="helv",
+                fontname=font_for_text(line),
                 color=(0, 0, 0),
             )
             print(f"    Line {i+1}: '{line}'")
@@ -177,7 +177,7 @@ for field_key, field_info in field_boxes.items():
 # Save
 print(f"\n{'='*70}")
 print("Saving PDF...")
-doc.save(PDF_OUTPUT, garbage=4, deflate=True)
+save_document(doc, PDF_OUTPUT)
 doc.close()
 
 print("\n" + "="*70)
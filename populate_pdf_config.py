@@ -3,268 +3,726 @@
 Config-Based PDF Population with Smart Alignment
 Reads field configuration from JSON and supports top/middle/bottom alignment
 Detects existing text to avoid overlaps
+
+Usage:
+    python populate_pdf_config.py                      # one record (inputs/test.json)
+    python populate_pdf_config.py --batch records.json # many records, one template load
+    python populate_pdf_config.py --batch records.json --workers 4
+    python populate_pdf_config.py --batch records.json --archive - > batch.zip
+    python populate_pdf_config.py --batch records.json --merged print.pdf
+    python populate_pdf_config.py --batch records.json --metrics results/metrics.json --metrics-prom metrics.prom
 """
 
+import argparse
 import json
-import fitz  # PyMuPDF
-import pdfplumber
+import os
+import re
+import sys
+import time
+try:
+    import pymupdf as fitz  # PyMuPDF
+except ImportError:  # PyMuPDF < 1.24
+    import fitz
+from collections import deque
 from datetime import datetime
 
+from instrumentation import METRICS, add_metrics_arguments, write_metrics
+from output_sinks import ARCHIVE_FORMATS, DirectorySink, open_archive_sink
+from save_profiles import DEFAULT_PROFILE, SAVE_PROFILES, save_document
+from spatial_index import page_index
+from template_cache import load_template_analysis
+from text_layout import field_layout_key, layout_cache_stats, plan_layout
+from text_metrics import font_for_text
+
 # Configuration files
 FIELD_CONFIG = "field_config.json"
 DATA_INPUT = "inputs/test.json"
 PDF_OUTPUT = f"results/populated_config_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
+BATCH_OUTPUT_DIR = "results/batch"
+MERGED_OUTPUT = f"results/populated_merged_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
 
 
-def get_text_width(text, fontsize):
-    """Estimate text width in points"""
-    return len(text) * fontsize * 0.5
+def check_existing_text_in_box(pdf_path, page_num, box):
+    """
+    Check if there's already text in the specified box area
+    Words come from the cached template analysis via the page's spatial index
+    Returns (has_text, existing_text)
+    """
+    words = page_index(pdf_path, page_num, 'words').overlapping(box['x0'], box['y0'], box['x1'], box['y1'])
 
+    existing_text = [
+        {'text': word['text'], 'x': word['x0'], 'y': word['top']}
+        for word in words
+    ]
 
-def fit_text_to_box(text, box_width, initial_fontsize, min_fontsize=6):
-    """Calculate optimal font size to fit text in box"""
-    fontsize = initial_fontsize
-    padding = 0.9  # Use 90% of box width
+    return len(existing_text) > 0, existing_text
 
-    while fontsize >= min_fontsize:
-        text_width = get_text_width(text, fontsize)
-        if text_width <= box_width * padding:
-            return fontsize, True
-        fontsize -= 0.5
 
-    return min_fontsize, False
+def load_field_config(config_path=FIELD_CONFIG):
+    """Load field definitions and settings from JSON"""
+    with open(config_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
 
 
-def wrap_text(text, box_width, fontsize):
-    """Wrap text to fit within box width"""
-    words = text.split()
-    lines = []
-    current_line = []
+def load_records(records_path):
+    """
+    Load a collection of records for batch mode
 
-    for word in words:
-        test_line = ' '.join(current_line + [word])
-        test_width = get_text_width(test_line, fontsize)
+    Accepts a JSON list, a single JSON object, or JSON Lines (one record per line).
+    Each record is either a full input document with 'parsedJson' (like
+    inputs/test.json) or the parsedJson dict itself.
+    """
+    with open(records_path, 'r', encoding='utf-8') as f:
+        content = f.read()
 
-        if test_width <= box_width * 0.9:
-            current_line.append(word)
-        else:
-            if current_line:
-                lines.append(' '.join(current_line))
-                current_line = [word]
+    try:
+        loaded = json.loads(content)
+    except json.JSONDecodeError:
+        loaded = [json.loads(line) for line in content.splitlines() if line.strip()]
+
+    if isinstance(loaded, dict):
+        loaded = [loaded]
+    return loaded
+
+
+def record_data(record):
+    """Return the parsedJson payload of a record (or the record itself if already flat)"""
+    return record.get('parsedJson', record)
+
+
+def record_id(record, index):
+    """
+    Filesystem-safe identifier used to name a record's output file
+
+    Prefers an explicit record_id/id, then the source fileName, then the
+    position of the record in the batch.
+    """
+    raw = record.get('record_id') or record.get('id')
+    if not raw and record.get('fileName'):
+        raw = os.path.splitext(os.path.basename(record['fileName']))[0]
+    safe = re.sub(r'[^A-Za-z0-9._-]+', '_', str(raw or '')).strip('._')
+    return safe or f"{index:06d}"
+
+
+def field_page(field_def):
+    """0-indexed template page of a field ('page' is 1-based in the config, default 1)"""
+    return field_def.get('page', 1) - 1
+
+
+def fields_by_page(fields):
+    """
+    Group field definitions by template page
+
+    Returns:
+        {page_num (0-indexed): [field defs in config order]}, in page order
+    """
+    pages = {}
+    for field_def in fields:
+        pages.setdefault(field_page(field_def), []).append(field_def)
+    return dict(sorted(pages.items()))
+
+
+def prepare_fields(config, pdf_input, detect_existing=None):
+    """
+    Attach the existing-text check result and layout key to each field definition
+
+    Both only depend on the template and config, so they are computed once
+    per field and shared by every record filled from the same config.
+
+    The existing-text check needs the template analysis (a parse on a cold
+    cache). Only the pages that have fields are analysed, all in one pass.
+    detect_existing=False, or "detect_existing_text": false in the config
+    settings, skips it for pure fill runs. None = use the setting.
+    """
+    settings = config.get('settings', {})
+    if detect_existing is None:
+        detect_existing = settings.get('detect_existing_text', True)
+    if detect_existing:
+        load_template_analysis(pdf_input, list(fields_by_page(config['fields'])))
+
+    prepared = []
+    for field_def in config['fields']:
+        existing = []
+        if detect_existing:
+            _, existing = check_existing_text_in_box(pdf_input, field_page(field_def), field_def['box'])
+        prepared.append({
+            **field_def,
+            'existing_text': existing,
+            'layout_key': field_layout_key(field_def, settings),
+        })
+    return prepared
+
+
+def fill_page(page, fields, settings, data, verbose=True):
+    """
+    Insert one record's values into a page
+
+    Args:
+        page: fitz page to write into
+        fields: Field definitions from prepare_fields()
+        settings: The 'settings' section of the field config
+        data: parsedJson dict for the record
+        verbose: Print per-field details
+
+    Returns:
+        Number of fields populated
+    """
+    fontname = settings.get('default_fontname', 'helv')
+    color = tuple(settings.get('default_color', [0, 0, 0]))
+    populated = 0
+    layout_seconds = insert_seconds = 0.0
+    # All lines go into one Shape, committed as a single content stream per page
+    shape = page.new_shape()
+
+    for field_def in fields:
+        label = field_def['label']
+        json_key = field_def['json_key']
+        box = field_def['box']
+        alignment = field_def.get('alignment', 'middle')
+        allow_wrap = field_def.get('allow_wrap', False)
+        min_fontsize = field_def.get('min_fontsize', 6)
+
+        # Get data value
+        text = data.get(json_key, '')
+        if not text:
+            METRICS.count('fields_missing')
+            if verbose:
+                print(f"\n⚠️  {label}: No data found for '{json_key}'")
+            continue
+
+        if verbose:
+            print(f"\n{label}:")
+            print(f"  Data: '{text}'")
+            print(f"  Alignment: {alignment}")
+
+            existing = field_def.get('existing_text', [])
+            if existing:
+                print(f"  ⚠️  Detected existing text in box area:")
+                for ex in existing[:3]:  # Show first 3
+                    print(f"      '{ex['text']}' at ({ex['x']:.1f}, {ex['y']:.1f})")
+                if alignment == 'top':
+                    print(f"  ✓ Using top alignment to avoid overlap")
+
+        # Calculate box dimensions
+        box_width = box['x1'] - box['x0']
+        box_height = box['y1'] - box['y0']
+
+        # Get offset values (default to 0 if not specified)
+        offset_x = field_def.get('offset_x', 0)
+        offset_y = field_def.get('offset_y', 0)
+
+        # Largest font size whose lines fit the box width and height (memoized per value)
+        start = time.perf_counter()
+        layout_key = field_def.get('layout_key') or field_layout_key(field_def, settings)
+        layout = plan_layout(layout_key, text)
+        fontsize = layout['fontsize']
+        layout_seconds += time.perf_counter() - start
+
+        if fontsize < field_def.get('fontsize', 10):
+            METRICS.count('font_shrink')
+        if not layout['fits']:
+            METRICS.count('overflow')
+        if layout['wrapped']:
+            METRICS.count('wrapped')
+
+        if verbose:
+            print(f"  Box: {box_width:.1f}w × {box_height:.1f}h")
+            print(f"  Font size: {fontsize}pt")
+            if offset_x != 0 or offset_y != 0:
+                print(f"  Offset: x={offset_x:+.1f}, y={offset_y:+.1f}")
+            if not layout['fits']:
+                print(f"  ⚠️  Text overflows the box even at {min_fontsize}pt")
+
+        # Insert text
+        start = time.perf_counter()
+        for line, (x, y) in zip(layout['lines'], layout['positions']):
+            shape.insert_text(fitz.Point(x, y), line, fontsize=fontsize, fontname=font_for_text(line, fontname),
+                              color=color)
+        insert_seconds += time.perf_counter() - start
+
+        if verbose:
+            if layout['wrapped']:
+                print(f"  ✓ Wrapped into {len(layout['lines'])} lines:")
+                for i, (line, (x, y)) in enumerate(zip(layout['lines'], layout['positions'])):
+                    print(f"    Line {i+1}: '{line}' at x={x:.1f}, y={y:.1f}")
             else:
-                lines.append(word)
+                x, y = layout['positions'][0]
+                print(f"  ✓ Inserted at x={x:.1f}, y={y:.1f} (single line)")
 
-    if current_line:
-        lines.append(' '.join(current_line))
+        populated += 1
 
-    return lines
+    start = time.perf_counter()
+    shape.commit()
+    insert_seconds += time.perf_counter() - start
 
+    METRICS.add_time('layout', layout_seconds)
+    METRICS.add_time('insert', insert_seconds)
+    METRICS.count('fields_filled', populated)
+    METRICS.count('pages_filled')
+    return populated
 
-def check_existing_text_in_box(pdf_path, page_num, box):
+
+class Filler:
     """
-    Check if there's already text in the specified box area
-    Returns (has_text, existing_text, text_positions)
+    Reusable config-driven filler
+
+    Parses the field config, reads the template and runs the existing-text
+    analysis once; every fill then opens a fresh in-memory copy of the
+    template, so a warm instance fills records without touching the disk.
+
+    Fields are grouped by their 'page'. Each page with fields is loaded and
+    written once per record; pages without fields are never parsed.
+
+    Usage:
+        filler = Filler("field_config.json")
+        pdf_bytes = filler.fill(record)          # record: input document or parsedJson dict
+        filler.fill_to(record, "out.pdf")
     """
-    with pdfplumber.open(pdf_path) as pdf:
-        page = pdf.pages[page_num]
-        words = page.extract_words()
-
-        existing_text = []
-        for word in words:
-            # Check if word overlaps with box
-            word_x0, word_x1 = word['x0'], word['x1']
-            word_y0, word_y1 = word['top'], word['bottom']
-
-            # Check overlap
-            x_overlap = not (word_x1 < box['x0'] or word_x0 > box['x1'])
-            y_overlap = not (word_y1 < box['y0'] or word_y0 > box['y1'])
-
-            if x_overlap and y_overlap:
-                existing_text.append({
-                    'text': word['text'],
-                    'x': word['x0'],
-                    'y': word['top']
-                })
 
-    return len(existing_text) > 0, existing_text
+    def __init__(self, config=FIELD_CONFIG, template=None, save_profile=DEFAULT_PROFILE,
+                 detect_existing=None):
+        """
+        Args:
+            config: Path to a field config JSON, or the already parsed dict
+            template: Template PDF path (default: the config's pdf_template)
+            save_profile: Key of save_profiles.SAVE_PROFILES
+            detect_existing: Run the existing-text check (None = config setting)
+
+        Raises:
+            ValueError: If a field's page is not a page of the template
+        """
+        with METRICS.stage('config_load'):
+            self.config = load_field_config(config) if isinstance(config, str) else config
+        self.settings = self.config.get('settings', {})
+        self.template_path = template or self.config.get('pdf_template', 'pdf/A0124_pages_1_to_4.pdf')
+        self.save_profile = save_profile
+
+        with METRICS.stage('template_read'):
+            with open(self.template_path, 'rb') as f:
+                self.template_bytes = f.read()
+        self.template = fitz.open(stream=self.template_bytes, filetype="pdf")
+
+        page_count = len(self.template)
+        for field_def in self.config['fields']:
+            if not 0 <= field_page(field_def) < page_count:
+                self.template.close()
+                raise ValueError(f"Field '{field_def['id']}' is on page {field_def.get('page', 1)}, "
+                                 f"but {self.template_path} has {page_count} pages")
+
+        with METRICS.stage('analysis'):
+            self.fields = prepare_fields(self.config, self.template_path, detect_existing)
+        self.pages = fields_by_page(self.fields)
+
+    def __getstate__(self):
+        # Sent to worker processes as bytes; the opened document is not picklable
+        state = self.__dict__.copy()
+        del state['template']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.template = fitz.open(stream=self.template_bytes, filetype="pdf")
+
+    def render(self, record, verbose=False):
+        """Fill a record into a fresh copy of the template and return the open document"""
+        with METRICS.stage('template_open'):
+            doc = fitz.open(stream=self.template_bytes, filetype="pdf")
+        data = record_data(record)
+        for page_num, fields in self.pages.items():
+            if verbose and len(self.pages) > 1:
+                print(f"\n--- Page {page_num + 1} ({len(fields)} fields) ---")
+            fill_page(doc[page_num], fields, self.settings, data, verbose)
+        return doc
+
+    def fill(self, record):
+        """Filled PDF as bytes"""
+        doc = self.render(record)
+        try:
+            with METRICS.stage('save'):
+                return save_document(doc, None, self.save_profile)
+        finally:
+            doc.close()
+
+    def fill_to(self, record, path):
+        """Write the filled PDF to path and return the path"""
+        doc = self.render(record)
+        try:
+            with METRICS.stage('save'):
+                save_document(doc, path, self.save_profile)
+        finally:
+            doc.close()
+        return path
+
+    def close(self):
+        self.template.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def populate_single(config_path=FIELD_CONFIG, data_input=DATA_INPUT, pdf_output=PDF_OUTPUT,
+                    save_profile=DEFAULT_PROFILE, detect_existing=None):
+    """Fill one record (the original single-run behaviour)"""
+    print("="*70)
+    print("Config-Based PDF Population with Smart Alignment")
+    print("="*70)
+
+    print("\nLoading field configuration...")
+    filler = Filler(config_path, save_profile=save_profile, detect_existing=detect_existing)
+    print(f"  ✓ Loaded {len(filler.fields)} field definitions "
+          f"(pages {', '.join(str(p + 1) for p in filler.pages)})")
+
+    print("\nLoading data...")
+    with open(data_input, 'r', encoding='utf-8') as f:
+        json_data = json.load(f)
+
+    data = record_data(json_data)
+    print(f"  ✓ Name: {data.get('name')}")
+    print(f"  ✓ ID: {data.get('id_number')}")
+    print(f"  ✓ Address: {data.get('address')}")
+    print(f"  ✓ Phone: {data.get('phone')}")
+
+    # Open PDF
+    page = filler.template[0]
+    print(f"\nOpening PDF: {filler.template_path}")
+    print(f"  Page size: {page.rect.width} x {page.rect.height}")
+    print("\n" + "="*70)
+    print("Processing fields...")
+    print("="*70)
+
+    doc = filler.render(data, verbose=True)
+
+    # Save
+    print(f"\n{'='*70}")
+    print(f"Saving PDF ({save_profile} profile)...")
+    with METRICS.stage('save'):
+        save_document(doc, pdf_output, save_profile)
+    doc.close()
+    filler.close()
+    METRICS.count('records_filled')
+
+    print("\n" + "="*70)
+    print("SUCCESS! Config-based PDF created!")
+    print("="*70)
+    print(f"\nOutput: {pdf_output}")
+    print("\nFeatures:")
+    print("  ✓ Configuration-driven field definitions")
+    print("  ✓ Top/Middle/Bottom alignment support")
+    print("  ✓ Automatic text size fitting")
+    print("  ✓ Smart wrapping for long text")
+    print("  ✓ Existing text detection")
+    print("\nTo customize:")
+    print(f"  Edit '{config_path}' to adjust field positions and alignment")
+
+
+# Per-process state for batch filling, set once by _init_worker
+_worker = {}
+
+
+def _init_worker(filler, output_dir):
+    """
+    Keep the Filler (template bytes + prepared field config) once per process
+
+    output_dir is set when filled PDFs go straight to files; None means
+    PDFs are returned as bytes for the parent's output sink.
+    """
+    _worker.update(filler=filler, output_dir=output_dir)
+
+
+def _init_pool_worker(*init_args):
+    """_init_worker for pool processes, which also report their metrics to the parent"""
+    _init_worker(*init_args)
+    _worker['report_metrics'] = True
+    METRICS.reset()  # forked workers start with a copy of the parent's metrics
 
 
-def calculate_y_position(box, fontsize, alignment, line_height=None, line_number=0):
+def _fill_chunk(chunk):
     """
-    Calculate Y position based on alignment type
+    Fill a chunk of (record_id, data) pairs from the worker's template
+
+    Returns:
+        ([(output name, path or PDF bytes)], process id, seconds spent filling,
+         layout cache counters for this process, metrics snapshot from a pool
+         worker or None in-process)
+    """
+    start = time.perf_counter()
+    filler = _worker['filler']
+    outputs = []
+    for rid, data in chunk:
+        name = f"populated_config_{rid}.pdf"
+        if _worker['output_dir']:
+            outputs.append((name, filler.fill_to(data, os.path.join(_worker['output_dir'], name))))
+        else:
+            outputs.append((name, filler.fill(data)))
+
+    METRICS.count('records_filled', len(chunk))
+    metrics = METRICS.drain() if _worker.get('report_metrics') else None
+    return outputs, os.getpid(), time.perf_counter() - start, layout_cache_stats(), metrics
+
+
+def _bounded_map(executor, fn, items, window):
+    """Ordered executor.map that keeps at most `window` tasks in flight"""
+    pending = deque()
+    for item in items:
+        pending.append(executor.submit(fn, item))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def _record_chunks(records, chunk_size):
+    """Assign unique record ids in input order and group records into chunks"""
+    used_ids = set()
+    chunk = []
+    for index, record in enumerate(records):
+        rid = record_id(record, index)
+        if rid in used_ids:
+            rid = f"{rid}_{index:06d}"
+        used_ids.add(rid)
+
+        chunk.append((rid, record_data(record)))
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def populate_batch(records, config_path=FIELD_CONFIG, output_dir=BATCH_OUTPUT_DIR,
+                   workers=1, chunk_size=64, sink=None, save_profile=DEFAULT_PROFILE,
+                   detect_existing=None):
+    """
+    Fill many records from a single config parse and template load
+
+    One Filler reads the template into memory and each record gets a fresh
+    document opened from those bytes. Outputs are named by record id,
+    so many files written in the same second never collide.
+
+    With workers > 1 the records are filled by a process pool. Each worker
+    receives the pickled Filler (template bytes and prepared fields) once at
+    startup, then chunks of records. Ids are assigned before dispatch and results are
+    collected in input order, so the output is the same for any worker count.
 
     Args:
-        box: Dict with y0, y1 keys
-        fontsize: Font size in points
-        alignment: 'top', 'middle', or 'bottom'
-        line_height: For multi-line text
-        line_number: Which line (0-indexed)
+        records: Iterable of records (full input documents or parsedJson dicts)
+        config_path: Field configuration JSON
+        output_dir: Directory for the filled PDFs (when no sink is given)
+        workers: Number of processes (1 = fill in this process)
+        chunk_size: Records sent to a worker at a time
+        sink: Output sink from output_sinks (e.g. a streaming ZIP); the caller closes it
+        save_profile: Key of save_profiles.SAVE_PROFILES
+        detect_existing: Run the existing-text check (None = config setting)
 
     Returns:
-        Y coordinate for text baseline
+        List of output paths (or archive member names), in record order
+    """
+    start = time.perf_counter()
+    if sink is None:
+        sink = DirectorySink(output_dir)
+    # Keep stdout clean when the archive itself is being streamed there
+    log = sys.stderr if sink.to_stdout else sys.stdout
+
+    filler = Filler(config_path, save_profile=save_profile, detect_existing=detect_existing)
+
+    print(f"Template: {filler.template_path} ({len(filler.fields)} fields)", file=log)
+    print(f"Output:   {sink.directory + '/' if sink.directory else type(sink).__name__}", file=log)
+
+    # Directory output is written by the workers; archives are written here, in order
+    init_args = (filler, sink.directory)
+    chunks = _record_chunks(records, chunk_size)
+
+    if workers > 1:
+        from concurrent.futures import ProcessPoolExecutor  # only multi-process runs pay for it
+
+        print(f"Workers:  {workers} processes, {chunk_size} records per chunk", file=log)
+        executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_pool_worker, initargs=init_args)
+        results = _bounded_map(executor, _fill_chunk, chunks, window=workers * 2)
+    else:
+        executor = None
+        _init_worker(*init_args)
+        results = map(_fill_chunk, chunks)
+
+    outputs = []
+    per_worker = {}  # pid -> [records, busy seconds]
+    layout_stats = {}  # pid -> latest layout cache counters
+    try:
+        for chunk_outputs, pid, busy, cache_stats, metrics in results:
+            stats = per_worker.setdefault(pid, [0, 0.0])
+            stats[0] += len(chunk_outputs)
+            stats[1] += busy
+            layout_stats[pid] = cache_stats
+            if metrics:
+                METRICS.merge(metrics)
+
+            previous = len(outputs)
+            for name, result in chunk_outputs:
+                outputs.append(result if sink.directory else sink.write(name, result))
+            if len(outputs) // 1000 > previous // 1000:
+                print(f"  ... {len(outputs)} records", file=log)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+        filler.close()
+
+    elapsed = time.perf_counter() - start
+    rate = len(outputs) / elapsed if elapsed > 0 else 0.0
+    print(f"✓ Filled {len(outputs)} records in {elapsed:.2f}s ({rate:.1f} records/s)", file=log)
+
+    hits = sum(c['hits'] for c in layout_stats.values())
+    misses = sum(c['misses'] for c in layout_stats.values())
+    METRICS.set('layout_cache_hits', hits)
+    METRICS.set('layout_cache_misses', misses)
+    if hits + misses:
+        print(f"  Layout cache: {hits} hits, {misses} misses "
+              f"({100.0 * hits / (hits + misses):.1f}% hit rate)", file=log)
+
+    if workers > 1:
+        for pid, (count, busy) in sorted(per_worker.items()):
+            worker_rate = count / busy if busy > 0 else 0.0
+            print(f"  worker {pid}: {count} records, {busy:.2f}s busy ({worker_rate:.1f} records/s)", file=log)
+
+    return outputs
+
+
+def _share_template_page(merged, page, template, pno):
+    """
+    Draw a template page as a Form XObject and return its shareable page keys
+
+    The returned Resources is always an indirect object, so fonts added by
+    filling any copy land in one dictionary instead of one per page.
+    """
+    page.show_pdf_page(page.rect, template, pno)
+
+    kind, resources = merged.xref_get_key(page.xref, "Resources")
+    if kind != 'xref':
+        resources_xref = merged.get_new_xref()
+        merged.update_object(resources_xref, resources)
+        resources = f"{resources_xref} 0 R"
+        merged.xref_set_key(page.xref, "Resources", resources)
+
+    _, contents = merged.xref_get_key(page.xref, "Contents")
+    return resources, contents
+
+
+def populate_merged(records, config_path=FIELD_CONFIG, pdf_output=MERGED_OUTPUT, save_profile='fast',
+                    detect_existing=None):
     """
-    box_height = box['y1'] - box['y0']
-
-    if alignment == 'top':
-        # Align to top - text baseline at top of box
-        # For PyMuPDF, baseline should be approximately fontsize * 0.75 from top edge
-        y = box['y0'] + (fontsize * 0.75) + 1  # +1 for tiny padding
-        if line_height and line_number > 0:
-            y += line_number * line_height
-
-    elif alignment == 'bottom':
-        # Align to bottom - text baseline at bottom of box
-        # Baseline should be approximately fontsize * 0.25 from bottom edge
-        y = box['y1'] - (fontsize * 0.25) - 1  # -1 for tiny padding
-        if line_height and line_number > 0:
-            y -= line_number * line_height
-
-    else:  # middle (default)
-        # Center vertically
-        y = box['y0'] + (box_height / 2) + (fontsize / 3)
-        if line_height and line_number > 0:
-            # For multi-line, adjust to keep all lines centered
-            y += line_number * line_height
-
-    return y
-
-
-# Load configurations
-print("="*70)
-print("Config-Based PDF Population with Smart Alignment")
-print("="*70)
-
-print("\nLoading field configuration...")
-with open(FIELD_CONFIG, 'r', encoding='utf-8') as f:
-    config = json.load(f)
-
-print(f"  ✓ Loaded {len(config['fields'])} field definitions")
-
-print("\nLoading data...")
-with open(DATA_INPUT, 'r', encoding='utf-8') as f:
-    json_data = json.load(f)
-
-data = json_data.get('parsedJson', {})
-print(f"  ✓ Name: {data.get('name')}")
-print(f"  ✓ ID: {data.get('id_number')}")
-print(f"  ✓ Address: {data.get('address')}")
-print(f"  ✓ Phone: {data.get('phone')}")
-
-# Open PDF
-pdf_input = config.get('pdf_template', 'pdf/A0124_pages_1_to_4.pdf')
-print(f"\nOpening PDF: {pdf_input}")
-doc = fitz.open(pdf_input)
-page = doc[0]
-
-settings = config.get('settings', {})
-padding_h = settings.get('padding_horizontal', 3)
-padding_v_top = settings.get('padding_vertical_top', 3)
-line_height_mult = settings.get('line_height_multiplier', 1.3)
-
-print(f"  Page size: {page.rect.width} x {page.rect.height}")
-print("\n" + "="*70)
-print("Processing fields...")
-print("="*70)
-
-# Process each field
-for field_def in config['fields']:
-    field_id = field_def['id']
-    label = field_def['label']
-    json_key = field_def['json_key']
-    box = field_def['box']
-    alignment = field_def.get('alignment', 'middle')
-    allow_wrap = field_def.get('allow_wrap', False)
-    initial_fontsize = field_def.get('fontsize', 10)
-    min_fontsize = field_def.get('min_fontsize', 6)
-
-    # Get data value
-    text = data.get(json_key, '')
-    if not text:
-        print(f"\n⚠️  {label}: No data found for '{json_key}'")
-        continue
-
-    print(f"\n{label}:")
-    print(f"  Data: '{text}'")
-    print(f"  Alignment: {alignment}")
-
-    # Check for existing text in box
-    has_existing, existing = check_existing_text_in_box(pdf_input, 0, box)
-    if has_existing:
-        print(f"  ⚠️  Detected existing text in box area:")
-        for ex in existing[:3]:  # Show first 3
-            print(f"      '{ex['text']}' at ({ex['x']:.1f}, {ex['y']:.1f})")
-        if alignment == 'top':
-            print(f"  ✓ Using top alignment to avoid overlap")
-
-    # Calculate box dimensions
-    box_width = box['x1'] - box['x0']
-    box_height = box['y1'] - box['y0']
-    print(f"  Box: {box_width:.1f}w × {box_height:.1f}h")
-
-    # Fit text to box
-    fontsize, fits_single = fit_text_to_box(text, box_width, initial_fontsize, min_fontsize)
-    print(f"  Font size: {fontsize}pt")
-
-    # Get offset values (default to 0 if not specified)
-    offset_x = field_def.get('offset_x', 0)
-    offset_y = field_def.get('offset_y', 0)
-
-    # Calculate X position
-    x = box['x0'] + padding_h + offset_x
-
-    # Insert text
-    if fits_single or not allow_wrap:
-        # Single line
-        y = calculate_y_position(box, fontsize, alignment) + offset_y
-
-        if offset_x != 0 or offset_y != 0:
-            print(f"  Offset: x={offset_x:+.1f}, y={offset_y:+.1f}")
-
-        page.insert_text(
-            fitz.Point(x, y),
-            text,
-            fontsize=fontsize,
-            fontname=settings.get('default_fontname', 'helv'),
-            color=tuple(settings.get('default_color', [0, 0, 0])),
-        )
-        print(f"  ✓ Inserted at x={x:.1f}, y={y:.1f} (single line)")
+    Fill many records into one combined PDF (e.g. for printing)
+
+    Each template page is turned into a single Form XObject. Every copy of
+    that page points at the same resource dictionary and drawing stream, so
+    the template's fonts, images and content streams are stored once. Each
+    record only adds a small page object and its own text stream. Template
+    annotations and widgets are not copied.
 
+    Args:
+        records: Iterable of records (full input documents or parsedJson dicts)
+        config_path: Field configuration JSON
+        pdf_output: Path of the combined PDF
+        save_profile: Key of save_profiles.SAVE_PROFILES; the default 'fast'
+            skips garbage=4's duplicate-object search, which finds nothing
+            here because sharing is structural
+        detect_existing: Run the existing-text check (None = config setting)
+
+    Returns:
+        Number of records written
+    """
+    start = time.perf_counter()
+    filler = Filler(config_path, save_profile=save_profile, detect_existing=detect_existing)
+    template = filler.template
+    merged = fitz.open()
+    shared = {}  # template page number -> (Resources ref, Contents) shared by its copies
+    count = 0
+
+    print(f"Template: {filler.template_path} ({len(template)} pages, {len(filler.fields)} fields)")
+    for record in records:
+        for pno in range(len(template)):
+            page = merged.new_page(width=template[pno].rect.width, height=template[pno].rect.height)
+            if pno not in shared:
+                shared[pno] = _share_template_page(merged, page, template, pno)
+            else:
+                merged.xref_set_key(page.xref, "Resources", shared[pno][0])
+                merged.xref_set_key(page.xref, "Contents", shared[pno][1])
+
+            if pno in filler.pages:
+                fill_page(page, filler.pages[pno], filler.settings, record_data(record), verbose=False)
+
+        count += 1
+        if count % 1000 == 0:
+            print(f"  ... {count} records")
+    METRICS.count('records_filled', count)
+
+    with METRICS.stage('save'):
+        save_document(merged, pdf_output, save_profile)
+    merged.close()
+    filler.close()
+
+    elapsed = time.perf_counter() - start
+    print(f"✓ Merged {count} records into {pdf_output} in {elapsed:.2f}s "
+          f"({os.path.getsize(pdf_output) / 1024:.1f} KB)")
+    cache_stats = layout_cache_stats()
+    METRICS.set('layout_cache_hits', cache_stats['hits'])
+    METRICS.set('layout_cache_misses', cache_stats['misses'])
+    print(f"  Layout cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses")
+    return count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Config-based PDF population")
+    parser.add_argument('--config', default=FIELD_CONFIG, help="Field configuration JSON")
+    parser.add_argument('--input', default=DATA_INPUT, help="Single input record (parsedJson document)")
+    parser.add_argument('--output', default=PDF_OUTPUT, help="Output PDF for a single record")
+    parser.add_argument('--batch', metavar='RECORDS',
+                        help="JSON list or JSON Lines file of records to fill in one run")
+    parser.add_argument('--output-dir', default=BATCH_OUTPUT_DIR, help="Output directory for --batch")
+    parser.add_argument('--workers', type=int, default=1, help="Processes for --batch (default: 1)")
+    parser.add_argument('--chunk-size', type=int, default=64, help="Records per worker task")
+    parser.add_argument('--archive', metavar='PATH',
+                        help="Stream --batch output into one ZIP/tar archive ('-' = stdout)")
+    parser.add_argument('--archive-format', choices=ARCHIVE_FORMATS,
+                        help="Archive format (default: from the --archive extension, else zip)")
+    parser.add_argument('--merged', metavar='PATH', nargs='?', const=MERGED_OUTPUT,
+                        help="Write --batch records into one combined PDF sharing the template resources")
+    parser.add_argument('--save-profile', choices=sorted(SAVE_PROFILES),
+                        help=f"PDF save settings (default: {DEFAULT_PROFILE}; fast for --merged)")
+    parser.add_argument('--no-detect', dest='detect_existing', action='store_false', default=None,
+                        help="Skip the existing-text check (no template analysis / pdfplumber)")
+    add_metrics_arguments(parser)
+    args = parser.parse_args(argv)
+    save_profile = args.save_profile or DEFAULT_PROFILE
+    log = sys.stdout
+
+    if args.batch and args.merged:
+        mode = 'merged'
+        populate_merged(load_records(args.batch), args.config, args.merged,
+                        save_profile=args.save_profile or 'fast', detect_existing=args.detect_existing)
+    elif args.batch and args.archive:
+        mode = 'archive'
+        with open_archive_sink(args.archive, args.archive_format) as sink:
+            populate_batch(load_records(args.batch), args.config, args.output_dir,
+                           workers=args.workers, chunk_size=args.chunk_size, sink=sink,
+                           save_profile=save_profile, detect_existing=args.detect_existing)
+        if sink.to_stdout:
+            log = sys.stderr
+    elif args.batch:
+        mode = 'batch'
+        populate_batch(load_records(args.batch), args.config, args.output_dir,
+                       workers=args.workers, chunk_size=args.chunk_size, save_profile=save_profile,
+                       detect_existing=args.detect_existing)
     else:
-        # Multi-line with wrapping
-        lines = wrap_text(text, box_width, fontsize)
-        line_height = fontsize * line_height_mult
-        print(f"  ✓ Wrapped into {len(lines)} lines:")
-
-        if offset_x != 0 or offset_y != 0:
-            print(f"  Offset: x={offset_x:+.1f}, y={offset_y:+.1f}")
-
-        for i, line in enumerate(lines):
-            y = calculate_y_position(box, fontsize, alignment, line_height, i) + offset_y
-
-            page.insert_text(
-                fitz.Point(x, y),
-                line,
-                fontsize=fontsize,
-                fontname=settings.get('default_fontname', 'helv'),
-                color=tuple(settings.get('default_color', [0, 0, 0])),
-            )
-            print(f"    Line {i+1}: '{line}' at x={x:.1f}, y={y:.1f}")
-
-# Save
-print(f"\n{'='*70}")
-print("Saving PDF...")
-doc.save(PDF_OUTPUT, garbage=4, deflate=True)
-doc.close()
-
-print("\n" + "="*70)
-print("SUCCESS! Config-based PDF created!")
-print("="*70)
-print(f"\nOutput: {PDF_OUTPUT}")
-print("\nFeatures:")
-print("  ✓ Configuration-driven field definitions")
-print("  ✓ Top/Middle/Bottom alignment support")
-print("  ✓ Automatic text size fitting")
-print("  ✓ Smart wrapping for long text")
-print("  ✓ Existing text detection")
-print("\nTo customize:")
-print(f"  Edit '{FIELD_CONFIG}' to adjust field positions and alignment")
+        mode = 'single'
+        populate_single(args.config, args.input, args.output, save_profile=save_profile,
+                        detect_existing=args.detect_existing)
+        cache_stats = layout_cache_stats()
+        METRICS.set('layout_cache_hits', cache_stats['hits'])
+        METRICS.set('layout_cache_misses', cache_stats['misses'])
+
+    write_metrics(args, 'populate_pdf_config', log=log, mode=mode, workers=args.workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -5,9 +5,14 @@ Creates a PDF with highlighted boxes to verify alignment
 """
 
 import json
-import fitz  # PyMuPDF
+try:
+    import pymupdf as fitz  # PyMuPDF
+except ImportError:  # PyMuPDF < 1.24
+    import fitz
 from datetime import datetime
 
+from save_profiles import save_document
+
 # Configuration
 PDF_INPUT = "pdf/A0124_pages_1_to_4.pdf"
 JSON_INPUT = "inputs/test.json"
@@ -100,7 +105,7 @@ for field_key, field_info in field_boxes.items():
     print(f"    Box highlighted in color, text at x={x:.1f}, y={y:.1f}")
 
 # Save
-doc.save(PDF_OUTPUT, garbage=4, deflate=True)
+save_document(doc, PDF_OUTPUT)
 doc.close()
 
 print("\n" + "="*70)
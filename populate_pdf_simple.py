@@ -5,9 +5,14 @@ Overlays text at specific coordinates for forms without fillable fields
 """
 
 import json
-import fitz  # PyMuPDF
+try:
+    import pymupdf as fitz  # PyMuPDF
+except ImportError:  # PyMuPDF < 1.24
+    import fitz
 from datetime import datetime
 
+from save_profiles import save_document
+
 # Configuration
 PDF_INPUT = "pdf/A0124_pages_1_to_4.pdf"
 JSON_INPUT = "inputs/test.json"
@@ -78,7 +83,7 @@ for placement in text_placements:
 
 # Save the populated PDF
 print(f"\nSaving populated PDF to: {PDF_OUTPUT}")
-doc.save(PDF_OUTPUT, garbage=4, deflate=True)
+save_document(doc, PDF_OUTPUT)
 doc.close()
 
 print("\n" + "="*60)
@@ -5,10 +5,15 @@ Automatically finds field locations and populates data
 """
 
 import json
-import fitz  # PyMuPDF
-import pdfplumber
+try:
+    import pymupdf as fitz  # PyMuPDF
+except ImportError:  # PyMuPDF < 1.24
+    import fitz
 from datetime import datetime
 
+from save_profiles import save_document
+from template_cache import load_template_analysis
+
 # Configuration
 PDF_INPUT = "pdf/A0124_pages_1_to_4.pdf"
 JSON_INPUT = "inputs/test.json"
@@ -16,26 +21,26 @@ PDF_OUTPUT = f"results/populated_smart_{datetime.now().strftime('%Y%m%d_%H%M%S')
 
 def find_text_positions(pdf_path, search_terms):
     """
-    Find positions of specific text in PDF
+    Find positions of specific text in PDF (words from the template analysis cache)
     Returns dict of search term -> (x, y, page) positions
     """
     positions = {}
 
-    with pdfplumber.open(pdf_path) as pdf:
-        for page_num, page in enumerate(pdf.pages):
-            words = page.extract_words()
-
-            for search_term in search_terms:
-                for word in words:
-                    if search_term in word['text']:
-                        if search_term not in positions:
-                            positions[search_term] = []
-                        positions[search_term].append({
-                            'x': word['x1'] + 5,  # Place text slightly after the label
-                            'y': word['top'],
-                            'page': page_num,
-                            'label_width': word['x1'] - word['x0']
-                        })
+    analysis = load_template_analysis(pdf_path)
+    for page_num in range(analysis['page_count']):
+        words = analysis['pages'][str(page_num)]['words']
+
+        for search_term in search_terms:
+            for word in words:
+                if search_term in word['text']:
+                    if search_term not in positions:
+                        positions[search_term] = []
+                    positions[search_term].append({
+                        'x': word['x1'] + 5,  # Place text slightly after the label
+                        'y': word['top'],
+                        'page': page_num,
+                        'label_width': word['x1'] - word['x0']
+                    })
 
     return positions
 
@@ -103,7 +108,7 @@ for field_label, field_value in field_mapping.items():
 
 # Save
 print(f"\nSaving to: {PDF_OUTPUT}")
-doc.save(PDF_OUTPUT, garbage=4, deflate=True)
+save_document(doc, PDF_OUTPUT)
 doc.close()
 
 print("\n" + "="*60)
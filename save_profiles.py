@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Save Profiles - Named PyMuPDF save settings for filled PDFs
+
+    fast      minimal cleanup (garbage=1), quickest save for high-volume batches
+    standard  garbage=4 + deflate, what the scripts always used (default)
+    archive   smallest file: font subsetting, object streams, maximum compression
+    web       linearized ("fast web view") for serving over HTTP
+
+Every profile saves with no_new_id, so filling the same record twice gives
+byte-identical files (MuPDF otherwise writes a random trailer /ID).
+
+Options the installed PyMuPDF doesn't know (e.g. use_objstms before 1.24,
+linear after MuPDF dropped linearisation) are skipped with a warning, so a
+profile always produces a valid file.
+
+Benchmark every profile on the configured template:
+    python save_profiles.py [--config field_config.json] [--repeat 5]
+"""
+
+import argparse
+import inspect
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+try:
+    import pymupdf as fitz  # PyMuPDF
+except ImportError:  # PyMuPDF < 1.24
+    import fitz
+
+SAVE_PROFILES = {
+    'fast': {'garbage': 1, 'deflate': True},
+    'standard': {'garbage': 4, 'deflate': True},
+    'archive': {
+        'garbage': 4,
+        'deflate': True,
+        'deflate_images': True,
+        'deflate_fonts': True,
+        'clean': True,
+        'use_objstms': 1,
+        'compression_effort': 100,
+        'subset_fonts': True,
+    },
+    'web': {'garbage': 3, 'deflate': True, 'linear': True},
+}
+DEFAULT_PROFILE = 'standard'
+
+_warned = set()
+
+
+def _warn_once(message):
+    if message not in _warned:
+        _warned.add(message)
+        print(f"⚠️  {message}", file=sys.stderr)
+
+
+def _supported(options):
+    """Drop options the installed PyMuPDF's save/tobytes doesn't accept"""
+    params = inspect.signature(fitz.Document.save).parameters
+    accepted = {}
+    for key, value in options.items():
+        if key in params:
+            accepted[key] = value
+        else:
+            _warn_once(f"PyMuPDF {fitz.VersionBind} has no save option '{key}', skipping it")
+    return accepted
+
+
+def save_document(doc, target=None, profile=DEFAULT_PROFILE):
+    """
+    Save a document with a named profile
+
+    Args:
+        doc: fitz.Document (may be modified by font subsetting)
+        target: Output path, or None to return the PDF as bytes
+        profile: Key of SAVE_PROFILES
+
+    Returns:
+        PDF bytes when target is None, else None
+    """
+    if profile not in SAVE_PROFILES:
+        raise ValueError(f"Unknown save profile: {profile} (expected one of {', '.join(SAVE_PROFILES)})")
+
+    options = dict(SAVE_PROFILES[profile])
+    if options.pop('subset_fonts', False):
+        try:
+            doc.subset_fonts()
+        except ImportError:
+            _warn_once("Font subsetting needs fontTools (pip install fonttools), skipping it")
+
+    method = doc.tobytes if target is None else doc.save
+    options['no_new_id'] = True  # keep the template's /ID: reproducible output
+    options = _supported(options)
+    args = () if target is None else (target,)
+
+    try:
+        return method(*args, **options)
+    except Exception as e:  # MuPDF error types differ between PyMuPDF versions
+        if not options.pop('linear', False):
+            raise
+        _warn_once(f"Linearisation not available ({e}), saving without it")
+        return method(*args, **options)
+
+
+def benchmark_profiles(config_path="field_config.json", data_input="inputs/test.json", repeat=5):
+    """
+    Fill the configured template once, then time every save profile on it
+
+    Returns:
+        Dict of profile -> {'seconds' (best of repeat), 'bytes'}
+    """
+    # Imported here so `import save_profiles` stays cheap for the filler itself
+    from populate_pdf_config import Filler
+
+    filler = Filler(config_path)
+    with open(data_input, 'r', encoding='utf-8') as f:
+        record = json.load(f)
+
+    results = {}
+    for profile in SAVE_PROFILES:
+        timings = []
+        size = 0
+        for _ in range(repeat):
+            doc = filler.render(record)
+            start = time.perf_counter()
+            size = len(save_document(doc, None, profile))
+            timings.append(time.perf_counter() - start)
+            doc.close()
+        results[profile] = {'seconds': min(timings), 'bytes': size}
+    filler.close()
+
+    return {
+        'pdf_file': filler.template_path,
+        'template_bytes': len(filler.template_bytes),
+        'pymupdf': fitz.VersionBind,
+        'analysis_date': datetime.now().isoformat(),
+        'profiles': results,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark PDF save profiles")
+    parser.add_argument('--config', default="field_config.json")
+    parser.add_argument('--input', default="inputs/test.json")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output', default="results/save_profiles_benchmark.json")
+    args = parser.parse_args(argv)
+
+    report = benchmark_profiles(args.config, args.input, args.repeat)
+
+    print("="*60)
+    print(f" Save Profiles - {report['pdf_file']} ({report['template_bytes'] / 1024:.1f} KB template)")
+    print("="*60)
+    print(f"{'Profile':10s} {'Save time':>12s} {'Size':>12s}")
+    for profile, result in report['profiles'].items():
+        print(f"{profile:10s} {result['seconds'] * 1000:9.1f} ms {result['bytes'] / 1024:9.1f} KB")
+
+    os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"\n✅ Saved to: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
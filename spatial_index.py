@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Spatial Index - Uniform grid over page words and rectangles
+Replaces the linear "test every word/rect" scans with bucketed lookups
+
+Items are dicts with x0, x1, top, bottom keys (the pdfplumber / template
+cache shape). Query results are returned in the original item order, so
+"first match" logic behaves exactly like the old linear scans.
+
+Usage:
+    from spatial_index import page_index
+    words = page_index(pdf_path, 0, 'words').overlapping(x0, y0, x1, y1)
+"""
+
+import math
+
+from template_cache import load_template_analysis
+
+DEFAULT_CELL_SIZE = 50  # points; a typical form row is 15-40pt tall
+
+# (template hash, page_num, kind) -> SpatialIndex
+_page_indexes = {}
+
+
+class SpatialIndex:
+    """Uniform-grid index over axis-aligned boxes"""
+
+    def __init__(self, items, cell_size=DEFAULT_CELL_SIZE):
+        self.items = list(items)
+        self.cell_size = cell_size
+        self.cells = {}
+
+        for i, item in enumerate(self.items):
+            cx0, cy0, cx1, cy1 = self._cell_range(item['x0'], item['top'], item['x1'], item['bottom'])
+            for cx in range(cx0, cx1 + 1):
+                for cy in range(cy0, cy1 + 1):
+                    self.cells.setdefault((cx, cy), []).append(i)
+
+        if self.cells:
+            self.min_cx = min(c[0] for c in self.cells)
+            self.max_cx = max(c[0] for c in self.cells)
+            self.min_cy = min(c[1] for c in self.cells)
+            self.max_cy = max(c[1] for c in self.cells)
+
+    def __len__(self):
+        return len(self.items)
+
+    def _cell_range(self, x0, y0, x1, y1):
+        size = self.cell_size
+        return (math.floor(x0 / size), math.floor(y0 / size),
+                math.floor(x1 / size), math.floor(y1 / size))
+
+    def _candidates(self, x0, y0, x1, y1):
+        """Indexes of items sharing a grid cell with the query box, in item order"""
+        if not self.cells:
+            return []
+
+        cx0, cy0, cx1, cy1 = self._cell_range(
+            max(x0, self.min_cx * self.cell_size),
+            max(y0, self.min_cy * self.cell_size),
+            min(x1, (self.max_cx + 1) * self.cell_size),
+            min(y1, (self.max_cy + 1) * self.cell_size),
+        )
+        found = set()
+        for cx in range(max(cx0, self.min_cx), min(cx1, self.max_cx) + 1):
+            for cy in range(max(cy0, self.min_cy), min(cy1, self.max_cy) + 1):
+                found.update(self.cells.get((cx, cy), ()))
+        return sorted(found)
+
+    def overlapping(self, x0, y0, x1, y1):
+        """Items touching or overlapping the box (edges inclusive)"""
+        result = []
+        for i in self._candidates(x0, y0, x1, y1):
+            item = self.items[i]
+            if item['x1'] < x0 or item['x0'] > x1:
+                continue
+            if item['bottom'] < y0 or item['top'] > y1:
+                continue
+            result.append(item)
+        return result
+
+    def within(self, x0, y0, x1, y1):
+        """Items lying entirely inside the box"""
+        return [
+            item for item in self.overlapping(x0, y0, x1, y1)
+            if item['x0'] >= x0 and item['x1'] <= x1 and item['top'] >= y0 and item['bottom'] <= y1
+        ]
+
+    def containing(self, x0, y0, x1, y1):
+        """Items that fully enclose the box"""
+        return [
+            item for item in self.overlapping(x0, y0, x1, y1)
+            if item['x0'] <= x0 and item['x1'] >= x1 and item['top'] <= y0 and item['bottom'] >= y1
+        ]
+
+    def nearest(self, anchor, direction, max_distance=None):
+        """
+        Items beyond one edge of an anchor box, closest first
+
+        Args:
+            anchor: Dict with x0, x1, top, bottom (e.g. a label word)
+            direction: 'right', 'left', 'below' or 'above'
+            max_distance: Maximum gap between anchor edge and item edge (None = unbounded)
+
+        Returns:
+            List of (distance, item), sorted by distance then item order.
+            Items must overlap the anchor on the other axis (edges inclusive).
+        """
+        reach = math.inf if max_distance is None else max_distance
+        ax0, ax1, ay0, ay1 = anchor['x0'], anchor['x1'], anchor['top'], anchor['bottom']
+
+        if direction == 'right':
+            region, near_edge = (ax1, ay0, ax1 + reach, ay1), lambda item: item['x0'] - ax1
+        elif direction == 'left':
+            region, near_edge = (ax0 - reach, ay0, ax0, ay1), lambda item: ax0 - item['x1']
+        elif direction == 'below':
+            region, near_edge = (ax0, ay1, ax1, ay1 + reach), lambda item: item['top'] - ay1
+        elif direction == 'above':
+            region, near_edge = (ax0, ay0 - reach, ax1, ay0), lambda item: ay0 - item['bottom']
+        else:
+            raise ValueError(f"Unknown direction: {direction}")
+
+        hits = []
+        for order, item in enumerate(self.overlapping(*region)):
+            distance = near_edge(item)
+            if 0 <= distance <= reach:
+                hits.append((distance, order, item))
+        hits.sort(key=lambda h: (h[0], h[1]))
+        return [(distance, item) for distance, _, item in hits]
+
+
+def page_index(pdf_path, page_num, kind='words'):
+    """
+    Spatial index over a cached template page
+
+    Args:
+        pdf_path: Template PDF
+        page_num: 0-indexed page
+        kind: 'words', 'rects' or 'drawings'
+
+    Returns:
+        SpatialIndex, built once per (template content, extraction backend, page, kind);
+        the backend is the one that produced the data, after any fallback
+    """
+    analysis = load_template_analysis(pdf_path, [page_num])
+    key = (analysis['hash'], analysis['backend'], page_num, kind)
+    if key not in _page_indexes:
+        _page_indexes[key] = SpatialIndex(analysis['pages'][str(page_num)][kind])
+    return _page_indexes[key]
@@ -0,0 +1,484 @@
+#!/usr/bin/env python3
+"""
+Template Analysis Cache
+Extracts words, rectangles and drawings from a PDF template once and keeps
+them on disk, keyed by a SHA-256 of the template bytes.
+
+Any change to the template produces a new hash, so stale layouts are never
+reused. Pages are analysed on demand and merged into the cached entry.
+
+Words, rectangles and drawings come from one of two extraction backends:
+    pdfplumber  pdfminer's extract_words() + page.rects/curves/lines (default, the original extractor)
+    pymupdf     page.get_text("words") + page.get_drawings()
+Both return the same dict shapes, but they are not interchangeable on every
+template (see below). Set $PDF_ANALYSIS_BACKEND to pick one; if
+MuPDF fails on a document, the pages are analysed with pdfplumber instead,
+and a marker in the cache keeps that template on pdfplumber from then on.
+pymupdf is not the default: it also reports rectangles drawn as "re h",
+which pdfminer files under curves, and get_drawings() gives no way to tell
+the two apart. Box detection can therefore differ per template (A0124 is
+one); run --check-backends on a template before switching it over.
+
+Usage:
+    from template_cache import page_analysis
+    words = page_analysis("pdf/A0124_pages_1_to_4.pdf", 0)['words']
+
+    python template_cache.py [PDF]                  # warm the cache for every page
+    python template_cache.py [PDF] --check-backends # pymupdf vs pdfplumber equivalence check
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+
+from instrumentation import METRICS
+
+CACHE_DIR = ".cache/templates"
+CACHE_VERSION = 3
+
+ANALYSIS_BACKENDS = ('pdfplumber', 'pymupdf')
+DEFAULT_BACKEND = 'pdfplumber'
+FALLBACK_BACKEND = 'pdfplumber'
+BACKEND_ENV = "PDF_ANALYSIS_BACKEND"
+
+# Coordinates within this many points count as equal in the backend check.
+# MuPDF takes the descent from the embedded font, pdfminer from the font
+# descriptor; on 14pt Helvetica the word bottoms differ by ~1.3pt.
+CHECK_TOLERANCE = 1.5
+
+# In-process memo: (content hash, backend) -> analysis dict
+_memory = {}
+# (path, mtime_ns, size) -> content hash, so batch runs don't rehash the file
+_hash_memo = {}
+
+
+def template_hash(pdf_path):
+    """SHA-256 of the template file contents"""
+    stat = os.stat(pdf_path)
+    memo_key = (os.path.abspath(pdf_path), stat.st_mtime_ns, stat.st_size)
+    if memo_key in _hash_memo:
+        return _hash_memo[memo_key]
+
+    digest = hashlib.sha256()
+    with open(pdf_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+
+    _hash_memo[memo_key] = digest.hexdigest()
+    return _hash_memo[memo_key]
+
+
+def analysis_backend(backend=None):
+    """Backend to use: the argument, else $PDF_ANALYSIS_BACKEND, else pdfplumber"""
+    backend = backend or os.environ.get(BACKEND_ENV) or DEFAULT_BACKEND
+    if backend not in ANALYSIS_BACKENDS:
+        raise ValueError(f"Unknown analysis backend: {backend} (choose from {', '.join(ANALYSIS_BACKENDS)})")
+    return backend
+
+
+def _cache_path(content_hash, cache_dir, backend):
+    return os.path.join(cache_dir, f"{content_hash}.{backend}.json")
+
+
+def _read_cache(content_hash, cache_dir, backend):
+    try:
+        with open(_cache_path(content_hash, cache_dir, backend), 'r', encoding='utf-8') as f:
+            cached = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+    if cached.get('version') != CACHE_VERSION or cached.get('hash') != content_hash:
+        return None
+    return cached
+
+
+def _write_cache(analysis, cache_dir):
+    os.makedirs(cache_dir, exist_ok=True)
+    path = _cache_path(analysis['hash'], cache_dir, analysis['backend'])
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(analysis, f, ensure_ascii=False)
+    os.replace(tmp_path, path)  # atomic, safe with concurrent writers
+
+
+def _color(value):
+    return list(value) if value is not None else None
+
+
+def _pymupdf_words(page):
+    """
+    Words in pdfplumber's shape from MuPDF
+
+    MuPDF word boxes span the font's ascender; pdfminer's are one font size
+    tall above the same bottom edge. The top is rebuilt from the line's font
+    size so label positions and offsets match the pdfplumber backend.
+    """
+    try:
+        import pymupdf as fitz  # PyMuPDF
+    except ImportError:  # PyMuPDF < 1.24
+        import fitz
+
+    textpage = page.get_textpage(flags=fitz.TEXTFLAGS_WORDS)
+    sizes = {}  # (block, line) -> largest span size, numbered like the words output
+    for block in page.get_text('dict', textpage=textpage)['blocks']:
+        for line_no, line in enumerate(block.get('lines', ())):
+            sizes[(block['number'], line_no)] = max((span['size'] for span in line['spans']), default=0)
+
+    words = []
+    for x0, y0, x1, y1, text, block_no, line_no, _ in page.get_text('words', textpage=textpage):
+        size = sizes.get((block_no, line_no))
+        words.append({
+            'text': text,
+            'x0': x0,
+            'x1': x1,
+            'top': y1 - size if size else y0,
+            'bottom': y1,
+        })
+    return words
+
+
+def _pymupdf_rects(drawings):
+    """Rectangles drawn with 're' (pdfminer's LTRect), from page.get_drawings() output"""
+    rects = []
+    for d in drawings:
+        for item in d['items']:
+            if item[0] == 're':
+                r = item[1]
+                rects.append({
+                    'x0': r.x0,
+                    'x1': r.x1,
+                    'top': r.y0,
+                    'bottom': r.y1,
+                    'width': r.x1 - r.x0,
+                    'height': r.y1 - r.y0,
+                })
+    return rects
+
+
+def _pdfplumber_color(value):
+    """pdfplumber colour (a gray level or a component tuple) as PyMuPDF's RGB list"""
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return [float(value)] * 3
+    value = [float(v) for v in value]
+    return value * 3 if len(value) == 1 else value
+
+
+def _pdfplumber_drawing(obj):
+    """A pdfplumber rect/curve/line in the shape of the PyMuPDF drawings"""
+    kind = ('f' if obj.get('fill') else '') + ('s' if obj.get('stroke') else '')
+    return {
+        'type': kind or None,
+        'x0': obj['x0'],
+        'x1': obj['x1'],
+        'top': obj['top'],
+        'bottom': obj['bottom'],
+        'fill': _pdfplumber_color(obj.get('non_stroking_color')) if obj.get('fill') else None,
+        'color': _pdfplumber_color(obj.get('stroking_color')) if obj.get('stroke') else None,
+        'width': obj.get('linewidth'),
+    }
+
+
+def _pdfplumber_pages(pdf_path, page_numbers):
+    """({page_num: (words, rects, drawings, width, height)}, page count) from pdfplumber"""
+    import pdfplumber
+
+    pages = {}
+    with pdfplumber.open(pdf_path) as pdf:
+        for page_num in page_numbers:
+            plumber_page = pdf.pages[page_num]
+            words = [
+                {
+                    'text': w['text'],
+                    'x0': w['x0'],
+                    'x1': w['x1'],
+                    'top': w['top'],
+                    'bottom': w['bottom'],
+                }
+                for w in plumber_page.extract_words()
+            ]
+            rects = [
+                {
+                    'x0': r['x0'],
+                    'x1': r['x1'],
+                    'top': r['top'],
+                    'bottom': r['bottom'],
+                    'width': r['width'],
+                    'height': r['height'],
+                }
+                for r in plumber_page.rects
+            ]
+            drawings = [_pdfplumber_drawing(obj) for kind in ('rect', 'curve', 'line')
+                        for obj in plumber_page.objects.get(kind, ())]
+            pages[page_num] = (words, rects, drawings, float(plumber_page.width), float(plumber_page.height))
+        page_count = len(pdf.pages)
+    return pages, page_count
+
+
+def _analyze_pages(pdf_path, page_numbers, backend=None):
+    """Extract words, rects and drawings for the given pages with the selected backend"""
+    backend = analysis_backend(backend)
+    if backend == 'pdfplumber':
+        plumber, page_count = _pdfplumber_pages(pdf_path, page_numbers)
+        pages = {}
+        for page_num in page_numbers:
+            words, rects, drawings, width, height = plumber[page_num]
+            pages[str(page_num)] = {
+                'page': page_num,
+                'width': width,
+                'height': height,
+                'words': words,
+                'rects': rects,
+                'drawings': drawings,
+            }
+        return pages, page_count
+
+    try:
+        import pymupdf as fitz  # PyMuPDF
+    except ImportError:  # PyMuPDF < 1.24
+        import fitz
+
+    pages = {}
+    with fitz.open(pdf_path) as doc:
+        for page_num in page_numbers:
+            page = doc[page_num]
+            raw_drawings = page.get_drawings()
+            drawings = []
+            for d in raw_drawings:
+                r = d['rect']
+                drawings.append({
+                    'type': d.get('type'),
+                    'x0': r.x0,
+                    'x1': r.x1,
+                    'top': r.y0,
+                    'bottom': r.y1,
+                    'fill': _color(d.get('fill')),
+                    'color': _color(d.get('color')),
+                    'width': d.get('width'),
+                })
+            words, rects = _pymupdf_words(page), _pymupdf_rects(raw_drawings)
+            width, height = page.rect.width, page.rect.height
+
+            pages[str(page_num)] = {
+                'page': page_num,
+                'width': width,
+                'height': height,
+                'words': words,
+                'rects': rects,
+                'drawings': drawings,
+            }
+        page_count = len(doc)
+
+    return pages, page_count
+
+
+def _analyze_pages_parallel(pdf_path, page_numbers, workers, backend):
+    """_analyze_pages with the pages spread over a process pool"""
+    from concurrent.futures import ProcessPoolExecutor
+
+    chunks = [page_numbers[i::workers] for i in range(workers)]
+    pages = {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for chunk_pages, page_count in pool.map(_analyze_pages, [pdf_path] * workers, chunks,
+                                                [backend] * workers):
+            pages.update(chunk_pages)
+    return pages, page_count
+
+
+def _cached_analysis(pdf_path, content_hash, cache_dir, backend):
+    """Memoised or on-disk analysis for (template, backend), else an empty one"""
+    analysis = _memory.get((content_hash, backend)) or _read_cache(content_hash, cache_dir, backend)
+    if analysis is None:
+        analysis = {
+            'version': CACHE_VERSION,
+            'hash': content_hash,
+            'backend': backend,
+            'pdf_file': pdf_path,
+            'page_count': None,
+            'pages': {},
+        }
+    return analysis
+
+
+def _record_fallback(pdf_path, content_hash, cache_dir, backend):
+    """
+    Remember that a template falls back from backend to FALLBACK_BACKEND
+
+    The marker sits where backend's analysis would be cached, so later loads
+    go straight to the fallback analysis instead of retrying MuPDF.
+    """
+    marker = _cached_analysis(pdf_path, content_hash, cache_dir, backend)
+    marker.update(fallback=FALLBACK_BACKEND, page_count=None, pages={})
+    _write_cache(marker, cache_dir)
+    _memory[(content_hash, backend)] = marker
+
+
+def template_backend(pdf_path, cache_dir=CACHE_DIR, backend=None):
+    """Backend whose data load_template_analysis() returns for a template, after recorded fallbacks"""
+    backend = analysis_backend(backend)
+    content_hash = template_hash(pdf_path)
+    return _cached_analysis(pdf_path, content_hash, cache_dir, backend).get('fallback', backend)
+
+
+def load_template_analysis(pdf_path, pages=None, cache_dir=CACHE_DIR, workers=1, backend=None):
+    """
+    Return the cached analysis for a template, analysing missing pages first
+
+    Args:
+        pdf_path: Path to the template PDF
+        pages: Page numbers (0-indexed) that must be present; None = all pages
+        cache_dir: Directory holding the on-disk cache
+        workers: Processes for analysing missing pages (the cache is written once, here)
+        backend: 'pdfplumber' or 'pymupdf' (None = $PDF_ANALYSIS_BACKEND or pdfplumber)
+
+    Returns:
+        Dict with 'hash', 'backend', 'pdf_file', 'page_count' and 'pages'
+        ({str(page_num): {'words', 'rects', 'drawings', 'width', 'height'}}).
+        'backend' is the one that produced the data: after a MuPDF failure it
+        is FALLBACK_BACKEND, for this and every later call on the template.
+    """
+    backend = analysis_backend(backend)
+    content_hash = template_hash(pdf_path)
+    analysis = _cached_analysis(pdf_path, content_hash, cache_dir, backend)
+    if 'fallback' in analysis:
+        return load_template_analysis(pdf_path, pages, cache_dir, workers, analysis['fallback'])
+
+    if pages is None:
+        if analysis['page_count'] is None:
+            try:
+                import pymupdf as fitz  # PyMuPDF
+            except ImportError:  # PyMuPDF < 1.24
+                import fitz
+            with fitz.open(pdf_path) as doc:
+                analysis['page_count'] = len(doc)
+        pages = range(analysis['page_count'])
+
+    missing = [p for p in pages if str(p) not in analysis['pages']]
+    METRICS.count('template_cache_hits', len(pages) - len(missing))
+    if missing:
+        METRICS.count('template_cache_misses', len(missing))
+        workers = max(1, min(workers, len(missing)))
+        try:
+            with METRICS.stage('template_analysis'):
+                if workers > 1:
+                    new_pages, page_count = _analyze_pages_parallel(pdf_path, missing, workers, backend)
+                else:
+                    new_pages, page_count = _analyze_pages(pdf_path, missing, backend)
+        except Exception as e:
+            if backend == FALLBACK_BACKEND:
+                raise
+            print(f"⚠️  {backend} analysis failed ({e}); falling back to {FALLBACK_BACKEND}", file=sys.stderr)
+            METRICS.count('analysis_backend_fallbacks')
+            _record_fallback(pdf_path, content_hash, cache_dir, backend)
+            return load_template_analysis(pdf_path, pages, cache_dir, workers, FALLBACK_BACKEND)
+        analysis['pages'].update(new_pages)
+        analysis['page_count'] = page_count
+        _write_cache(analysis, cache_dir)
+
+    _memory[(content_hash, backend)] = analysis
+    return analysis
+
+
+def page_analysis(pdf_path, page_num, cache_dir=CACHE_DIR, backend=None):
+    """Cached words/rects/drawings for one page of a template"""
+    analysis = load_template_analysis(pdf_path, [page_num], cache_dir, backend=backend)
+    return analysis['pages'][str(page_num)]
+
+
+def _unmatched(items, others, keys=('x0', 'x1', 'top', 'bottom')):
+    """
+    Pair up items by text and position (every key within CHECK_TOLERANCE)
+
+    Returns:
+        (items without a counterpart, others without a counterpart)
+    """
+    remaining = list(others)
+    unmatched = []
+    for item in items:
+        for i, other in enumerate(remaining):
+            if item.get('text') == other.get('text') and all(
+                    abs(item[key] - other[key]) <= CHECK_TOLERANCE for key in keys):
+                del remaining[i]
+                break
+        else:
+            unmatched.append(item)
+    return unmatched, remaining
+
+
+def check_backends(pdf_path):
+    """
+    Analyse every page with both backends and compare words and rects
+
+    Every pdfplumber word and rect must have a pymupdf counterpart and vice
+    versa. Rects only pymupdf reports (e.g. "x y w h re h" paths, which
+    pdfminer files under curves) are mismatches too: they change box detection.
+
+    Returns:
+        {page_num: {'words', 'rects', 'word_mismatches', 'rect_mismatches'}},
+        mismatches being the unpaired items of either backend
+    """
+    try:
+        import pymupdf as fitz  # PyMuPDF
+    except ImportError:  # PyMuPDF < 1.24
+        import fitz
+    with fitz.open(pdf_path) as doc:
+        page_numbers = list(range(len(doc)))
+
+    fast, _ = _analyze_pages(pdf_path, page_numbers, 'pymupdf')
+    reference, _ = _analyze_pages(pdf_path, page_numbers, 'pdfplumber')
+
+    report = {}
+    for page_num in page_numbers:
+        ours, theirs = fast[str(page_num)], reference[str(page_num)]
+        extra_words, missing_words = _unmatched(ours['words'], theirs['words'])
+        extra_rects, missing_rects = _unmatched(ours['rects'], theirs['rects'])
+        report[page_num] = {
+            'words': len(theirs['words']),
+            'rects': len(theirs['rects']),
+            'word_mismatches': extra_words + missing_words,
+            'rect_mismatches': extra_rects + missing_rects,
+        }
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Warm the template analysis cache")
+    parser.add_argument('pdf', nargs='?', default="pdf/A0124_pages_1_to_4.pdf")
+    parser.add_argument('--backend', choices=ANALYSIS_BACKENDS,
+                        help=f"Extraction backend (default: ${BACKEND_ENV} or {DEFAULT_BACKEND})")
+    parser.add_argument('--check-backends', action='store_true',
+                        help="Compare pymupdf against pdfplumber on every page instead")
+    args = parser.parse_args(argv)
+
+    print(f"Template: {args.pdf}")
+    if args.check_backends:
+        report = check_backends(args.pdf)
+        failed = False
+        for page_num, page in report.items():
+            words, rects = page['word_mismatches'], page['rect_mismatches']
+            status = "✓" if not words and not rects else "❌"
+            failed = failed or status == "❌"
+            print(f"  {status} Page {page_num + 1}: {page['words']} words ({len(words)} differ), "
+                  f"{page['rects']} rects ({len(rects)} differ)")
+            for word in words[:5]:
+                print(f"      word {word['text']!r} at ({word['x0']:.1f}, {word['top']:.1f})")
+            for rect in rects[:5]:
+                print(f"      rect at ({rect['x0']:.1f}, {rect['top']:.1f}) {rect['width']:.1f}x{rect['height']:.1f}")
+        print("❌ Backends disagree" if failed else "✅ pymupdf matches pdfplumber")
+        return 1 if failed else 0
+
+    analysis = load_template_analysis(args.pdf, backend=args.backend)
+    print(f"  Hash: {analysis['hash']} ({analysis['backend']})")
+    for key in sorted(analysis['pages'], key=int):
+        page = analysis['pages'][key]
+        print(f"  Page {page['page'] + 1}: {len(page['words'])} words, "
+              f"{len(page['rects'])} rects, {len(page['drawings'])} drawings")
+    print(f"✓ Cached in {_cache_path(analysis['hash'], CACHE_DIR, analysis['backend'])}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,84 @@
+"""
+Shared fixtures: small generated templates, and every cache pointed at tmp_path
+"""
+
+import json
+import os
+import sys
+
+try:
+    import pymupdf as fitz  # PyMuPDF
+except ImportError:  # PyMuPDF < 1.24
+    import fitz
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import template_cache  # noqa: E402
+
+# (label, x, y of the baseline); every label gets an input box to its right
+LABELS = [('성명', 40, 180), ('주민등록번호', 40, 220), ('연락처', 40, 260), ('주소', 40, 300)]
+BOX_GAP = 20
+
+
+def make_template(path, pages=2, close_paths=False):
+    """
+    Korean labels with a stroked input box right of each one
+
+    The boxes are written as raw "re S" operators, the way form templates
+    draw them. close_paths=True writes "re h S" instead: the same rectangle
+    with a redundant closepath, which pdfminer reports as a curve.
+    """
+    doc = fitz.open()
+    for _ in range(pages):
+        page = doc.new_page()
+        ops = []
+        for label, x, y in LABELS:
+            page.insert_text(fitz.Point(x, y), label, fontname='korea', fontsize=8)
+            x0 = x + 8 * len(label) + BOX_GAP
+            # PDF user space: y grows upwards
+            ops.append(f"q {x0} {page.rect.height - y - 6} 200 20 re{' h' if close_paths else ''} 0.5 w S Q")
+        page.clean_contents()
+        xref = page.get_contents()[0]
+        doc.update_stream(xref, doc.xref_stream(xref) + ("\n" + "\n".join(ops) + "\n").encode())
+    doc.save(path)
+    doc.close()
+    return str(path)
+
+
+def make_config(path, template):
+    """Field config with a name box on page 1 and a phone box on page 2 of make_template()"""
+    field = {'alignment': 'middle', 'allow_wrap': False, 'fontsize': 10, 'min_fontsize': 7}
+    config = {
+        'pdf_template': template,
+        'settings': {'default_fontname': 'helv'},
+        'fields': [
+            dict(field, id='name', label='성명', json_key='name', page=1,
+                 box={'x0': 76, 'x1': 276, 'y0': 166, 'y1': 186}),
+            dict(field, id='phone', label='연락처', json_key='phone', page=2,
+                 box={'x0': 84, 'x1': 284, 'y0': 246, 'y1': 266}),
+        ],
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(config, f, ensure_ascii=False)
+    return str(path)
+
+
+@pytest.fixture(autouse=True)
+def isolated_caches(tmp_path, monkeypatch):
+    """Run every test in tmp_path (relative .cache dirs) with empty in-process memos"""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.delenv(template_cache.BACKEND_ENV, raising=False)
+    monkeypatch.setattr(template_cache, '_memory', {})
+    import spatial_index
+    monkeypatch.setattr(spatial_index, '_page_indexes', {})
+
+
+@pytest.fixture
+def template(tmp_path):
+    return make_template(tmp_path / 'template.pdf')
+
+
+@pytest.fixture
+def closed_path_template(tmp_path):
+    return make_template(tmp_path / 'closed_paths.pdf', close_paths=True)
@@ -0,0 +1,21 @@
+"""
+Stage timings of the fill benchmark
+"""
+
+from benchmark_fill import STAGES, bench_stages, synthetic_records
+from conftest import make_config, make_template
+from instrumentation import METRICS
+
+
+def test_bench_stages_fills_every_page_from_flat_and_wrapped_records(tmp_path):
+    config_path = make_config(tmp_path / 'config.json', make_template(tmp_path / 'template.pdf'))
+
+    records = synthetic_records(2)
+    records.append(records[0]['parsedJson'])  # flat record
+    METRICS.reset()
+    stages = bench_stages(config_path, records)
+
+    assert set(stages) == set(STAGES)
+    # Two pages with one field each: layout and insert run once per page and record
+    assert METRICS.stages['layout'][0] == METRICS.stages['insert'][0] == 2 * len(records)
+    assert METRICS.stages['save'][0] == len(records)
@@ -0,0 +1,51 @@
+"""
+Field config generation from box detection
+"""
+
+import json
+
+import config_generator
+from config_generator import generate_field_config, validate_field_config
+from conftest import make_template
+
+
+def test_repeated_labels_become_one_field_each(template):
+    config, detection = generate_field_config(template, workers=1)
+
+    assert len(detection['fields']) == 8  # four labels on both pages
+    assert [(f['id'], f['page']) for f in config['fields']] == [
+        ('name', 1), ('id_number', 1), ('phone', 1), ('address', 1)]
+    assert validate_field_config(config, page_count=2) == []
+
+
+def test_all_pages_keeps_every_occurrence(template):
+    config, _ = generate_field_config(template, workers=1, all_pages=True)
+    assert [f['id'] for f in config['fields']] == [
+        'name', 'id_number', 'phone', 'address', 'name_p2', 'id_number_p2', 'phone_p2', 'address_p2']
+
+
+def test_detection_is_cached_per_template(template):
+    generate_field_config(template, workers=1)
+    _, detection = generate_field_config(template, workers=1)
+    assert config_generator.METRICS.counters['detection_cache_hits'] >= 1
+    assert detection['boxes_missing'] == [] and detection['labels_missing'] == []
+
+
+def test_main_explains_an_empty_detection(tmp_path, capsys):
+    # 're h' boxes: pdfplumber finds every label but no box around it
+    template = make_template(tmp_path / 'closed.pdf', close_paths=True)
+    output = tmp_path / 'config.json'
+
+    assert config_generator.main([template, '--workers', '1', '--output', str(output)]) == 1
+    printed = capsys.readouterr().out
+    assert "Generated config is invalid" in printed
+    assert "Extraction backend: pdfplumber" in printed
+    assert "No suitable input box found: 성명 (page 1)" in printed
+    assert "--check-backends" in printed
+    assert not output.exists()
+
+
+def test_main_writes_the_config(template, tmp_path):
+    output = tmp_path / 'config.json'
+    assert config_generator.main([template, '--workers', '1', '--output', str(output)]) == 0
+    assert len(json.loads(output.read_text(encoding='utf-8'))['fields']) == 4
@@ -0,0 +1,71 @@
+"""
+Synonym matching of field names and labels to JSON keys
+"""
+
+import pytest
+
+from field_matcher import FieldMatcher, get_matcher
+
+
+@pytest.mark.parametrize('field_name, json_key', [
+    ('성명', 'name'),
+    ('주민등록번호', 'id_number'),
+    ('ID Number', 'id_number'),
+    ('전화번호', 'phone'),
+    ('휴대전화번호', 'phone'),
+    ('Phone Number', 'phone'),
+    ('Telephone No.', 'phone'),
+    ('연락처', 'phone'),
+    ('Home address', 'address'),
+    ('Resident Address', 'address'),
+    ('Signature', None),
+])
+def test_match(field_name, json_key):
+    assert get_matcher().match(field_name) == json_key
+
+
+def test_longest_synonym_wins_and_ties_go_to_the_first_key():
+    matcher = FieldMatcher({'first': ['ab'], 'second': ['ab', 'abc']})
+    assert matcher.match('xabx') == 'first'
+    assert matcher.match('xabcx') == 'second'
+
+
+def test_whole_label_beats_whole_word_beats_substring():
+    matcher = FieldMatcher({'inner': ['abcdef'], 'word': ['ab'], 'label': ['ab cd']})
+    assert matcher.match('xabcdefx ab') == 'word'  # a whole word outranks a longer synonym inside a word
+    assert matcher.match('AB CD:') == 'label'
+    assert matcher.match('xabcdefx') == 'inner'
+
+
+def test_korean_labels_without_spaces_fall_back_to_substrings():
+    matcher = get_matcher()
+    assert matcher.match('주민등록번호') == 'id_number'
+    assert matcher.match('주민등록상 주소') == 'address'
+
+
+def test_form_field_names_map_to_phone(tmp_path):
+    try:
+        import pymupdf as fitz  # PyMuPDF
+    except ImportError:  # PyMuPDF < 1.24
+        import fitz
+
+    from form_filler import FormFiller
+
+    doc = fitz.open()
+    page = doc.new_page()
+    for i, name in enumerate(['전화번호', '휴대전화번호', '주민등록번호', 'Phone Number']):
+        widget = fitz.Widget()
+        widget.field_name = name
+        widget.field_type = fitz.PDF_WIDGET_TYPE_TEXT
+        widget.rect = fitz.Rect(50, 50 + 30 * i, 250, 70 + 30 * i)
+        page.add_widget(widget)
+    path = str(tmp_path / 'form.pdf')
+    doc.save(path)
+    doc.close()
+
+    assert FormFiller(path).json_keys == {
+        '전화번호': 'phone',
+        '휴대전화번호': 'phone',
+        '주민등록번호': 'id_number',
+        'Phone Number': 'phone',
+    }
@@ -0,0 +1,49 @@
+"""
+Preview crop cache: keys cover every field drawn into a crop
+"""
+
+from field_previews import PreviewRenderer
+from instrumentation import METRICS
+
+
+def _config(template):
+    field = {'alignment': 'middle', 'allow_wrap': False, 'fontsize': 10, 'min_fontsize': 10, 'page': 1}
+    return {
+        'pdf_template': template,
+        'settings': {'default_fontname': 'helv'},
+        'fields': [
+            # 10pt gap: the boxes stay out of each other's crop (4pt margin)
+            dict(field, id='left', label='left', json_key='left', box={'x0': 40, 'x1': 100, 'y0': 400, 'y1': 420}),
+            dict(field, id='right', label='right', json_key='right', box={'x0': 110, 'x1': 300, 'y0': 400, 'y1': 420}),
+        ],
+    }
+
+
+def _right_crop(renderer, record):
+    crops = renderer.render(record)
+    return next(png for field_def, _, png in crops if field_def['id'] == 'right')
+
+
+def test_overflowing_text_is_part_of_the_neighbours_crop_key(template):
+    renderer = PreviewRenderer(_config(template), cache_dir=None)
+    try:
+        # min_fontsize == fontsize, so the long values overflow into the right box
+        first = _right_crop(renderer, {'left': 'A' * 30, 'right': 'x'})
+        misses = METRICS.snapshot()['counters'].get('preview_cache_misses', 0)
+        second = _right_crop(renderer, {'left': 'W' * 30, 'right': 'x'})
+        assert METRICS.snapshot()['counters']['preview_cache_misses'] == misses + 2
+        assert first != second
+    finally:
+        renderer.close()
+
+
+def test_text_inside_its_box_leaves_the_neighbours_crop_cached(template):
+    renderer = PreviewRenderer(_config(template), cache_dir=None)
+    try:
+        first = _right_crop(renderer, {'left': 'ab', 'right': 'x'})
+        hits = METRICS.snapshot()['counters'].get('preview_cache_hits', 0)
+        second = _right_crop(renderer, {'left': 'cd', 'right': 'x'})
+        assert METRICS.snapshot()['counters']['preview_cache_hits'] == hits + 1
+        assert first == second
+    finally:
+        renderer.close()
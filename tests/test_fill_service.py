@@ -0,0 +1,69 @@
+"""
+HTTP fill service: worker metrics and backpressure
+"""
+
+import asyncio
+import json
+
+import pytest
+
+from conftest import make_config, make_template
+from fill_service import FillService
+from instrumentation import METRICS
+
+RECORD = json.dumps({'name': 'Kim Minji', 'phone': '010-1234-5678'}).encode()
+
+
+@pytest.fixture
+def config(tmp_path):
+    return make_config(tmp_path / 'config.json', make_template(tmp_path / 'template.pdf'))
+
+
+@pytest.fixture
+def fresh_metrics():
+    METRICS.reset()
+    yield METRICS
+    METRICS.reset()
+
+
+def test_pool_worker_stage_metrics_reach_stats_and_metrics(config, fresh_metrics):
+    service = FillService({'form': config}, workers=1)
+    try:
+        status, content_type, payload = asyncio.run(service.route('POST', '/fill', RECORD))
+        assert status == 200 and payload.startswith(b'%PDF')
+
+        stats = json.loads(asyncio.run(service.route('GET', '/stats', b''))[2])
+        for stage in ('template_open', 'layout', 'insert', 'save', 'fill', 'queue_wait'):
+            assert stats['stages'][stage]['count'] >= 1, stage
+
+        prometheus = asyncio.run(service.route('GET', '/metrics', b''))[2].decode()
+        assert 'stage="save"' in prometheus and 'stage="layout"' in prometheus
+    finally:
+        service.close()
+
+
+def test_requests_beyond_max_pending_get_503(config, fresh_metrics):
+    service = FillService({'form': config}, workers=0, max_pending=1)
+
+    async def two_at_once():
+        return await asyncio.gather(service.route('POST', '/fill/form', RECORD),
+                                    service.route('POST', '/fill/form', RECORD))
+
+    try:
+        (first, *_), (second, *_) = asyncio.run(two_at_once())
+        assert (first, second) == (200, 503)
+        assert fresh_metrics.counters['requests_rejected'] == 1
+        assert fresh_metrics.counters['requests_filled'] == 1
+    finally:
+        service.close()
+
+
+def test_bad_requests(config, fresh_metrics):
+    service = FillService({'form': config}, workers=0)
+    try:
+        assert asyncio.run(service.route('POST', '/fill/other', RECORD))[0] == 404
+        assert asyncio.run(service.route('GET', '/fill', b''))[0] == 405
+        assert asyncio.run(service.route('POST', '/fill', b'{not json'))[0] == 400
+        assert asyncio.run(service.route('POST', '/fill', b'[]'))[0] == 400
+    finally:
+        service.close()
@@ -0,0 +1,50 @@
+"""
+Label and input box detection across template pages
+"""
+
+import json
+
+try:
+    import pymupdf as fitz  # PyMuPDF
+except ImportError:  # PyMuPDF < 1.24
+    import fitz
+
+import find_surrounding_boxes
+from conftest import make_template
+from find_surrounding_boxes import FIELD_LABELS, detect_boxes
+
+LABELS = dict(FIELD_LABELS, 서명='Signature', 비고='Remarks')
+
+
+def _with_boxless_label(path):
+    """make_template() plus a '서명' label with nothing drawn around it on page 2"""
+    template = make_template(path)
+    with fitz.open(template) as doc:
+        doc[1].insert_text(fitz.Point(40, 600), '서명', fontname='korea', fontsize=8)
+        doc.saveIncr()
+    return template
+
+
+def test_boxless_labels_are_reported_apart_from_missing_labels(tmp_path):
+    results, missing, boxes_missing = detect_boxes(_with_boxless_label(tmp_path / 't.pdf'), LABELS, workers=1)
+
+    assert [(r['page'], r['field_korean']) for r in results] == [
+        (page, label) for page in (1, 2) for label in FIELD_LABELS]
+    assert boxes_missing == [{'page': 2, 'field_korean': '서명', 'field_english': 'Signature'}]
+    assert missing == ['비고']
+
+
+def test_report_and_json_keep_both_lists(tmp_path, capsys):
+    template = _with_boxless_label(tmp_path / 't.pdf')
+    output = tmp_path / 'report.json'
+    find_surrounding_boxes.main([template, '--label', '서명=Signature', '--label', '비고=Remarks',
+                                 '--workers', '1', '--output', str(output)])
+
+    printed = capsys.readouterr().out
+    assert "❌ No suitable input box found: 서명 (page 2)" in printed
+    assert "❌ Label not found on any page: 비고" in printed
+    assert "Label not found on any page: 서명" not in printed
+
+    report = json.loads(output.read_text(encoding='utf-8'))
+    assert report['labels_missing'] == ['비고']
+    assert [item['field_korean'] for item in report['boxes_missing']] == ['서명']
@@ -0,0 +1,105 @@
+"""
+AcroForm filling through the field-name index
+"""
+
+import pytest
+
+import form_filler
+from conftest import fitz
+from form_filler import FormFiller, _name_text
+
+
+def make_form(path, radio_states=('A', 'Choice#20B')):
+    """A text field, a checkbox and a radio group whose second button's on state needs a name escape"""
+    doc = fitz.open()
+    page = doc.new_page()
+    for name, field_type, rect in (('성명', fitz.PDF_WIDGET_TYPE_TEXT, (50, 50, 250, 70)),
+                                   ('Home Address', fitz.PDF_WIDGET_TYPE_TEXT, (50, 80, 250, 100)),
+                                   ('agree', fitz.PDF_WIDGET_TYPE_CHECKBOX, (50, 110, 70, 130))):
+        widget = fitz.Widget()
+        widget.field_name = name
+        widget.field_type = field_type
+        widget.rect = fitz.Rect(rect)
+        page.add_widget(widget)
+
+    # PyMuPDF cannot create radio groups, so the objects are written directly
+    on_ap, off_ap = doc.get_new_xref(), doc.get_new_xref()
+    for xref, content in ((on_ap, b"2 2 16 16 re f"), (off_ap, b"")):
+        doc.update_object(xref, "<< /Type /XObject /Subtype /Form /BBox [0 0 20 20] >>")
+        doc.update_stream(xref, content)
+    parent = doc.get_new_xref()
+    kids = []
+    for i, state in enumerate(radio_states):
+        kid = doc.get_new_xref()
+        doc.update_object(kid, f"<< /Type /Annot /Subtype /Widget /Rect [50 {600 - 30 * i} 70 {620 - 30 * i}] "
+                               f"/Parent {parent} 0 R /P {page.xref} 0 R /AS /Off "
+                               f"/AP << /N << /{state} {on_ap} 0 R /Off {off_ap} 0 R >> >> >>")
+        kids.append(f"{kid} 0 R")
+    doc.update_object(parent, f"<< /FT /Btn /Ff 49152 /T (choice) /V /Off /Kids [{' '.join(kids)}] >>")
+    _, annots = doc.xref_get_key(page.xref, "Annots")
+    doc.xref_set_key(page.xref, "Annots", annots[:-1] + " " + " ".join(kids) + "]")
+    _, fields = doc.xref_get_key(doc.pdf_catalog(), "AcroForm/Fields")
+    doc.xref_set_key(doc.pdf_catalog(), "AcroForm/Fields", fields[:-1] + f" {parent} 0 R]")
+    doc.save(str(path))
+    doc.close()
+    return str(path)
+
+
+@pytest.fixture
+def form(tmp_path, monkeypatch):
+    monkeypatch.setattr(form_filler, '_indexes', {})
+    return make_form(tmp_path / 'form.pdf')
+
+
+def _filled(pdf_bytes):
+    """{field name: [(field value, /AS of the widget)]} of a filled PDF"""
+    values = {}
+    with fitz.open(stream=pdf_bytes, filetype="pdf") as doc:
+        for widget in doc[0].widgets():
+            state = doc.xref_get_key(widget.xref, "AS")[1]
+            values.setdefault(widget.field_name, []).append((widget.field_value, state))
+    return values
+
+
+def test_index_lists_every_field_once_with_its_widgets(form):
+    fields = FormFiller(form).fields
+    assert list(fields) == ['성명', 'Home Address', 'agree', 'choice']
+    assert [w['on_state'] for w in fields['choice']['widgets']] == ['A', 'Choice#20B']
+    assert fields['agree']['widgets'][0]['on_state'] == 'Yes'
+    assert FormFiller(form).fields is fields  # built once per template
+
+
+def test_fills_text_and_checkbox(form):
+    filled = _filled(FormFiller(form).fill({'성명': '홍길동', 'agree': 'yes', 'unknown': 'x'}))
+    assert filled['성명'] == [('홍길동', 'null')]
+    assert filled['agree'] == [('Yes', '/Yes')]
+    assert _filled(FormFiller(form).fill({'agree': 'off'}))['agree'] == [('Off', '/Off')]
+
+
+@pytest.mark.parametrize('value', ['Choice B', 'Choice#20B'])
+def test_radio_writes_the_templates_on_state(form, value):
+    pdf_bytes = FormFiller(form).fill({'choice': value})
+    # xref_get_key() shows names decoded; the file holds the escaped token
+    assert [state for _, state in _filled(pdf_bytes)['choice']] == ['/Off', '/Choice B']
+    with fitz.open(stream=pdf_bytes, filetype="pdf") as doc:
+        raw = doc.tobytes(expand=255)
+    assert b'/V/Choice#20B' in raw and b'/AS/Choice#20B' in raw and b'/Choice B' not in raw
+
+
+def test_radio_rejects_a_value_matching_no_on_state(form):
+    with pytest.raises(ValueError, match="no state 'C/D'"):
+        FormFiller(form).fill({'choice': 'C/D'})
+
+
+def test_matched_values_by_json_key(form):
+    filler = FormFiller(form)
+    assert filler.matched_values({'name': '홍길동', 'address': '서울', 'phone': '010'}) == {
+        '성명': '홍길동',
+        'Home Address': '서울',
+    }
+
+
+def test_name_text_decodes_escapes():
+    assert _name_text('Choice#20B') == 'Choice B'
+    assert _name_text('#ED#95#9C') == '한'
+    assert _name_text('Yes#') == 'Yes#'
@@ -0,0 +1,45 @@
+"""
+Archive sinks for batch output
+"""
+
+import io
+import json
+import os
+import subprocess
+import sys
+import tarfile
+import zipfile
+
+from conftest import make_config, make_template
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _batch(tmp_path, count=3):
+    config = make_config(tmp_path / 'config.json', make_template(tmp_path / 'template.pdf'))
+    records = tmp_path / 'records.jsonl'
+    records.write_text("".join(
+        json.dumps({'record_id': f"r{i}", 'name': f"Kim {i}", 'phone': "010-1234-5678"}) + "\n"
+        for i in range(count)), encoding='utf-8')
+    return config, str(records)
+
+
+def _fill_to_stdout(tmp_path, *args):
+    config, records = _batch(tmp_path)
+    result = subprocess.run(
+        [sys.executable, os.path.join(REPO, 'populate_pdf_config.py'), '--config', config,
+         '--batch', records, '--archive', '-', *args],
+        cwd=tmp_path, capture_output=True, check=True)
+    return result.stdout
+
+
+def test_zip_on_stdout_holds_only_the_archive(tmp_path):
+    archive = zipfile.ZipFile(io.BytesIO(_fill_to_stdout(tmp_path)))
+    assert archive.testzip() is None
+    assert sorted(archive.namelist()) == [f"populated_config_r{i}.pdf" for i in range(3)]
+
+
+def test_tgz_on_stdout_from_worker_processes(tmp_path):
+    data = _fill_to_stdout(tmp_path, '--archive-format', 'tgz', '--workers', '2')
+    with tarfile.open(fileobj=io.BytesIO(data), mode='r:gz') as archive:
+        assert sorted(archive.getnames()) == [f"populated_config_r{i}.pdf" for i in range(3)]
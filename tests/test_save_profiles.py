@@ -0,0 +1,29 @@
+"""
+Named save profiles
+"""
+
+try:
+    import pymupdf as fitz  # PyMuPDF
+except ImportError:  # PyMuPDF < 1.24
+    import fitz
+import pytest
+
+from save_profiles import SAVE_PROFILES, save_document
+
+
+@pytest.mark.parametrize('profile', sorted(SAVE_PROFILES))
+def test_saves_are_byte_identical(template, tmp_path, profile):
+    outputs = []
+    for i in range(2):
+        with fitz.open(template) as doc:
+            doc[0].insert_text(fitz.Point(80, 180), "Kim Minji", fontname='helv', fontsize=10)
+            outputs.append(save_document(doc, None, profile))
+            save_document(doc, str(tmp_path / f"{profile}_{i}.pdf"), profile)
+
+    assert outputs[0] == outputs[1]
+    assert (tmp_path / f"{profile}_0.pdf").read_bytes() == (tmp_path / f"{profile}_1.pdf").read_bytes()
+
+
+def test_unknown_profile():
+    with pytest.raises(ValueError):
+        save_document(fitz.open(), None, 'smallest')
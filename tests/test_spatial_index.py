@@ -0,0 +1,115 @@
+"""
+Grid queries agree with the linear scans they replace
+"""
+
+import random
+
+import pytest
+
+import spatial_index
+from spatial_index import SpatialIndex, page_index
+
+
+def _box(x0, top, x1, bottom, name=None):
+    return {'x0': x0, 'top': top, 'x1': x1, 'bottom': bottom, 'name': name}
+
+
+def _random_items(count=300, seed=7):
+    rng = random.Random(seed)
+    items = []
+    for i in range(count):
+        x0, top = rng.uniform(-60, 600), rng.uniform(-60, 800)
+        # Mostly word-sized boxes, some spanning several 50pt cells
+        if i % 5:
+            width, height = rng.uniform(1, 40), rng.uniform(5, 15)
+        else:
+            width, height = rng.uniform(50, 300), rng.uniform(20, 120)
+        items.append(_box(x0, top, x0 + width, top + height, i))
+    return items
+
+
+def _overlapping(items, x0, y0, x1, y1):
+    return [i for i in items if not (i['x1'] < x0 or i['x0'] > x1 or i['bottom'] < y0 or i['top'] > y1)]
+
+
+QUERIES = [
+    (0, 0, 50, 50),            # exactly one cell
+    (49.5, 49.5, 50.5, 50.5),  # straddles a cell corner
+    (120, 300, 380, 340),      # a form row
+    (-200, -200, -100, -100),  # outside every item
+    (-1000, -1000, 2000, 2000),  # the whole page and beyond
+    (300, 100, 300, 100),      # a point
+]
+
+
+@pytest.mark.parametrize('query', QUERIES)
+def test_overlapping_matches_linear_scan_in_item_order(query):
+    items = _random_items()
+    assert SpatialIndex(items).overlapping(*query) == _overlapping(items, *query)
+
+
+def test_random_queries_match_linear_scan():
+    items = _random_items()
+    index = SpatialIndex(items, cell_size=37)
+    rng = random.Random(11)
+    for _ in range(200):
+        x0, y0 = rng.uniform(-100, 650), rng.uniform(-100, 850)
+        query = (x0, y0, x0 + rng.uniform(0, 200), y0 + rng.uniform(0, 200))
+        assert index.overlapping(*query) == _overlapping(items, *query)
+
+
+def test_edges_are_inclusive():
+    index = SpatialIndex([_box(10, 10, 20, 20)])
+    assert len(index.overlapping(20, 20, 30, 30)) == 1
+    assert not index.overlapping(20.01, 20.01, 30, 30)
+
+
+def test_within_and_containing():
+    outer, inner, crossing = _box(0, 0, 200, 100, 'outer'), _box(20, 20, 40, 30, 'inner'), _box(190, 50, 260, 60, 'x')
+    index = SpatialIndex([outer, inner, crossing])
+    assert index.within(10, 10, 200, 100) == [inner]
+    assert index.containing(25, 22, 35, 28) == [outer, inner]
+
+
+@pytest.mark.parametrize('direction', ['right', 'left', 'below', 'above'])
+def test_nearest_matches_brute_force(direction):
+    items = _random_items()
+    anchor = _box(250, 380, 290, 392)
+    hits = SpatialIndex(items).nearest(anchor, direction, max_distance=150)
+
+    expected = []
+    for order, item in enumerate(items):
+        if direction in ('right', 'left'):
+            aligned = not (item['bottom'] < anchor['top'] or item['top'] > anchor['bottom'])
+            gap = item['x0'] - anchor['x1'] if direction == 'right' else anchor['x0'] - item['x1']
+        else:
+            aligned = not (item['x1'] < anchor['x0'] or item['x0'] > anchor['x1'])
+            gap = item['top'] - anchor['bottom'] if direction == 'below' else anchor['top'] - item['bottom']
+        if aligned and 0 <= gap <= 150:
+            expected.append((gap, order, item))
+    expected.sort(key=lambda h: (h[0], h[1]))
+
+    assert hits == [(gap, item) for gap, _, item in expected]
+    assert hits, "the fixture should put something next to the anchor"
+
+
+def test_nearest_rejects_unknown_direction():
+    with pytest.raises(ValueError, match="Unknown direction"):
+        SpatialIndex([_box(0, 0, 1, 1)]).nearest(_box(0, 0, 1, 1), 'sideways')
+
+
+def test_empty_index():
+    index = SpatialIndex([])
+    assert len(index) == 0
+    assert index.overlapping(0, 0, 100, 100) == []
+    assert index.nearest(_box(0, 0, 1, 1), 'right') == []
+
+
+def test_page_index_is_built_once_per_page_and_kind(template):
+    words = page_index(template, 0, 'words')
+    assert page_index(template, 0, 'words') is words
+    assert page_index(template, 0, 'rects') is not words
+    assert len(spatial_index._page_indexes) == 2
+    label = next(w for w in words.items if w['text'] == '성명')
+    (gap, box), = page_index(template, 0, 'rects').nearest(label, 'right', max_distance=50)
+    assert box['x0'] > label['x1'] and gap == pytest.approx(box['x0'] - label['x1'])
@@ -0,0 +1,113 @@
+"""
+pdfplumber vs pymupdf extraction backends of the template analysis cache
+"""
+
+import os
+
+import pytest
+
+import template_cache
+from conftest import fitz
+from find_surrounding_boxes import FIELD_LABELS, detect_boxes
+from template_cache import CHECK_TOLERANCE, _analyze_pages, analysis_backend, check_backends
+
+A0124 = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                     "pdf", "A0124_pages_1_to_4.pdf")
+
+
+def _rounded(value):
+    """Detections with coordinates rounded (pymupdf reports float32 word positions)"""
+    if isinstance(value, dict):
+        return {k: _rounded(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_rounded(v) for v in value]
+    return round(value, 2) if isinstance(value, float) else value
+
+
+def _detections(pdf_path, backend, monkeypatch):
+    monkeypatch.setenv(template_cache.BACKEND_ENV, backend)
+    monkeypatch.setattr(template_cache, '_memory', {})
+    return _rounded(detect_boxes(pdf_path, FIELD_LABELS, workers=1))
+
+
+def test_default_backend_is_pdfplumber():
+    assert analysis_backend() == 'pdfplumber'
+
+
+def test_backends_extract_the_same_words_and_rects(template):
+    fast, _ = _analyze_pages(template, [0, 1], 'pymupdf')
+    reference, _ = _analyze_pages(template, [0, 1], 'pdfplumber')
+
+    for key in ('0', '1'):
+        ours, theirs = fast[key], reference[key]
+        assert [w['text'] for w in ours['words']] == [w['text'] for w in theirs['words']]
+        for a, b in zip(ours['words'] + ours['rects'], theirs['words'] + theirs['rects']):
+            for coord in ('x0', 'x1', 'top', 'bottom'):
+                assert a[coord] == pytest.approx(b[coord], abs=CHECK_TOLERANCE)
+        assert len(ours['rects']) == len(theirs['rects']) == 4
+        assert (ours['width'], ours['height']) == pytest.approx((theirs['width'], theirs['height']))
+
+
+def test_pdfplumber_backend_does_not_run_get_drawings(template, monkeypatch):
+    def get_drawings(page, *args, **kwargs):
+        raise AssertionError("get_drawings() called for the pdfplumber backend")
+
+    monkeypatch.setattr(fitz.Page, 'get_drawings', get_drawings)
+    pages, page_count = _analyze_pages(template, [0, 1], 'pdfplumber')
+    assert page_count == 2
+    assert all(len(pages[key]['drawings']) == 4 for key in ('0', '1'))
+    assert all(d['type'] == 's' and d['fill'] is None for d in pages['0']['drawings'])
+
+
+def test_check_backends_passes_on_equivalent_template(template):
+    report = check_backends(template)
+    assert all(not page['word_mismatches'] and not page['rect_mismatches'] for page in report.values())
+
+
+def test_check_backends_flags_rects_only_pymupdf_reports(closed_path_template):
+    report = check_backends(closed_path_template)
+    # pdfminer files "re h" paths under curves, so pdfplumber sees no rects at all
+    assert all(page['rects'] == 0 for page in report.values())
+    assert all(len(page['rect_mismatches']) == 4 for page in report.values())
+    assert template_cache.main([closed_path_template, '--check-backends']) == 1
+
+
+def test_detect_boxes_agrees_across_backends(template, monkeypatch):
+    assert _detections(template, 'pymupdf', monkeypatch) == _detections(template, 'pdfplumber', monkeypatch)
+
+
+@pytest.mark.skipif(not os.path.exists(A0124), reason="A0124 template not checked out")
+@pytest.mark.xfail(strict=True, reason="pymupdf reports the template's 're h' boxes, pdfplumber does not; "
+                                       "pdfplumber stays the default backend until this passes")
+def test_a0124_detections_agree_across_backends(monkeypatch):
+    pymupdf = _detections(A0124, 'pymupdf', monkeypatch)
+    pdfplumber = _detections(A0124, 'pdfplumber', monkeypatch)
+    report = check_backends(A0124)
+    assert pymupdf == pdfplumber
+    assert all(not page['word_mismatches'] and not page['rect_mismatches'] for page in report.values())
+
+
+def test_fallback_is_remembered_for_the_template(template, monkeypatch):
+    attempts = []
+
+    def broken_words(page):
+        attempts.append(page.number)
+        raise RuntimeError("MuPDF cannot read this template")
+
+    monkeypatch.setattr(template_cache, '_pymupdf_words', broken_words)
+    monkeypatch.setenv(template_cache.BACKEND_ENV, 'pymupdf')
+
+    first = template_cache.load_template_analysis(template, [0])
+    assert first['backend'] == 'pdfplumber' and attempts == [0]
+
+    # Memoised and from the on-disk marker alike: no second MuPDF attempt
+    assert template_cache.load_template_analysis(template, [0, 1])['backend'] == 'pdfplumber'
+    monkeypatch.setattr(template_cache, '_memory', {})
+    assert template_cache.load_template_analysis(template, [1])['backend'] == 'pdfplumber'
+    assert template_cache.template_backend(template) == 'pdfplumber'
+    assert attempts == [0]
+
+    # Downstream caches are keyed by the backend that produced the data
+    import spatial_index
+    page_index = spatial_index.page_index(template, 0, 'words')
+    assert page_index is spatial_index._page_indexes[(first['hash'], 'pdfplumber', 0, 'words')]
@@ -0,0 +1,93 @@
+"""
+Font-size solver and the layout plan cache
+"""
+
+import pytest
+
+from text_layout import (ASCENT, DESCENT, SIZE_STEP, WIDTH_USAGE, _layout_at, field_layout_key,
+                         fit_text_to_box, layout_cache_stats, plan_layout, solve_text_fit)
+from text_metrics import get_text_width
+
+ADDRESS = "48, Sambong-ro, Jongno-gu, Seoul, 03156, Rep. of KOREA"
+BOXES = [
+    {'x0': 80, 'x1': 400, 'y0': 100, 'y1': 124},   # wide single-line box
+    {'x0': 80, 'x1': 200, 'y0': 100, 'y1': 160},   # narrow, tall: wraps
+    {'x0': 80, 'x1': 140, 'y0': 100, 'y1': 112},   # too small for the address at any size
+]
+
+
+def _linear_fit(text, box, initial, minimum, alignment, allow_wrap):
+    """Reference: the old 0.5pt decrement loop"""
+    size = initial
+    while size >= minimum:
+        if _layout_at(text, box, size, 'helv', alignment, 1.3, allow_wrap)[2]:
+            return size
+        size -= SIZE_STEP
+    return None
+
+
+@pytest.mark.parametrize('box', BOXES)
+@pytest.mark.parametrize('alignment', ['top', 'middle', 'bottom'])
+@pytest.mark.parametrize('allow_wrap', [False, True])
+@pytest.mark.parametrize('text', ['Jeon Chulmin', '010-1234-1234', ADDRESS])
+def test_binary_search_matches_linear_scan(box, alignment, allow_wrap, text):
+    plan = solve_text_fit(text, box, 12, 6, alignment=alignment, allow_wrap=allow_wrap)
+    expected = _linear_fit(text, box, 12, 6, alignment, allow_wrap)
+    if expected is None:
+        assert plan['fontsize'] == 6 and not plan['fits']
+    else:
+        assert plan['fontsize'] == expected and plan['fits']
+
+
+def test_fitted_lines_stay_inside_the_box():
+    box = BOXES[1]
+    plan = solve_text_fit(ADDRESS, box, 12, 6, allow_wrap=True)
+    assert plan['fits'] and plan['wrapped']
+    assert ' '.join(plan['lines']) == ADDRESS
+    size = plan['fontsize']
+    for line, (_, y) in zip(plan['lines'], plan['positions']):
+        assert get_text_width(line, size) <= (box['x1'] - box['x0']) * WIDTH_USAGE
+        assert box['y0'] <= y - size * ASCENT and y + size * DESCENT <= box['y1']
+
+
+@pytest.mark.parametrize('allow_wrap', [False, True])
+def test_font_size_never_grows_with_longer_text(allow_wrap):
+    sizes = [solve_text_fit(ADDRESS[:n], BOXES[1], 12, 6, allow_wrap=allow_wrap)['fontsize']
+             for n in range(1, len(ADDRESS) + 1)]
+    assert sizes == sorted(sizes, reverse=True)
+
+
+def test_font_size_never_grows_in_narrower_boxes():
+    sizes = [solve_text_fit(ADDRESS, dict(BOXES[1], x1=80 + width), 12, 6, allow_wrap=True)['fontsize']
+             for width in range(200, 40, -10)]
+    assert sizes == sorted(sizes, reverse=True)
+
+
+def test_sizes_stay_on_the_half_point_grid():
+    for width in range(60, 400, 7):
+        size, _ = fit_text_to_box(ADDRESS, width, 11, 6)
+        assert ((11 - size) / SIZE_STEP).is_integer() and 6 <= size <= 11
+
+
+@pytest.mark.parametrize('alignment', ['top', 'middle', 'bottom'])
+def test_baselines_are_in_reading_order(alignment):
+    plan = solve_text_fit(ADDRESS, BOXES[1], 12, 6, alignment=alignment, allow_wrap=True)
+    ys = [y for _, y in plan['positions']]
+    assert len(ys) > 1 and ys == sorted(ys)
+
+
+def test_offsets_and_padding_move_every_line():
+    base = solve_text_fit(ADDRESS, BOXES[1], 12, 6, allow_wrap=True)
+    moved = solve_text_fit(ADDRESS, BOXES[1], 12, 6, allow_wrap=True, padding_h=5, offset_x=2, offset_y=-1)
+    assert [(x + 4, y - 1) for x, y in base['positions']] == moved['positions']
+
+
+def test_plan_layout_is_memoized_per_key_and_text():
+    field = {'box': BOXES[0], 'fontsize': 10, 'min_fontsize': 6}
+    key = field_layout_key(field, {'default_fontname': 'helv'})
+    before = layout_cache_stats()
+    plan = plan_layout(key, 'memoized value')
+    assert plan_layout(key, 'memoized value') is plan
+    after = layout_cache_stats()
+    assert after['hits'] - before['hits'] == 1 and after['misses'] - before['misses'] == 1
+    assert plan == solve_text_fit('memoized value', BOXES[0], 10, 6, padding_h=3)
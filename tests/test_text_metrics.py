@@ -0,0 +1,39 @@
+"""
+Text widths are measured in the font the text is drawn with
+"""
+
+import pytest
+
+from conftest import fitz, make_config
+from populate_pdf_config import Filler
+from text_metrics import FALLBACK_FONTNAME, font_for_text, get_text_width
+
+
+@pytest.mark.parametrize('text, fontname', [
+    ('48, Sambong-ro, Seoul', 'helv'),
+    ('café', 'helv'),
+    ('홍길동', FALLBACK_FONTNAME),
+    ('서울 Seoul', FALLBACK_FONTNAME),  # one string, one font: mixed text goes to the fallback
+])
+def test_width_matches_the_drawing_font(text, fontname):
+    assert font_for_text(text, 'helv') == fontname
+    assert get_text_width(text, 10, 'helv') == pytest.approx(fitz.Font(fontname).text_length(text, 10))
+
+
+def test_widths_scale_with_fontsize():
+    assert get_text_width('홍길동', 12) == pytest.approx(get_text_width('홍길동', 6) * 2)
+
+
+def test_filler_draws_hangul_with_the_fallback_font(tmp_path, template):
+    config = make_config(tmp_path / 'config.json', template)
+    filler = Filler(config)
+    try:
+        doc = filler.render({'name': '홍길동', 'phone': '010-1234-1234'})
+        try:
+            assert '홍길동' in doc[0].get_text()
+            assert '010-1234-1234' in doc[1].get_text()
+        finally:
+            doc.close()
+    finally:
+        filler.close()
+
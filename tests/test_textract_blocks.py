@@ -0,0 +1,91 @@
+"""
+Textract block graph: resolved relationships, key-value pairs, per-page views
+"""
+
+from textract_blocks import BlockGraph
+
+
+def _block(block_id, block_type, text=None, page=1, children=(), values=(), entity=None, left=0.1):
+    raw = {'Id': block_id, 'BlockType': block_type, 'Page': page, 'Confidence': 99.0,
+           'Geometry': {'BoundingBox': {'Left': left, 'Top': 0.2, 'Width': 0.3, 'Height': 0.05}}}
+    if text is not None:
+        raw['Text'] = text
+    relationships = []
+    if children:
+        relationships.append({'Type': 'CHILD', 'Ids': list(children)})
+    if values:
+        relationships.append({'Type': 'VALUE', 'Ids': list(values)})
+    if relationships:
+        raw['Relationships'] = relationships
+    if entity:
+        raw['EntityTypes'] = [entity]
+    return raw
+
+
+def _response():
+    return {'Blocks': [
+        _block('p1', 'PAGE', children=['l1']),
+        _block('l1', 'LINE', '성명 Jeon Chulmin', children=['w1', 'w2', 'w3']),
+        _block('w1', 'WORD', '성명'),
+        _block('w2', 'WORD', 'Jeon', left=0.3),
+        _block('w3', 'WORD', 'Chulmin', left=0.4),
+        _block('k1', 'KEY_VALUE_SET', children=['w1'], values=['v1'], entity='KEY'),
+        # 'gone' is not in the response and is dropped
+        _block('v1', 'KEY_VALUE_SET', children=['w2', 'w3', 'gone'], entity='VALUE'),
+        _block('p2', 'PAGE', page=2, children=['l2']),
+        _block('l2', 'LINE', '주소 Seoul', page=2, children=['w4', 'w5']),
+        _block('w4', 'WORD', '주소', page=2),
+        _block('w5', 'WORD', 'Seoul', page=2),
+        _block('k2', 'KEY_VALUE_SET', page=2, children=['w4'], values=['v2'], entity='KEY'),
+        _block('v2', 'KEY_VALUE_SET', page=2, children=['w5'], entity='VALUE'),
+        _block('k3', 'KEY_VALUE_SET', page=2, values=['v2'], entity='KEY'),  # no key text: skipped
+    ]}
+
+
+def test_relationships_resolve_to_blocks():
+    graph = BlockGraph(_response())
+    assert len(graph) == 14
+    value = graph.by_id['v1']
+    assert [child.id for child in value.children] == ['w2', 'w3']
+    assert graph.by_id['k1'].values == (value,)
+    assert value.word_text() == 'Jeon Chulmin'
+
+
+def test_key_value_pairs_across_pages():
+    graph = BlockGraph(_response())
+    assert graph.key_value_pairs() == {'성명': 'Jeon Chulmin', '주소': 'Seoul'}
+    assert [(key.id, [v.id for v in values]) for key, values in graph.key_value_blocks()] == [
+        ('k1', ['v1']), ('k2', ['v2']), ('k3', ['v2'])]
+
+
+def test_later_duplicate_keys_win():
+    response = _response()
+    response['Blocks'] += [
+        _block('w6', 'WORD', '성명', page=2),
+        _block('w7', 'WORD', 'Hong', page=2),
+        _block('k4', 'KEY_VALUE_SET', page=2, children=['w6'], values=['v4'], entity='KEY'),
+        _block('v4', 'KEY_VALUE_SET', page=2, children=['w7'], entity='VALUE'),
+    ]
+    assert BlockGraph(response).key_value_pairs()['성명'] == 'Hong'
+
+
+def test_text_elements_keep_response_order_and_geometry():
+    elements = BlockGraph(_response()).text_elements()
+    assert [e['text'] for e in elements] == ['성명 Jeon Chulmin', '성명', 'Jeon', 'Chulmin',
+                                             '주소 Seoul', '주소', 'Seoul']
+    assert elements[2] == {'text': 'Jeon', 'type': 'WORD', 'confidence': 99.0, 'page': 1,
+                           'geometry': {'left': 0.3, 'top': 0.2, 'width': 0.3, 'height': 0.05}}
+    assert [e['type'] for e in BlockGraph(_response()).text_elements(('LINE',))] == ['LINE', 'LINE']
+
+
+def test_page_summary():
+    summary = BlockGraph(_response()).page_summary()
+    assert summary[1] == {'lines': ['성명 Jeon Chulmin'], 'words': ['성명', 'Jeon', 'Chulmin'], 'key_values': 2}
+    assert summary[2] == {'lines': ['주소 Seoul'], 'words': ['주소', 'Seoul'], 'key_values': 3}
+
+
+def test_missing_fields_default():
+    graph = BlockGraph({'Blocks': [{'Id': 'x', 'BlockType': 'WORD'}]})
+    block = graph.by_id['x']
+    assert (block.text, block.page, block.confidence, block.left) == ('', 1, 0, 0)
+    assert graph.of_type('LINE') == [] and graph.key_value_pairs() == {}
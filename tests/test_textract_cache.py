@@ -0,0 +1,103 @@
+"""
+Content-addressed Textract response cache and the offline replay client
+"""
+
+import json
+import os
+
+import pytest
+
+import textract_cache
+from instrumentation import METRICS
+from textract_cache import (CachingTextractClient, StubTextractClient, TextractCacheMiss, import_response,
+                            response_key, textract_client)
+
+RESPONSE = {'Blocks': [{'Id': 'w1', 'BlockType': 'WORD', 'Text': '성명'}], 'DocumentMetadata': {'Pages': 1}}
+
+
+class FakeTextract:
+    """Counts the analyze_document calls that reach 'AWS'"""
+
+    def __init__(self):
+        self.calls = []
+
+    def analyze_document(self, Document, FeatureTypes, **kwargs):
+        self.calls.append((FeatureTypes, kwargs))
+        return RESPONSE
+
+    def detect_document_text(self, Document):
+        return {'passthrough': True}
+
+
+def _counter(name):
+    return METRICS.snapshot()['counters'].get(name, 0)
+
+
+def test_key_depends_on_bytes_and_feature_set_not_order():
+    assert response_key(b'pdf', ['FORMS', 'TABLES']) == response_key(b'pdf', ['TABLES', 'FORMS'])
+    assert response_key(b'pdf', ['FORMS']) != response_key(b'pdf', ['FORMS', 'TABLES'])
+    assert response_key(b'pdf', ['FORMS']) != response_key(b'pdf2', ['FORMS'])
+
+
+def test_caching_client_calls_textract_once_per_document():
+    fake = FakeTextract()
+    client = CachingTextractClient(fake)
+    misses, hits = _counter('textract_cache_misses'), _counter('textract_cache_hits')
+
+    first = client.analyze_document(Document={'Bytes': b'pdf'}, FeatureTypes=['FORMS'])
+    second = client.analyze_document(Document={'Bytes': b'pdf'}, FeatureTypes=['FORMS'])
+    assert first == second == RESPONSE
+    assert len(fake.calls) == 1
+    assert (_counter('textract_cache_misses'), _counter('textract_cache_hits')) == (misses + 1, hits + 1)
+    assert os.path.exists(os.path.join(textract_cache.TEXTRACT_CACHE_DIR,
+                                       f"{response_key(b'pdf', ['FORMS'])}.json"))
+
+    client.analyze_document(Document={'Bytes': b'pdf'}, FeatureTypes=['FORMS', 'TABLES'])
+    assert len(fake.calls) == 2
+    assert client.detect_document_text(Document={'Bytes': b'pdf'}) == {'passthrough': True}
+
+
+def test_s3_documents_are_rejected():
+    with pytest.raises(ValueError, match="S3Object"):
+        CachingTextractClient(FakeTextract()).analyze_document(
+            Document={'S3Object': {'Bucket': 'b', 'Name': 'n'}}, FeatureTypes=['FORMS'])
+
+
+def test_corrupt_entries_are_misses():
+    key = response_key(b'pdf', ['FORMS'])
+    os.makedirs(textract_cache.TEXTRACT_CACHE_DIR)
+    with open(os.path.join(textract_cache.TEXTRACT_CACHE_DIR, f"{key}.json"), 'w') as f:
+        f.write('{"Blocks": [')
+    fake = FakeTextract()
+    assert CachingTextractClient(fake).analyze_document(Document={'Bytes': b'pdf'}, FeatureTypes=['FORMS']) == RESPONSE
+    assert len(fake.calls) == 1
+
+
+def test_offline_client_replays_imported_responses(tmp_path):
+    pdf = tmp_path / 'form.pdf'
+    pdf.write_bytes(b'%PDF-1.7 form')
+    saved = tmp_path / 'response.json'
+    saved.write_text(json.dumps(RESPONSE, ensure_ascii=False), encoding='utf-8')
+
+    stub = textract_client(offline=True)
+    assert isinstance(stub, StubTextractClient)
+    with pytest.raises(TextractCacheMiss, match="textract_cache.py import"):
+        stub.analyze_document(Document={'Bytes': pdf.read_bytes()}, FeatureTypes=['FORMS'])
+
+    import_response(str(pdf), str(saved))
+    assert stub.analyze_document(Document={'Bytes': pdf.read_bytes()}, FeatureTypes=['FORMS']) == RESPONSE
+
+
+def test_cli_import_and_key(tmp_path, capsys):
+    pdf = tmp_path / 'form.pdf'
+    pdf.write_bytes(b'%PDF-1.7 form')
+    saved = tmp_path / 'response.json'
+    saved.write_text(json.dumps(RESPONSE), encoding='utf-8')
+
+    textract_cache.main(['key', str(pdf), '--features', 'TABLES,FORMS'])
+    key = capsys.readouterr().out.strip()
+    assert key == response_key(pdf.read_bytes(), ['FORMS', 'TABLES'])
+
+    textract_cache.main(['import', str(pdf), str(saved), '--features', 'FORMS,TABLES'])
+    assert "✓ Cached" in capsys.readouterr().out
+    assert textract_cache.read_cached(key) == RESPONSE
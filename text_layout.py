@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+Text Layout - Font sizing, wrapping and baseline placement for a field box
+
+solve_text_fit() picks the largest font size whose (wrapped) lines fit both
+the width and the height of the box. Width bounds come from a closed form
+(text width scales linearly with font size); the wrapped case binary-searches
+the 0.5pt size grid, so a field costs O(log sizes) wraps instead of a linear
+0.5pt decrement loop.
+
+plan_layout() puts the solver behind a bounded LRU cache keyed by the
+field's layout settings and the text, so repeated values skip layout.
+"""
+
+import math
+from functools import lru_cache
+
+from text_metrics import get_text_width
+
+WIDTH_USAGE = 0.9      # Use 90% of box width
+SIZE_STEP = 0.5        # Font sizes are multiples of 0.5pt below the initial size
+ASCENT = 0.75          # Baseline sits ~0.75 * fontsize below the glyph top
+DESCENT = 0.25         # ... and ~0.25 * fontsize above the glyph bottom
+
+
+def fit_text_to_box(text, box_width, initial_fontsize, min_fontsize=6, fontname="helv"):
+    """
+    Calculate optimal font size to fit text in box width (single line)
+    Returns (fontsize, fits_in_one_line)
+    """
+    em_width = get_text_width(text, 1, fontname)
+    if em_width <= 0:
+        return initial_fontsize, True
+
+    largest = (box_width * WIDTH_USAGE) / em_width
+    if largest >= initial_fontsize:
+        return initial_fontsize, True
+
+    # Snap down onto the initial_fontsize - k * 0.5 grid
+    fontsize = initial_fontsize - math.ceil((initial_fontsize - largest) / SIZE_STEP) * SIZE_STEP
+    if fontsize >= min_fontsize:
+        return fontsize, True
+    return min_fontsize, False
+
+
+def wrap_text(text, box_width, fontsize, fontname="helv"):
+    """Wrap text to fit within box width"""
+    words = text.split()
+    lines = []
+    current_line = []
+
+    for word in words:
+        test_line = ' '.join(current_line + [word])
+        test_width = get_text_width(test_line, fontsize, fontname)
+
+        if test_width <= box_width * WIDTH_USAGE:
+            current_line.append(word)
+        else:
+            if current_line:
+                lines.append(' '.join(current_line))
+                current_line = [word]
+            else:
+                lines.append(word)
+
+    if current_line:
+        lines.append(' '.join(current_line))
+
+    return lines
+
+
+def calculate_y_position(box, fontsize, alignment, line_height=None, line_number=0):
+    """
+    Calculate Y position based on alignment type
+
+    Args:
+        box: Dict with y0, y1 keys
+        fontsize: Font size in points
+        alignment: 'top', 'middle', or 'bottom'
+        line_height: For multi-line text
+        line_number: Which line (0-indexed)
+
+    Returns:
+        Y coordinate for text baseline
+    """
+    box_height = box['y1'] - box['y0']
+
+    if alignment == 'top':
+        # Align to top - text baseline at top of box
+        # For PyMuPDF, baseline should be approximately fontsize * 0.75 from top edge
+        y = box['y0'] + (fontsize * 0.75) + 1  # +1 for tiny padding
+        if line_height and line_number > 0:
+            y += line_number * line_height
+
+    elif alignment == 'bottom':
+        # Align to bottom - text baseline at bottom of box
+        # Baseline should be approximately fontsize * 0.25 from bottom edge
+        y = box['y1'] - (fontsize * 0.25) - 1  # -1 for tiny padding
+        if line_height and line_number > 0:
+            y -= line_number * line_height
+
+    else:  # middle (default)
+        # Center vertically
+        y = box['y0'] + (box_height / 2) + (fontsize / 3)
+        if line_height and line_number > 0:
+            # For multi-line, adjust to keep all lines centered
+            y += line_number * line_height
+
+    return y
+
+
+def _baselines(box, fontsize, alignment, line_count, line_height):
+    """Baselines for a block of lines, kept in reading order for every alignment"""
+    first = calculate_y_position(box, fontsize, alignment)
+    if alignment == 'top':
+        return [first + i * line_height for i in range(line_count)]
+    if alignment == 'bottom':
+        return [first - (line_count - 1 - i) * line_height for i in range(line_count)]
+    # middle: center the whole block on the single-line baseline
+    return [first + (i - (line_count - 1) / 2) * line_height for i in range(line_count)]
+
+
+def _layout_at(text, box, fontsize, fontname, alignment, line_height_mult, allow_wrap):
+    """Lines and baselines at one font size, plus whether they stay inside the box"""
+    box_width = box['x1'] - box['x0']
+    available = box_width * WIDTH_USAGE
+
+    if allow_wrap:
+        lines = wrap_text(text, box_width, fontsize, fontname) or [text]
+    else:
+        lines = [text]
+
+    baselines = _baselines(box, fontsize, alignment, len(lines), fontsize * line_height_mult)
+    fits_width = all(get_text_width(line, fontsize, fontname) <= available for line in lines)
+    fits_height = (baselines[0] - fontsize * ASCENT >= box['y0'] and
+                   baselines[-1] + fontsize * DESCENT <= box['y1'])
+    return lines, baselines, fits_width and fits_height
+
+
+def solve_text_fit(text, box, initial_fontsize, min_fontsize=6, fontname="helv",
+                   alignment='middle', allow_wrap=False, line_height_mult=1.3,
+                   padding_h=3, offset_x=0, offset_y=0):
+    """
+    Find the largest font size whose lines fit the box width and height
+
+    Args:
+        text: Value to place
+        box: Dict with x0, x1, y0, y1
+        initial_fontsize: Preferred (largest) font size
+        min_fontsize: Smallest size allowed
+        fontname: Font used for measuring and drawing
+        alignment: 'top', 'middle' or 'bottom'
+        allow_wrap: Allow the text to be split over several lines
+        line_height_mult: Line spacing as a multiple of the font size
+        padding_h: Left padding inside the box
+        offset_x, offset_y: Manual nudges applied to every line position
+
+    Returns:
+        Dict with 'fontsize', 'lines', 'positions' [(x, y) baseline points],
+        'fits' (False if even min_fontsize overflows) and 'wrapped'
+    """
+    # Closed-form upper bound: the widest single word (or whole text) must fit
+    box_width = box['x1'] - box['x0']
+    words = text.split() if allow_wrap else []
+    longest = max(words, key=lambda w: get_text_width(w, 1, fontname)) if words else text
+    upper, _ = fit_text_to_box(longest, box_width, initial_fontsize, min_fontsize, fontname)
+
+    # Candidate sizes on the 0.5pt grid, largest first
+    steps = int((upper - min_fontsize) / SIZE_STEP + 1e-9) if upper > min_fontsize else 0
+    sizes = [upper - i * SIZE_STEP for i in range(steps + 1)]
+
+    # Feasibility is monotone in size (smaller text never needs more lines), so
+    # binary-search for the first feasible size
+    best = None
+    lo, hi = 0, len(sizes) - 1
+    while lo <= hi:
+        mid = (lo + hi) // 2
+        layout = _layout_at(text, box, sizes[mid], fontname, alignment, line_height_mult, allow_wrap)
+        if layout[2]:
+            best = (sizes[mid], layout)
+            hi = mid - 1
+        else:
+            lo = mid + 1
+
+    if best is None:
+        fontsize = min_fontsize
+        lines, baselines, fits = _layout_at(text, box, fontsize, fontname, alignment,
+                                            line_height_mult, allow_wrap)
+    else:
+        fontsize, (lines, baselines, fits) = best
+
+    x = box['x0'] + padding_h + offset_x
+    return {
+        'fontsize': fontsize,
+        'lines': lines,
+        'positions': [(x, y + offset_y) for y in baselines],
+        'fits': fits,
+        'wrapped': len(lines) > 1,
+    }
+
+
+# ---------------------------------------------------------------------------
+# Layout plans: (field definition, text) -> fontsize, lines, baseline points
+# ---------------------------------------------------------------------------
+
+LAYOUT_CACHE_SIZE = 4096
+
+
+def field_layout_key(field_def, settings):
+    """
+    Hashable summary of everything that affects a field's layout
+
+    Built once per field; together with the text it identifies a layout plan.
+    """
+    box = field_def['box']
+    return (
+        (box['x0'], box['x1'], box['y0'], box['y1']),
+        field_def.get('fontsize', 10),
+        field_def.get('min_fontsize', 6),
+        settings.get('default_fontname', 'helv'),
+        field_def.get('alignment', 'middle'),
+        field_def.get('allow_wrap', False),
+        settings.get('line_height_multiplier', 1.3),
+        settings.get('padding_horizontal', 3),
+        field_def.get('offset_x', 0),
+        field_def.get('offset_y', 0),
+    )
+
+
+@lru_cache(maxsize=LAYOUT_CACHE_SIZE)
+def plan_layout(layout_key, text):
+    """
+    Layout plan for a text value in a field, memoized in a bounded LRU cache
+
+    Records that repeat a value (constant fields, shared address prefixes,
+    common phone formats) reuse the plan and skip fitting and wrapping.
+    The returned dict is shared between callers and must not be modified.
+    """
+    (box, fontsize, min_fontsize, fontname, alignment, allow_wrap,
+     line_height_mult, padding_h, offset_x, offset_y) = layout_key
+    return solve_text_fit(
+        text, dict(zip(('x0', 'x1', 'y0', 'y1'), box)), fontsize, min_fontsize, fontname,
+        alignment=alignment, allow_wrap=allow_wrap, line_height_mult=line_height_mult,
+        padding_h=padding_h, offset_x=offset_x, offset_y=offset_y,
+    )
+
+
+def layout_cache_stats():
+    """Hit/miss counters for plan_layout in this process"""
+    info = plan_layout.cache_info()
+    return {'hits': info.hits, 'misses': info.misses, 'size': info.currsize, 'maxsize': info.maxsize}
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Text Metrics - Real font-based text width measurement
+Replaces the old `len(text) * fontsize * 0.5` estimate
+
+Each font gets a glyph-advance table built once from PyMuPDF (fitz.Font).
+Latin-1 advances live in a flat array; other characters (e.g. Hangul) are
+looked up once and remembered.
+
+A string is measured in the font it is drawn with. font_for_text() gives
+that font: the requested one when it has a glyph for every character,
+otherwise the built-in CJK fallback (Base-14 fonts like helv cannot draw
+Hangul at all). Callers that insert text pass the same choice to
+insert_text(), so measured and drawn widths agree.
+
+Widths are measured in em units and scaled by fontsize, so the fit loops
+that try many sizes for the same string only measure it once.
+
+Usage:
+    from text_metrics import font_for_text, get_text_width
+    width = get_text_width("48, Sambong-ro", 9, "helv")
+    page.insert_text(point, text, fontsize=9, fontname=font_for_text(text, "helv"))
+"""
+
+from array import array
+from functools import lru_cache
+
+try:
+    import pymupdf as fitz  # PyMuPDF
+except ImportError:  # PyMuPDF < 1.24
+    import fitz
+
+FALLBACK_FONTNAME = "korea"  # Built-in CJK font, covers Hangul and Latin
+LATIN_TABLE_SIZE = 256
+
+
+class FontMetrics:
+    """Cached glyph advances (em units) for one font"""
+
+    def __init__(self, fontname):
+        self.fontname = fontname
+        self.font = fitz.Font(fontname)
+        self.latin = array('d', (self.font.glyph_advance(cp) for cp in range(LATIN_TABLE_SIZE)))
+        self.extra = {}
+        self._covered = {}  # character -> font has a glyph for it
+
+    def covers(self, text):
+        """True when the font has a glyph for every character of text"""
+        covered = self._covered
+        for ch in text:
+            has_glyph = covered.get(ch)
+            if has_glyph is None:
+                has_glyph = covered[ch] = ch.isspace() or bool(self.font.has_glyph(ord(ch)))
+            if not has_glyph:
+                return False
+        return True
+
+    def em_width(self, text):
+        """Width of text at fontsize 1"""
+        latin = self.latin
+        extra = self.extra
+        total = 0.0
+        for ch in text:
+            cp = ord(ch)
+            if cp < LATIN_TABLE_SIZE:
+                total += latin[cp]
+            else:
+                advance = extra.get(cp)
+                if advance is None:
+                    advance = extra[cp] = self.font.glyph_advance(cp)
+                total += advance
+        return total
+
+
+@lru_cache(maxsize=None)
+def font_metrics(fontname="helv"):
+    """Shared FontMetrics instance per font name"""
+    return FontMetrics(fontname)
+
+
+@lru_cache(maxsize=65536)
+def font_for_text(text, fontname="helv"):
+    """Font text is drawn and measured with: fontname, or FALLBACK_FONTNAME if it lacks a glyph"""
+    return fontname if font_metrics(fontname).covers(text) else FALLBACK_FONTNAME
+
+
+@lru_cache(maxsize=65536)
+def _em_width(text, fontname):
+    return font_metrics(font_for_text(text, fontname)).em_width(text)
+
+
+def get_text_width(text, fontsize, fontname="helv"):
+    """Width of text in points, in the font it is drawn with (see font_for_text)"""
+    return _em_width(text, fontname) * fontsize
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Textract Cache - Content-addressed disk cache for AWS Textract responses
+
+analyze_document responses are stored under a SHA-256 of the document bytes
+and the requested feature types, so an unchanged template is only sent to
+Textract (and billed) once. StubTextractClient replays cached responses
+without boto3 or credentials, which lets the extraction and matching steps
+of notebook 03 rerun offline in milliseconds.
+
+Usage:
+    from textract_cache import textract_client
+    textract = textract_client('us-east-1')              # boto3 client behind the cache
+    textract = textract_client(offline=True)             # replay only, no AWS
+    response = textract.analyze_document(Document={'Bytes': pdf_bytes}, FeatureTypes=['FORMS'])
+
+    # Seed the cache from a response saved by an earlier notebook run
+    python textract_cache.py import pdf/A0124_pages_1_to_4.pdf results/textract_response.json
+"""
+
+import argparse
+import hashlib
+import json
+import os
+
+from instrumentation import METRICS
+
+TEXTRACT_CACHE_DIR = ".cache/textract"
+
+
+class TextractCacheMiss(LookupError):
+    """No cached response for this document and feature set (offline mode)"""
+
+
+def response_key(document_bytes, feature_types):
+    """SHA-256 over the document bytes and the (order-independent) feature types"""
+    digest = hashlib.sha256(document_bytes)
+    digest.update(b"\0" + ",".join(sorted(feature_types)).encode())
+    return digest.hexdigest()
+
+
+def _cache_path(key, cache_dir):
+    return os.path.join(cache_dir, f"{key}.json")
+
+
+def read_cached(key, cache_dir=TEXTRACT_CACHE_DIR):
+    try:
+        with open(_cache_path(key, cache_dir), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def write_cached(key, response, cache_dir=TEXTRACT_CACHE_DIR):
+    os.makedirs(cache_dir, exist_ok=True)
+    path = _cache_path(key, cache_dir)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(response, f, ensure_ascii=False, default=str)  # default=str: datetimes in metadata
+    os.replace(tmp_path, path)
+
+
+def _document_bytes(document):
+    if 'Bytes' not in document:
+        raise ValueError("Only Document={'Bytes': ...} requests can be cached (not S3Object)")
+    return document['Bytes']
+
+
+class CachingTextractClient:
+    """Wraps a boto3 Textract client; analyze_document is served from the cache when possible"""
+
+    def __init__(self, client, cache_dir=TEXTRACT_CACHE_DIR):
+        self.client = client
+        self.cache_dir = cache_dir
+
+    def analyze_document(self, Document, FeatureTypes, **kwargs):
+        key = response_key(_document_bytes(Document), FeatureTypes)
+        cached = read_cached(key, self.cache_dir)
+        if cached is not None:
+            METRICS.count('textract_cache_hits')
+            return cached
+
+        METRICS.count('textract_cache_misses')
+        response = self.client.analyze_document(Document=Document, FeatureTypes=FeatureTypes, **kwargs)
+        write_cached(key, response, self.cache_dir)
+        return response
+
+    def __getattr__(self, name):
+        # Everything else (detect_document_text, async jobs, ...) goes straight to boto3
+        return getattr(self.client, name)
+
+
+class StubTextractClient:
+    """Offline stand-in for the Textract client that only replays cached responses"""
+
+    def __init__(self, cache_dir=TEXTRACT_CACHE_DIR):
+        self.cache_dir = cache_dir
+
+    def analyze_document(self, Document, FeatureTypes, **kwargs):
+        key = response_key(_document_bytes(Document), FeatureTypes)
+        cached = read_cached(key, self.cache_dir)
+        if cached is None:
+            raise TextractCacheMiss(
+                f"No cached Textract response for this document with {sorted(FeatureTypes)} "
+                f"in {self.cache_dir} (run once online, or seed it with 'python textract_cache.py import')"
+            )
+        METRICS.count('textract_cache_hits')
+        return cached
+
+
+def textract_client(region='us-east-1', offline=False, cache_dir=TEXTRACT_CACHE_DIR):
+    """
+    Textract client with the response cache in front
+
+    Args:
+        region: AWS region for the real client
+        offline: Replay cached responses only (no boto3, no credentials)
+        cache_dir: Directory holding the cached responses
+    """
+    if offline:
+        return StubTextractClient(cache_dir)
+
+    import boto3  # only needed when Textract may actually be called
+    return CachingTextractClient(boto3.client('textract', region_name=region), cache_dir)
+
+
+def import_response(pdf_path, response_path, feature_types=('FORMS',), cache_dir=TEXTRACT_CACHE_DIR):
+    """Store a previously saved analyze_document response for a document; returns the key"""
+    with open(pdf_path, 'rb') as f:
+        key = response_key(f.read(), feature_types)
+    with open(response_path, 'r', encoding='utf-8') as f:
+        write_cached(key, json.load(f), cache_dir)
+    return key
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Textract response cache")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    seed = subparsers.add_parser('import', help="Seed the cache from a saved analyze_document response")
+    seed.add_argument('pdf')
+    seed.add_argument('response')
+    seed.add_argument('--features', default='FORMS', help="Comma-separated feature types (default: FORMS)")
+    seed.add_argument('--cache-dir', default=TEXTRACT_CACHE_DIR)
+
+    show = subparsers.add_parser('key', help="Print the cache key for a document")
+    show.add_argument('pdf')
+    show.add_argument('--features', default='FORMS')
+
+    args = parser.parse_args(argv)
+    features = [f.strip() for f in args.features.split(',') if f.strip()]
+
+    if args.command == 'import':
+        key = import_response(args.pdf, args.response, features, args.cache_dir)
+        print(f"✓ Cached {args.response} as {_cache_path(key, args.cache_dir)}")
+    else:
+        with open(args.pdf, 'rb') as f:
+            print(response_key(f.read(), features))
+
+
+if __name__ == "__main__":
+    main()